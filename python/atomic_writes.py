@@ -0,0 +1,302 @@
+"""
+Crash-safe writes of the scripts and log files.
+
+Every file is written to a temporary file next to it, "<name>.<pid>.tmp", which
+is then renamed over it. A run that is killed leaves either the old or the new
+file, never a half-written one, at worst along with a stray temporary file,
+which the next run removes from the scripts and otl folders it updates, see
+remove_temp_files().
+
+A temporary file is only renamed once its contents are on disk, otherwise
+the machine going down could leave the renamed file empty. Fsyncing the files
+one by one as they are written would stall the extraction on every script, so
+inside a deferred_renames() block the renames wait for sync() instead, called
+at library boundaries: once an otl is done, before it's journaled, its
+temporary files are flushed to disk together, renamed in the order they were
+written, and their folders are flushed, so the otls journaled by a run are on
+disk even if the machine goes down. On linux each of the two flushes is one
+syncfs() call per file system, instead of an fsync per file, see
+sync_file_systems(). Files written outside the block, eg. the top level
+log.json, or that are read back right away, like the blobs, are fsynced and
+renamed as they are written.
+
+Usage:
+    with atomic_writes.deferred_renames():
+        atomic_writes.write_file(script_file_path, script)
+        atomic_writes.write_json(log_file_path, hda_hash_dict)
+        atomic_writes.sync()
+"""
+
+import collections
+import contextlib
+import ctypes
+import ctypes.util
+import json
+import os
+import sys
+import threading
+import uuid
+
+
+TEMP_EXTENSION = ".tmp"
+
+# {file path: temporary file path} of the files waiting for sync() to be renamed, in this process
+_pending_renames = collections.OrderedDict()
+
+# folders of the files renamed since the last sync()
+_pending_folder_paths = set()
+
+# number of deferred_renames() blocks open
+_defer_depth = 0
+
+# the scripts are written by writer threads too, see writer_pool
+_lock = threading.Lock()
+
+# libc syncfs(), loaded by get_syncfs(), False until then
+_syncfs = False
+
+
+def get_temp_file_path(file_path, unique=False):
+    """
+    :param str file_path: path to the file to write.
+    :param bool unique: if other processes can write the same file at the same time, eg. a blob.
+    :return: str path to the temporary file written before being renamed to file_path.
+    """
+
+    if unique:
+        return "{0}.{1}.{2}{3}".format(file_path, os.getpid(), uuid.uuid4().hex, TEMP_EXTENSION)
+    return "{0}.{1}{2}".format(file_path, os.getpid(), TEMP_EXTENSION)
+
+
+def is_temp_file(file_name):
+    """
+    :param str file_name: name of a file in the scripts folder tree.
+    :return: bool True if it's a temporary file, see get_temp_file_path().
+    """
+
+    return file_name.endswith(TEMP_EXTENSION)
+
+
+def replace_file(source_file_path, file_path):
+    """
+    Renames a file over another one.
+
+    :param str source_file_path: path to the file to rename.
+    :param str file_path: path it's renamed to, replaced if it exists.
+    """
+
+    if hasattr(os, "replace"):
+        os.replace(source_file_path, file_path)
+        return
+
+    # python 2, rename doesn't replace existing files on windows
+    if os.name == "nt" and os.path.exists(file_path):
+        os.remove(file_path)
+    os.rename(source_file_path, file_path)
+
+
+def write_file(file_path, data, unique=False, defer=True):
+    """
+    Writes a file through a temporary file renamed over it. A hardlink at
+    file_path is replaced, the file it links to isn't modified.
+
+    :param str file_path: path to the file.
+    :param str data: contents of the file.
+    :param bool unique: see get_temp_file_path().
+    :param bool defer: inside a deferred_renames() block, rename the file at the
+                       next sync(). When False, or outside the block, the file
+                       is fsynced and renamed before this returns.
+    """
+
+    temp_file_path = get_temp_file_path(file_path, unique=unique)
+    deferred = defer and _defer_depth > 0
+    try:
+        with open(temp_file_path, "w") as file_obj:
+            file_obj.write(data)
+            if not deferred:
+                file_obj.flush()
+                os.fsync(file_obj.fileno())
+        if not deferred:
+            replace_file(temp_file_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+        raise
+
+    with _lock:
+        if deferred:
+            # written again before the sync, its temporary file was overwritten
+            _pending_renames[file_path] = temp_file_path
+        else:
+            _pending_folder_paths.add(os.path.dirname(file_path))
+
+
+def write_json(json_file_path, data, sort_keys=False):
+    """
+    Writes a json file, see write_file().
+
+    :param str json_file_path: path to the json file.
+    :param data: data to write.
+    :param bool sort_keys: sort the keys of the json objects.
+    """
+
+    write_file(json_file_path, json.dumps(data, indent=2, sort_keys=sort_keys))
+
+
+def remove_temp_files(folder_path, file_names):
+    """
+    Removes the temporary files left in a folder by a run that was killed.
+
+    :param str folder_path: path to the folder.
+    :param file_names: names of the files in the folder, eg. from os.listdir().
+    """
+
+    for file_name in file_names:
+        if is_temp_file(file_name):
+            try:
+                os.remove(os.path.join(folder_path, file_name))
+            except OSError:
+                # removed by another process in the meantime
+                pass
+
+
+def fsync_path(path):
+    """
+    :param str path: path to a file or folder, flushed to disk.
+    """
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        # removed since it was written
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def get_syncfs():
+    """
+    :return: libc syncfs() function, which flushes the file system holding a
+             file descriptor, or None where it isn't available (linux only).
+    """
+
+    global _syncfs
+
+    if _syncfs is False:
+        _syncfs = None
+        if sys.platform.startswith("linux"):
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+                _syncfs = libc.syncfs
+            except (OSError, AttributeError):
+                pass
+    return _syncfs
+
+
+def sync_file_systems(paths):
+    """
+    Flushes the file systems holding some paths to disk, one syncfs() call
+    per file system.
+
+    :param paths: paths to folders.
+    :return: bool False if syncfs() isn't available, and nothing was flushed.
+    """
+
+    syncfs = get_syncfs()
+    if syncfs is None:
+        return False
+
+    devices = set()
+    for path in paths:
+        try:
+            device = os.stat(path).st_dev
+        except OSError:
+            # removed since it was written
+            continue
+        if device in devices:
+            continue
+        devices.add(device)
+
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            if syncfs(fd) != 0:
+                raise OSError(ctypes.get_errno(), "syncfs failed: {0}".format(path))
+        finally:
+            os.close(fd)
+    return True
+
+
+def sync():
+    """
+    Flushes the temporary files written since the last sync() to disk, renames
+    them into place in the order they were written, eg. the manifest.json of an
+    hda after its scripts, and then flushes their folders, so that the renames
+    are on disk too.
+    """
+
+    with _lock:
+        renames = list(_pending_renames.items())
+
+    if renames and not sync_file_systems(set(os.path.dirname(file_path) for file_path, _ in renames)):
+        for file_path, temp_file_path in renames:
+            fsync_path(temp_file_path)
+
+    for file_path, temp_file_path in renames:
+        replace_file(temp_file_path, file_path)
+        with _lock:
+            # the temporary files left if a rename fails are removed by discard()
+            del _pending_renames[file_path]
+            _pending_folder_paths.add(os.path.dirname(file_path))
+
+    with _lock:
+        folder_paths = list(_pending_folder_paths)
+        _pending_folder_paths.clear()
+
+    if not folder_paths or sync_file_systems(folder_paths):
+        return
+
+    # folders can't be opened to be synced on windows
+    if os.name != "nt":
+        for folder_path in folder_paths:
+            fsync_path(folder_path)
+
+
+def discard():
+    """
+    Removes the temporary files waiting for sync(), their files keep their
+    previous contents.
+    """
+
+    with _lock:
+        temp_file_paths = list(_pending_renames.values())
+        _pending_renames.clear()
+
+    for temp_file_path in temp_file_paths:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+
+
+@contextlib.contextmanager
+def deferred_renames():
+    """
+    Defers the renames of the files written in the block to sync(), see the
+    module docstring. The files still waiting when the block exits are synced,
+    or discarded if it raised, eg. when the run was interrupted.
+    """
+
+    global _defer_depth
+
+    _defer_depth += 1
+    try:
+        yield
+    except BaseException:
+        _defer_depth -= 1
+        if not _defer_depth:
+            discard()
+        raise
+    _defer_depth -= 1
+    if not _defer_depth:
+        sync()
+
@@ -0,0 +1,252 @@
+"""
+Benchmarks extract_python() on synthetic libraries, see synthetic_hda.
+
+The libraries are read with the native backend, so no houdini license is
+needed. Each run records the throughput (scripts/s, MB/s of libraries read)
+and the peak RSS, and appends them to a json history, so that runs of
+different commits can be compared:
+
+    python -m benchmark_extraction --libraries 20 --definitions 10 --parms 20 --history history.json
+"""
+
+import argparse
+import contextlib
+import datetime as dt
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import extract_python_from_otl
+import profiling
+import synthetic_hda
+
+try:
+    import resource
+except ImportError:
+    # not available on windows, the peak RSS isn't recorded
+    resource = None
+
+
+DEFAULT_HISTORY_FILE_NAME = "benchmark_history.json"
+
+
+def main():
+
+    args = parse_args()
+
+    shape = {"libraries": args.libraries,
+             "definitions": args.definitions,
+             "parms": args.parms,
+             "sections": args.sections,
+             "script_size": args.script_size,
+             "jobs": args.jobs}
+
+    results = run_benchmark(repeat=args.repeat, **shape)
+    entry = {"time": str(dt.datetime.now()),
+             "commit": get_commit(),
+             "python": platform.python_version(),
+             "shape": shape,
+             "results": results}
+
+    history = read_history(args.history)
+    print_results(entry, find_previous_entry(history, shape))
+
+    history.append(entry)
+    with open(args.history, "w") as file_obj:
+        json.dump(history, file_obj, indent=2)
+    print("Results appended to: {0}\n".format(args.history))
+
+
+def parse_args():
+    """
+    Parse args for the benchmark.
+    :return: args
+    """
+
+    parser = argparse.ArgumentParser(description="benchmarks the extraction on synthetic otls")
+    parser.add_argument("--libraries", type=int, default=10, help="Number of otls. Defaults to 10.")
+    parser.add_argument("--definitions", type=int, default=10, help="Hda definitions per otl. Defaults to 10.")
+    parser.add_argument("--parms", type=int, default=10, help="Parameters per definition. Defaults to 10.")
+    parser.add_argument("--sections", type=int, default=2, help="Python sections per definition. Defaults to 2.")
+    parser.add_argument("--script_size", type=int, default=1024,
+                        help="Size of each script in bytes. Defaults to 1024.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes. Defaults to 1.")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Number of runs, the fastest one is recorded. Defaults to 3.")
+    parser.add_argument("--history", type=str, default=DEFAULT_HISTORY_FILE_NAME,
+                        help="Json file the results are appended to. Defaults to {0}.".format(
+                            DEFAULT_HISTORY_FILE_NAME))
+
+    args = parser.parse_args()
+
+    for name in ("libraries", "definitions", "jobs", "repeat"):
+        if getattr(args, name) < 1:
+            parser.error("--{0} has to be at least 1.".format(name))
+    for name in ("parms", "sections", "script_size"):
+        if getattr(args, name) < 0:
+            parser.error("--{0} can't be negative.".format(name))
+
+    return args
+
+
+def run_benchmark(libraries, definitions, parms, sections, script_size, jobs=1, repeat=1):
+    """
+    Generates the synthetic otls in a temporary folder and extracts them.
+
+    Every run extracts into a new scripts folder, so nothing is skipped as unchanged.
+
+    :param int libraries: number of otls.
+    :param int definitions: hda definitions per otl.
+    :param int parms: parameters per definition.
+    :param int sections: python sections per definition.
+    :param int script_size: size of each script in bytes.
+    :param int jobs: number of worker processes.
+    :param int repeat: number of runs, the fastest one is recorded.
+    :return: dict {"wall", "scripts", "scripts_per_s", "library_mb", "mb_per_s", "peak_rss_mb"}
+    """
+
+    temp_folder_path = tempfile.mkdtemp(prefix="extract_python_benchmark_")
+    try:
+        file_paths = []
+        script_count = 0
+        library_size = 0
+        for index in range(libraries):
+            file_path = os.path.join(temp_folder_path, "synthetic_{0}.hda".format(index))
+            script_count += synthetic_hda.write_synthetic_library(file_path, definition_count=definitions,
+                                                                  parm_count=parms, section_count=sections,
+                                                                  script_size=script_size,
+                                                                  name="synthetic_{0}".format(index))
+            library_size += os.path.getsize(file_path)
+            file_paths.append(file_path)
+
+        wall = None
+        for run_index in range(repeat):
+            with suppress_stdout():
+                run_wall = time_extraction(file_paths, temp_folder_path, "run_{0}".format(run_index), jobs)
+            shutil.rmtree(os.path.join(temp_folder_path, "run_{0}".format(run_index)))
+            if wall is None or run_wall < wall:
+                wall = run_wall
+    finally:
+        shutil.rmtree(temp_folder_path)
+
+    library_mb = library_size / (1024.0 * 1024.0)
+    return {"wall": wall,
+            "scripts": script_count,
+            "scripts_per_s": script_count / wall if wall else None,
+            "library_mb": library_mb,
+            "mb_per_s": library_mb / wall if wall else None,
+            "peak_rss_mb": get_peak_rss_mb()}
+
+
+def time_extraction(file_paths, otls_folder_path, name, jobs):
+    """
+    :return: float wall time of extract_python() in seconds.
+    """
+
+    wall_start = profiling.wall_clock()
+    extract_python_from_otl.extract_python(file_paths, otls_folder_path, name, backend="native", jobs=jobs)
+    return profiling.wall_clock() - wall_start
+
+
+@contextlib.contextmanager
+def suppress_stdout():
+    """
+    Hides the status messages printed by the extraction.
+    """
+
+    stdout = sys.stdout
+    with open(os.devnull, "w") as devnull:
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = stdout
+
+
+def get_peak_rss_mb():
+    """
+    :return: float peak resident set size of this process and its finished
+             worker processes in MB, or None if it can't be read.
+    """
+
+    if resource is None:
+        return None
+
+    peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # bytes on mac, kilobytes elsewhere
+    if sys.platform == "darwin":
+        return peak_rss / (1024.0 * 1024.0)
+    return peak_rss / 1024.0
+
+
+def get_commit():
+    """
+    :return: str git commit of the tool, or None outside of a git checkout.
+    """
+
+    try:
+        with open(os.devnull, "w") as devnull:
+            output = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                             cwd=os.path.dirname(os.path.abspath(__file__)), stderr=devnull)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode("utf-8").strip()
+
+
+def read_history(history_file_path):
+    """
+    :param str history_file_path: path to the json history.
+    :return: list of the recorded entries, empty if there are none.
+    """
+
+    if not os.path.exists(history_file_path):
+        return []
+    with open(history_file_path, "r") as file_obj:
+        history = json.load(file_obj)
+    return history if isinstance(history, list) else []
+
+
+def find_previous_entry(history, shape):
+    """
+    :param list history: recorded entries.
+    :param dict shape: shape of the current run.
+    :return: dict the latest entry with the same shape, or None.
+    """
+
+    for entry in reversed(history):
+        if entry.get("shape") == shape:
+            return entry
+    return None
+
+
+def print_results(entry, previous_entry=None):
+    """
+    Prints the results of a run, compared to the previous run with the same shape.
+
+    :param dict entry: entry of the current run.
+    :param dict previous_entry: entry of the previous run, or None.
+    """
+
+    results = entry["results"]
+    print("{0} scripts from {1:.2f} MB of otls in {2:.3f} s".format(results["scripts"], results["library_mb"],
+                                                                    results["wall"]))
+
+    for key, label in (("scripts_per_s", "scripts/s"), ("mb_per_s", "MB/s"), ("peak_rss_mb", "peak RSS MB")):
+        value = results[key]
+        if value is None:
+            continue
+        line = "  {0:>12}: {1:12.2f}".format(label, value)
+        previous_value = previous_entry["results"].get(key) if previous_entry else None
+        if previous_value:
+            line += "  ({0:+.1f}% since {1})".format(100.0 * (value - previous_value) / previous_value,
+                                                    previous_entry.get("commit") or previous_entry["time"])
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
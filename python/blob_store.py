@@ -0,0 +1,171 @@
+"""
+Content addressed store of the scripts of a scripts folder, for --dedup.
+
+Every distinct script is written once, to blobs/<hash[:2]>/<hash>.py inside
+the scripts folder, where hash is the md5 of the script (the content_hash of
+the manifest.json entries). The script files in the hda folders are hardlinks
+to their blob. Where hardlinks can't be made, eg. across devices, the script
+file isn't written and its manifest.json entry holds the blob path instead:
+
+    "parameter_callbacks/button.py": {"size": 17, "content_hash": "6e62...", "blob": "blobs/6e/6e62....py"}
+"""
+
+import json
+import os
+
+import atomic_writes
+
+
+BLOBS_FOLDER_NAME = "blobs"
+
+
+class BlobStore(object):
+    """
+    Usage:
+        blob_store = BlobStore(scripts_folder_path)
+        blob_reference = blob_store.place(script, content_hash, script_file_path)
+        report = blob_store.make_report()
+    """
+
+    def __init__(self, scripts_folder_path):
+        """
+        :param str scripts_folder_path: path to the generated scripts-folder.
+        """
+
+        self.scripts_folder_path = scripts_folder_path
+        self.blobs_folder_path = os.path.join(scripts_folder_path, BLOBS_FOLDER_NAME)
+
+    def get_blob_reference(self, content_hash):
+        """
+        :param str content_hash: md5 of the script.
+        :return: str "/" separated path of the blob, relative to the scripts folder.
+        """
+
+        return "{0}/{1}/{2}.py".format(BLOBS_FOLDER_NAME, content_hash[:2], content_hash)
+
+    def get_blob_path(self, content_hash):
+        """
+        :param str content_hash: md5 of the script.
+        :return: str path to the blob.
+        """
+
+        return os.path.join(self.blobs_folder_path, content_hash[:2], content_hash + ".py")
+
+    def write_blob(self, script, content_hash):
+        """
+        Writes the blob of a script, unless it already exists.
+
+        :param str script: python script.
+        :param str content_hash: md5 of the script.
+        :return: str path to the blob.
+        """
+
+        blob_path = self.get_blob_path(content_hash)
+        if os.path.exists(blob_path):
+            return blob_path
+
+        blob_folder_path = os.path.dirname(blob_path)
+        try:
+            os.makedirs(blob_folder_path)
+        except OSError:
+            # created by another worker in the meantime
+            if not os.path.isdir(blob_folder_path):
+                raise
+
+        # another worker can write the same blob, the rename replaces it with the same contents.
+        # Not deferred, the script file is linked to it right away
+        atomic_writes.write_file(blob_path, script, unique=True, defer=False)
+        return blob_path
+
+    def place(self, script, content_hash, script_file_path):
+        """
+        Writes the blob of a script and hardlinks the script file to it.
+
+        :param str script: python script.
+        :param str content_hash: md5 of the script.
+        :param str script_file_path: path of the script in its hda folder.
+        :return: str blob reference for the manifest.json entry when the
+                 script file couldn't be linked, None once it is linked.
+        """
+
+        blob_path = self.write_blob(script, content_hash)
+
+        if os.path.lexists(script_file_path):
+            os.remove(script_file_path)
+
+        try:
+            os.link(blob_path, script_file_path)
+        except (OSError, AttributeError):
+            # AttributeError: no os.link on windows with python 2
+            return self.get_blob_reference(content_hash)
+        return None
+
+    def has_blob(self, content_hash):
+        """
+        :param str content_hash: md5 of the script.
+        :return: bool True if the blob exists.
+        """
+
+        return os.path.exists(self.get_blob_path(content_hash))
+
+    def make_report(self, remove_unused=True):
+        """
+        Adds up the scripts of every manifest.json in the scripts folder, and
+        removes the blobs that none of them use anymore.
+
+        :param bool remove_unused: remove the blobs no script uses.
+        :return: dict {"scripts": number of scripts, "unique_scripts": number of blobs used,
+                       "size": size of all the scripts, "stored_size": size of the blobs used,
+                       "dedup_ratio": size / stored_size}
+        """
+
+        script_count = 0
+        total_size = 0
+        content_hashes = set()
+
+        for manifest_file_path in self.iter_manifest_file_paths():
+            try:
+                with open(manifest_file_path, "r") as file_obj:
+                    manifest = json.load(file_obj)
+            except ValueError:
+                continue
+            for manifest_entry in manifest.values():
+                script_count += 1
+                total_size += manifest_entry.get("size", 0)
+                content_hashes.add(manifest_entry.get("content_hash"))
+
+        stored_size = 0
+        if os.path.isdir(self.blobs_folder_path):
+            for folder_name in os.listdir(self.blobs_folder_path):
+                folder_path = os.path.join(self.blobs_folder_path, folder_name)
+                for file_name in os.listdir(folder_path):
+                    blob_path = os.path.join(folder_path, file_name)
+                    content_hash = file_name.split(".")[0]
+                    if file_name.endswith(".tmp"):
+                        # left by a worker that died
+                        if remove_unused:
+                            os.remove(blob_path)
+                    elif content_hash in content_hashes:
+                        stored_size += os.path.getsize(blob_path)
+                    elif remove_unused:
+                        os.remove(blob_path)
+
+        return {"scripts": script_count,
+                "unique_scripts": len(content_hashes),
+                "size": total_size,
+                "stored_size": stored_size,
+                "dedup_ratio": float(total_size) / stored_size if stored_size else None}
+
+    def iter_manifest_file_paths(self):
+        """
+        :return: generator of the paths of the manifest.json files of the hda folders.
+        """
+
+        for otl_folder_name in os.listdir(self.scripts_folder_path):
+            otl_folder_path = os.path.join(self.scripts_folder_path, otl_folder_name)
+            if otl_folder_name == BLOBS_FOLDER_NAME or not os.path.isdir(otl_folder_path):
+                continue
+            for hda_folder_name in os.listdir(otl_folder_path):
+                manifest_file_path = os.path.join(otl_folder_path, hda_folder_name, "manifest.json")
+                if os.path.exists(manifest_file_path):
+                    yield manifest_file_path
@@ -1,231 +1,1941 @@
-import hou
 import argparse
+import fnmatch
+import functools
+import itertools
+import re
 import shutil
 import os
+import sys
 import hashlib
 import json
+import multiprocessing
+import time
 import datetime as dt
 
+try:
+    import resource
+except ImportError:
+    # windows, --memory_limit isn't applied
+    resource = None
+
+try:
+    from os import scandir
+except ImportError:
+    # python 2, the scandir backport if it's installed
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+import atomic_writes
+import hda_reader
+import node_contents
+import output_sinks
+import profiling
+import blob_store
+import file_hashes
+import run_journal
+import script_cache
+import script_filters
+import snapshot_diff
+import writer_pool
+
+try:
+    import hou
+    HOU_AVAILABLE = True
+except ImportError:
+    # Outside of hython only the native backend can be used. hda_reader
+    # provides the hou.Error and hou.scriptLanguage names the extraction relies on.
+    import hda_reader as hou
+    HOU_AVAILABLE = False
+
+# "hou" installs each otl into the houdini session, "native" reads the otl
+# files directly with hda_reader.
+BACKENDS = ("hou", "native")
+DEFAULT_BACKEND = "hou" if HOU_AVAILABLE else "native"
+
+# kinds of extracted python scripts, named after the folders they are written to
+MAIN_PYTHON_SCRIPTS = "main_python_scripts"
+PARAMETER_CALLBACKS = "parameter_callbacks"
+ITEM_GENERATION_SCRIPTS = "item_generation_scripts"
+ACTION_BUTTON_SCRIPTS = "action_button_scripts"
+DEFAULT_EXPRESSIONS = "default_expressions"
+NODE_SCRIPTS = "node_scripts"
+NODE_EXPRESSIONS = "node_expressions"
+SHELF_TOOL_SCRIPTS = "shelf_tool_scripts"
+# kinds of scripts found in the parm templates
+PARM_TEMPLATE_SCRIPT_KINDS = (PARAMETER_CALLBACKS, ITEM_GENERATION_SCRIPTS, ACTION_BUTTON_SCRIPTS, DEFAULT_EXPRESSIONS)
+# kinds of scripts found in the Contents and Tools.shelf sections, only extracted when selected, see --contents
+CONTENTS_SCRIPT_KINDS = (NODE_SCRIPTS, NODE_EXPRESSIONS, SHELF_TOOL_SCRIPTS)
+
+# kinds extracted when no other kinds are selected
+DEFAULT_SCRIPT_KINDS = (MAIN_PYTHON_SCRIPTS, PARAMETER_CALLBACKS, ITEM_GENERATION_SCRIPTS, ACTION_BUTTON_SCRIPTS,
+                        DEFAULT_EXPRESSIONS)
+SCRIPT_KINDS = DEFAULT_SCRIPT_KINDS + CONTENTS_SCRIPT_KINDS
+
+# kinds whose file names are made unique with a hash, the names of their
+# scripts are kept in a log.json in their folder
+NAMED_SCRIPT_KINDS = (MAIN_PYTHON_SCRIPTS,) + CONTENTS_SCRIPT_KINDS
+
+# otl file names found by --scan, unless other --include globs are given
+DEFAULT_SCAN_INCLUDE = ("*.hda", "*.otl", "*.otllc")
+
+# otls per worker batch when the otl paths are streamed, eg. from --scan
+STREAM_BATCH_SIZE = 4
+
+# status of the otls whose isolated extraction failed, in the log.json, see extract_py_from_otl_isolated()
+STATUS_ERROR = "error"
+STATUS_CRASHED = "crashed"
+STATUS_TIMEOUT = "timeout"
+
+# seconds between two checks of the isolated workers, on python 2
+ISOLATED_POLL_INTERVAL = 0.05
+
+# command line options that only apply to a scripts folder extracted once,
+# and the options for the other modes they can't be used with
+FOLDER_ONLY_OPTIONS = ("dedup", "isolate", "timeout", "memory_limit", "resume", "write_threads")
+OTHER_MODE_OPTIONS = ("watch", "archive", "jsonl", "materialize", "serve")
+
+# parm templates that can hold an item generation script, a default
+# expression, or other parm templates
+if HOU_AVAILABLE:
+    ITEM_GENERATION_PARM_TEMPLATES = (hou.StringParmTemplate, hou.MenuParmTemplate, hou.IntParmTemplate,
+                                      hda_reader.ParmTemplate)
+    DEFAULT_EXPRESSION_PARM_TEMPLATES = (hou.StringParmTemplate, hou.IntParmTemplate, hou.FloatParmTemplate,
+                                         hda_reader.ParmTemplate)
+    FOLDER_PARM_TEMPLATES = (hou.FolderParmTemplate, hda_reader.ParmTemplate)
+else:
+    ITEM_GENERATION_PARM_TEMPLATES = (hda_reader.ParmTemplate,)
+    DEFAULT_EXPRESSION_PARM_TEMPLATES = (hda_reader.ParmTemplate,)
+    FOLDER_PARM_TEMPLATES = (hda_reader.ParmTemplate,)
+
 
 def main():
 
-    args = parse_args()
+    args = parse_args()
+
+    if args.diff:
+        try:
+            snapshot_diff.write_diff(args.diff[0], args.diff[1], sys.stdout, diff_format=args.diff_format)
+        except ValueError as exc:
+            sys.exit("error: {0}".format(exc))
+        return
+
+    cache = None
+    if args.cache_dir:
+        cache = script_cache.ScriptCache(args.cache_dir, max_size=args.cache_size * 1024 * 1024)
+
+    kinds = args.kind
+    if args.contents:
+        kinds = list(args.kind or DEFAULT_SCRIPT_KINDS) + list(CONTENTS_SCRIPT_KINDS)
+
+    script_filter = None
+    if args.node_type or args.section or kinds or args.min_version or args.max_version:
+        script_filter = script_filters.ScriptFilter(node_types=args.node_type, section_pattern=args.section,
+                                                    kinds=kinds, min_version=args.min_version,
+                                                    max_version=args.max_version)
+
+    if args.serve:
+        # imported here, it imports this module
+        import extraction_server
+        try:
+            extraction_server.serve(args.serve, cache=cache)
+        except ValueError as exc:
+            sys.exit("error: {0}".format(exc))
+        return
+
+    if args.directory:
+        otls_folder_path = args.directory
+
+    # if text file is given, default output folder is the same is the text file,
+    # else it is the current working directory
+    else:
+        if args.otl_paths_file:
+            otls_folder_path = os.path.dirname(args.otl_paths_file)
+        else:
+            # the olts_folder_path is the same as the text file.
+            otls_folder_path = os.getcwd()
+
+    if args.name:
+        folder_name = args.name
+    else:
+        folder_name = "otl_python_scripts"
+
+    if args.otl_paths_file:
+        txt_file_path = args.otl_paths_file
+
+        # access individual paths from .txt file
+        otl_file_paths = read_otl_paths_file(txt_file_path)
+
+        print("\n\nGiven text file path: {0}\n\n".format(txt_file_path))
+
+    else:
+        # args.otl arg is provided instead of a list of otl pathways
+        otl_file_paths = args.otl or []
+
+    if args.watch:
+        # imported here, it imports this module
+        import otl_watcher
+        otl_watcher.watch(otl_file_paths, otls_folder_path, folder_name, scan_folder_paths=args.scan or (),
+                          include=args.include or DEFAULT_SCAN_INCLUDE, exclude=args.exclude or (),
+                          backend=args.backend, check_hash=args.check_hash, cache=cache, debounce=args.debounce,
+                          script_filter=script_filter)
+        return
+
+    if args.scan:
+        # the otls found are extracted while the folders are still being scanned
+        otl_file_paths = itertools.chain(otl_file_paths,
+                                         scan_otl_paths(args.scan, include=args.include or DEFAULT_SCAN_INCLUDE,
+                                                        exclude=args.exclude or ()))
+
+    if args.materialize:
+        file_count = output_sinks.materialize_archive(args.materialize, otls_folder_path)
+        print("{0} files written to: {1}\n\n".format(file_count, otls_folder_path))
+    elif args.archive:
+        extract_python_to_archive(otl_file_paths, args.archive, folder_name, backend=args.backend,
+                                  script_filter=script_filter)
+    elif args.jsonl:
+        if args.jsonl == "-":
+            # keep the record stream clean, status messages go to stderr
+            jsonl_file_obj = sys.stdout
+            sys.stdout = sys.stderr
+            extract_python_jsonl(otl_file_paths, jsonl_file_obj, backend=args.backend, script_filter=script_filter)
+        else:
+            with open(args.jsonl, "w") as jsonl_file_obj:
+                extract_python_jsonl(otl_file_paths, jsonl_file_obj, backend=args.backend,
+                                     script_filter=script_filter)
+    else:
+        extract_python(otl_file_paths, otls_folder_path, folder_name, backend=args.backend, jobs=args.jobs,
+                       check_hash=args.check_hash, cache=cache, profile=args.profile, dedup=args.dedup,
+                       script_filter=script_filter, isolate=args.isolate or args.timeout is not None
+                       or args.memory_limit is not None, timeout=args.timeout,
+                       memory_limit=args.memory_limit * 1024 * 1024 if args.memory_limit is not None else None,
+                       resume=args.resume, hash_algorithm=args.hash_algorithm, write_threads=args.write_threads)
+    print("Script ran successfully\n\n")
+
+
+def parse_args():
+    """
+    Parse args for the tool.
+    :return: args
+    """
+
+    parser = argparse.ArgumentParser(description="extracts python scripts from a given list of otls")
+    # text file input
+    parser.add_argument("-f", "--otl_paths_file", type=str,
+                        help="A file with a list of otl pathways.")
+    # otl input
+    parser.add_argument("-o", "--otl", type=str, nargs='*',
+                        help="Pathway to an otl(s).")
+    # folder scan input
+    parser.add_argument("--scan", type=str, nargs="+",
+                        help="Folder(s) searched recursively for otls.")
+    parser.add_argument("--include", type=str, action="append",
+                        help="File name glob of the otls found by --scan, can be given more than "
+                             "once. Defaults to {0}.".format(", ".join(DEFAULT_SCAN_INCLUDE)))
+    parser.add_argument("--exclude", type=str, action="append",
+                        help="Glob of the file or folder names, or paths relative to the scanned folder, "
+                             "skipped by --scan. Can be given more than once.")
+    # filters
+    parser.add_argument("--node_type", type=str, action="append",
+                        help="Glob of the 'Category/node_type_name' of the hdas extracted, eg. 'Sop/*'. "
+                             "Can be given more than once.")
+    parser.add_argument("--section", type=str,
+                        help="Regular expression searched in the names of the python sections extracted, "
+                             "eg. '^PythonModule$'.")
+    parser.add_argument("--kind", type=str, action="append", choices=SCRIPT_KINDS,
+                        help="Kind of scripts extracted, can be given more than once. Defaults to all of "
+                             "them but {0}.".format(", ".join(CONTENTS_SCRIPT_KINDS)))
+    parser.add_argument("--contents", action="store_true",
+                        help="Also extract the python inside the asset networks and shelf tools: the code of "
+                             "python nodes, python channel expressions and python shelf tools, "
+                             "see node_contents.")
+    parser.add_argument("--min_version", type=str,
+                        help="Lowest version of the hdas extracted, from the namespaced node type name "
+                             "(eg. 'mycompany::sky_scraper::2.0') or the definition version.")
+    parser.add_argument("--max_version", type=str,
+                        help="Highest version of the hdas extracted, see --min_version.")
+    # folder name input
+    parser.add_argument("-n", "--name", type=str, default="otl_scripts_folder", help="Name of the generated "
+                                                                                     "scripts folder.")
+    # output_folder input
+    parser.add_argument("-d", "--directory", type=str, help="An output_folder for the generated scripts folder.")
+    # backend input
+    parser.add_argument("-b", "--backend", type=str, choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="'hou' installs the otls into houdini, 'native' reads the otl files directly "
+                             "without houdini. Defaults to '{0}'.".format(DEFAULT_BACKEND))
+    # number of worker processes
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of worker processes the otls are shared between. Defaults to 1.")
+    # background writes
+    parser.add_argument("--write_threads", type=int, default=0,
+                        help="Number of threads writing the scripts of each process in the background, while "
+                             "the hda definitions are walked. Helps on network file systems. Defaults to 0, "
+                             "the scripts are written as they are extracted.")
+    # incremental check input
+    parser.add_argument("--check_hash", action="store_true",
+                        help="Compare the otl contents instead of their size and last modified time "
+                             "to skip otls that haven't changed since the previous run.")
+    parser.add_argument("--hash_algorithm", type=str, choices=file_hashes.HASH_ALGORITHMS,
+                        default=file_hashes.DEFAULT_HASH_ALGORITHM,
+                        help="Hash of the otl contents with --check_hash or --cache_dir. crc32 and xxh64 (with the "
+                             "xxhash package) are faster than md5, crc32 can't be used with --cache_dir. "
+                             "Defaults to '{0}'.".format(
+                            file_hashes.DEFAULT_HASH_ALGORITHM))
+    # script cache
+    parser.add_argument("--cache_dir", type=str, default=os.environ.get(script_cache.CACHE_DIR_ENV),
+                        help="Directory of a cache of the extracted scripts, shared between runs, so that otls "
+                             "extracted before are written without being loaded. Defaults to the {0} "
+                             "environment variable.".format(script_cache.CACHE_DIR_ENV))
+    parser.add_argument("--cache_size", type=int, default=script_cache.DEFAULT_CACHE_SIZE_MB,
+                        help="Size limit of the cache in MB, the least recently used otls are removed "
+                             "above it. Defaults to {0}.".format(script_cache.DEFAULT_CACHE_SIZE_MB))
+    # content addressed scripts
+    parser.add_argument("--dedup", action="store_true",
+                        help="Store each distinct script once in a blobs folder inside the scripts folder, the "
+                             "script files are hardlinks to it. The dedup ratio is written to a dedup.json.")
+    # fault isolation
+    parser.add_argument("--isolate", action="store_true",
+                        help="Extract each otl in its own child process, -j of them at a time. An otl that "
+                             "crashes, fails or times out is logged with an error status in the log.json, "
+                             "and the run goes on.")
+    parser.add_argument("--timeout", type=float,
+                        help="Seconds an otl can take before its child process is killed, implies --isolate.")
+    parser.add_argument("--memory_limit", type=int,
+                        help="Memory limit of each child process in MB (address space, not on windows), "
+                             "implies --isolate.")
+    # resumable runs
+    parser.add_argument("--resume", action="store_true",
+                        help="Go on with an interrupted run of the same command, the otls it finished are "
+                             "skipped unless they changed since. They are read from the {0} written "
+                             "to the scripts folder as each otl is done, and removed once the run is "
+                             "complete.".format(run_journal.JOURNAL_FILE_NAME))
+    # profiling
+    parser.add_argument("--profile", type=int, nargs="?", const=10,
+                        help="Time each phase of the extraction per otl and hda, write it to a profile.json "
+                             "next to the log.json and print the given number of slowest otls (default 10).")
+    # watch mode
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and extract the otls again whenever they change.")
+    parser.add_argument("--debounce", type=float, default=1.0,
+                        help="With --watch, seconds without new changes before the changed otls are "
+                             "extracted. Defaults to 1.")
+    # server mode
+    parser.add_argument("--serve", type=str,
+                        help="Keep running and handle extraction requests sent to this Unix socket path, "
+                             "or [host:]port on localhost (loopback hosts only), where requests have to send "
+                             "the server's token. See extraction_server.")
+    # comparison of two scripts folders
+    parser.add_argument("--diff", type=str, nargs=2, metavar=("OLD", "NEW"),
+                        help="Print the scripts added, removed or modified between two scripts folders, "
+                             "from their manifest.json files, instead of extracting.")
+    parser.add_argument("--diff_format", type=str, choices=snapshot_diff.DIFF_FORMATS, default="json",
+                        help="'json' report per otl and hda, or 'unified' diff of the changed scripts. "
+                             "Defaults to 'json'.")
+    # archive output
+    parser.add_argument("--archive", type=str,
+                        help="Write the scripts folder into a single archive instead of the disk. The "
+                             "extension sets the type: {0}.".format(", ".join(output_sinks.ARCHIVE_EXTENSIONS)))
+    # archive to folder tree
+    parser.add_argument("--materialize", type=str,
+                        help="Write the scripts folder stored in this archive to the output directory.")
+    # jsonl output
+    parser.add_argument("--jsonl", type=str,
+                        help="Stream the scripts as json records, one per line, to this file ('-' for stdout) "
+                             "instead of generating the scripts folder.")
+
+    # parse args
+    args = parser.parse_args()
+
+    if args.diff:
+        return args
+
+    if not args.otl_paths_file and not args.otl and not args.scan and not args.materialize and not args.serve:
+        parser.error("provide a text file, a specific otl path or a folder to scan to generate the scripts folder.")
+
+    if args.backend == "hou" and not HOU_AVAILABLE:
+        parser.error("the hou backend needs to be run from hython, use '--backend native' instead.")
+
+    if args.archive:
+        try:
+            output_sinks.get_archive_type(args.archive)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    if args.jobs < 1:
+        parser.error("--jobs has to be at least 1.")
+
+    if args.watch and (args.archive or args.jsonl or args.materialize or args.serve):
+        parser.error("--watch only updates a scripts folder, it can't be used with "
+                     "--archive, --jsonl, --materialize or --serve.")
+
+    if args.section is not None:
+        try:
+            re.compile(args.section)
+        except re.error as exc:
+            parser.error("--section isn't a valid regular expression: {0}".format(exc))
+
+    if (args.node_type or args.section or args.kind or args.contents or args.min_version or args.max_version) \
+            and args.serve:
+        parser.error("the filters can't be used with --serve.")
+
+    if args.debounce < 0:
+        parser.error("--debounce can't be negative.")
+
+    if args.cache_size < 0:
+        parser.error("--cache_size can't be negative.")
+
+    if args.timeout is not None and args.timeout <= 0:
+        parser.error("--timeout has to be positive.")
+
+    if args.memory_limit is not None and args.memory_limit <= 0:
+        parser.error("--memory_limit has to be positive.")
+
+    if args.write_threads < 0:
+        parser.error("--write_threads can't be negative.")
+
+    folder_only_options = ["--" + name for name in FOLDER_ONLY_OPTIONS if getattr(args, name) not in (None, False, 0)]
+    other_mode_options = ["--" + name for name in OTHER_MODE_OPTIONS if getattr(args, name)]
+    if folder_only_options and other_mode_options:
+        parser.error("{0} can only be used for a scripts folder extracted once, not with {1}.".format(
+            ", ".join(folder_only_options), ", ".join(other_mode_options)))
+
+    if args.hash_algorithm == file_hashes.XXH64 and file_hashes.xxhash is None:
+        parser.error("--hash_algorithm xxh64 needs the xxhash package.")
+
+    if args.cache_dir and args.hash_algorithm not in file_hashes.CACHE_KEY_ALGORITHMS:
+        parser.error("--hash_algorithm {0} is too short to key the script cache, use {1} with --cache_dir.".format(
+            args.hash_algorithm, " or ".join(file_hashes.CACHE_KEY_ALGORITHMS)))
+
+    if args.profile is not None and args.profile < 0:
+        parser.error("--profile can't be negative.")
+
+    return args
+
+
+def read_otl_paths_file(txt_file_path):
+    """
+    Reads a file with one otl path per line. Paths can contain spaces, empty
+    lines are skipped.
+
+    :param str txt_file_path: path to the text file.
+    :return: list of otl paths.
+    """
+
+    with open(txt_file_path, 'r') as file_obj:
+        return [line.strip() for line in file_obj if line.strip()]
+
+
+def scan_otl_paths(folder_paths, include=DEFAULT_SCAN_INCLUDE, exclude=()):
+    """
+    Walks folders recursively and yields the otls inside them, as they are
+    found. Symlinks are followed, and files or folders reached through several
+    paths are only visited once.
+
+    :param list folder_paths: folders to scan.
+    :param include: file name globs of the otls.
+    :param exclude: globs of the file or folder names, or of their paths
+                    relative to the scanned folder ("/" separated), to skip.
+    :return: generator of otl paths.
+    """
+
+    # (device, inode) of the files and folders already visited
+    seen_inodes = set()
+
+    for root_folder_path in folder_paths:
+        if not os.path.isdir(root_folder_path):
+            print("folder not valid, continuing to other folders: {0}\n\n".format(root_folder_path))
+            continue
+
+        folder_stack = [(root_folder_path, "")]
+        while folder_stack:
+            folder_path, relative_folder_path = folder_stack.pop()
+
+            try:
+                stat_result = os.stat(folder_path)
+            except OSError:
+                continue
+            inode = (stat_result.st_dev, stat_result.st_ino)
+            if inode in seen_inodes:
+                continue
+            seen_inodes.add(inode)
+
+            sub_folders = []
+            try:
+                for name, entry_path, is_folder in iter_folder_entries(folder_path):
+                    relative_path = relative_folder_path + name
+                    if is_excluded(name, relative_path, exclude):
+                        continue
+
+                    if is_folder:
+                        sub_folders.append((entry_path, relative_path + "/"))
+                        continue
+
+                    if not any(fnmatch.fnmatch(name, pattern) for pattern in include):
+                        continue
+
+                    try:
+                        stat_result = os.stat(entry_path)
+                    except OSError:
+                        # broken symlink
+                        continue
+                    inode = (stat_result.st_dev, stat_result.st_ino)
+                    if inode not in seen_inodes:
+                        seen_inodes.add(inode)
+                        yield entry_path
+            except OSError:
+                print("Could not scan folder: {0}\n\n".format(folder_path))
+
+            # depth first, in the order the folders were listed
+            folder_stack.extend(reversed(sub_folders))
+
+
+def iter_folder_entries(folder_path):
+    """
+    :param str folder_path: folder to list.
+    :return: generator of (name, path, is_folder) tuples, following symlinks.
+    """
+
+    if scandir is not None:
+        for entry in scandir(folder_path):
+            try:
+                is_folder = entry.is_dir()
+            except OSError:
+                is_folder = False
+            yield entry.name, entry.path, is_folder
+        return
+
+    for name in os.listdir(folder_path):
+        entry_path = os.path.join(folder_path, name)
+        yield name, entry_path, os.path.isdir(entry_path)
+
+
+def is_excluded(name, relative_path, exclude):
+    """
+    :param str name: file or folder name.
+    :param str relative_path: "/" separated path relative to the scanned folder.
+    :param exclude: globs of the names or relative paths to skip.
+    :return: bool True if the file or folder is skipped.
+    """
+
+    for pattern in exclude:
+        if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern):
+            return True
+    return False
+
+
+def extract_python(file_paths, otls_folder_path, name, backend=DEFAULT_BACKEND, jobs=1, check_hash=False,
+                   cache=None, profile=None, dedup=False, script_filter=None, isolate=False, timeout=None,
+                   memory_limit=None, resume=False, hash_algorithm=file_hashes.DEFAULT_HASH_ALGORITHM,
+                   write_threads=0):
+    """
+    function to iterate through all the otls and extract all python scripts inside.
+
+    :param list file_paths: a list of pathways to otls.
+    :param str otls_folder_path: Parent directory of the scripts-folder.
+    :param str name: name of the generated folder.
+    :param str backend: "hou" or "native", see BACKENDS.
+    :param int jobs: number of worker processes, 1 extracts in the current process.
+    :param bool check_hash: compare otl contents to find the otls that haven't changed since the previous run.
+    :param <script_cache.ScriptCache> cache: cache of the scripts extracted from each otl, or None.
+    :param int profile: if given, the run is profiled into a profile.json next to
+                        the log.json, and this number of slowest otls is printed.
+    :param bool dedup: store each distinct script once, see blob_store. The dedup
+                       report is written to a dedup.json next to the log.json.
+    :param <script_filters.ScriptFilter> script_filter: if given, only the hdas and scripts it selects are extracted.
+    :param bool isolate: extract each otl in its own child process, see extract_py_from_otl_isolated().
+    :param float timeout: with isolate, seconds an otl can take before its child is killed.
+    :param int memory_limit: with isolate, address space limit of each child in bytes.
+    :param bool resume: go on with an interrupted run, the otls in its journal are
+                        skipped unless they changed since, see run_journal.
+    :param str hash_algorithm: hash of the otl contents, with check_hash or a cache, see file_hashes.
+                               With a cache, one of file_hashes.CACHE_KEY_ALGORITHMS.
+                               The hashes are memoized in a hashes.json next to the log.json.
+    :param int write_threads: number of threads writing the scripts of each process
+                              in the background, see extract_py_from_otl().
+    """
+
+    if cache is not None and hash_algorithm not in file_hashes.CACHE_KEY_ALGORITHMS:
+        raise ValueError("the {0} hash can't key the script cache".format(hash_algorithm))
+
+    # create a folder to store the scripts
+    scripts_folder_path = os.path.join(otls_folder_path, name)
+
+    if not os.path.exists(scripts_folder_path):
+        os.mkdir(scripts_folder_path)
+
+    # log of the previous run, used to skip the otls that haven't changed
+    older_otl_hash_dict = read_otl_log(scripts_folder_path)
+
+    # the otls finished by the interrupted run are skipped the same way
+    journal_file_path = os.path.join(scripts_folder_path, run_journal.JOURNAL_FILE_NAME)
+    if resume:
+        journaled_otl_hash_dict = run_journal.read_journal(journal_file_path)
+        print("Resuming the run, {0} otls journaled\n\n".format(len(journaled_otl_hash_dict)))
+        older_otl_hash_dict.update(journaled_otl_hash_dict)
+
+    store = blob_store.BlobStore(scripts_folder_path) if dedup else None
+
+    # otls which weren't touched since they were hashed aren't read again
+    hash_memo = None
+    if check_hash or cache is not None:
+        hash_memo = file_hashes.HashMemo.load(os.path.join(scripts_folder_path, file_hashes.MEMO_FILE_NAME),
+                                              algorithm=hash_algorithm)
+
+    if profile is not None:
+        profiler = profiling.enable()
+        wall_start = profiling.wall_clock()
+        cpu_start = profiling.cpu_clock()
+
+    # Function to iterate through all the hdas inside each otl to
+    # extract python scripts. It returns a dict containing the unique
+    # names, file path and the last modified time of each otl.
+    with run_journal.RunJournal(journal_file_path, resume=resume) as journal:
+        if isolate:
+            otl_hash_dict = extract_py_from_otl_isolated(file_paths, scripts_folder_path, backend=backend, jobs=jobs,
+                                                         older_otl_hash_dict=older_otl_hash_dict,
+                                                         check_hash=check_hash, cache=cache,
+                                                         profile=profile is not None, blob_store=store,
+                                                         script_filter=script_filter, timeout=timeout,
+                                                         memory_limit=memory_limit, journal=journal,
+                                                         hash_memo=hash_memo, write_threads=write_threads)
+        elif jobs > 1:
+            otl_hash_dict = extract_py_from_otl_parallel(file_paths, scripts_folder_path, backend=backend, jobs=jobs,
+                                                         older_otl_hash_dict=older_otl_hash_dict,
+                                                         check_hash=check_hash, cache=cache,
+                                                         profile=profile is not None, blob_store=store,
+                                                         script_filter=script_filter, journal=journal,
+                                                         hash_memo=hash_memo, write_threads=write_threads)
+        else:
+            otl_hash_dict = extract_py_from_otl(file_paths, scripts_folder_path, backend=backend,
+                                                older_otl_hash_dict=older_otl_hash_dict, check_hash=check_hash,
+                                                cache=cache, blob_store=store, script_filter=script_filter,
+                                                journal=journal, hash_memo=hash_memo, write_threads=write_threads)
+
+    if cache is not None:
+        cache.evict()
+
+    print("{0} folder generated at: {1}\n\n".format(name, otls_folder_path))
+
+    write_json_atomic(os.path.join(scripts_folder_path, "log.json"), otl_hash_dict)
+
+    if hash_memo is not None:
+        hash_memo.save(file_dict["file_path"] for file_dict in otl_hash_dict.values())
+
+    if store is not None:
+        write_dedup_report(store, os.path.join(scripts_folder_path, "dedup.json"))
+
+    if profile is not None:
+        profiling.disable()
+        write_profile(profiler, os.path.join(scripts_folder_path, "profile.json"),
+                      profiling.wall_clock() - wall_start, profiling.cpu_clock() - cpu_start, profile)
+
+    atomic_writes.sync()
+
+    # the log.json is on disk, the run doesn't need to be resumed
+    run_journal.remove_journal(journal_file_path)
+
+
+def write_profile(profiler, profile_file_path, wall, cpu, top_count):
+    """
+    Writes the profile of a run and prints its slowest otls.
+
+    :param <profiling.Profiler> profiler: profiler of the run.
+    :param str profile_file_path: path to the profile.json file.
+    :param float wall: wall time of the whole run, in seconds.
+    :param float cpu: CPU time of the main process, in seconds.
+    :param int top_count: number of slowest otls printed.
+    """
+
+    profile_dict = profiler.to_dict()
+    profile_dict["total"] = {"wall": wall, "cpu": cpu}
+
+    atomic_writes.write_json(profile_file_path, profile_dict, sort_keys=True)
+
+    slowest_libraries = profiler.slowest_libraries(top_count)
+    if slowest_libraries:
+        print("Slowest otls (wall / cpu seconds):")
+        for file_path, library_wall, library_cpu in slowest_libraries:
+            print("  {0:9.3f} {1:9.3f}  {2}".format(library_wall, library_cpu, file_path))
+        print("")
+    print("Profile written to: {0}\n\n".format(profile_file_path))
+
+
+def write_dedup_report(store, report_file_path):
+    """
+    Writes and prints the dedup report of a run, and removes the blobs no script uses anymore.
+
+    :param <blob_store.BlobStore> store: blob store of the run.
+    :param str report_file_path: path to the dedup.json file.
+    """
+
+    report = store.make_report()
+
+    atomic_writes.write_json(report_file_path, report, sort_keys=True)
+
+    if report["dedup_ratio"] is not None:
+        print("Deduplicated {0} scripts into {1} blobs, {2} bytes stored for {3} bytes "
+              "of scripts (dedup ratio {4:.2f})\n\n".format(report["scripts"], report["unique_scripts"],
+                                                            report["stored_size"], report["size"],
+                                                            report["dedup_ratio"]))
+
+
+def extract_py_from_otl_parallel(file_paths, scripts_folder_path, backend=DEFAULT_BACKEND, jobs=2,
+                                 older_otl_hash_dict=None, check_hash=False, cache=None, profile=False,
+                                 blob_store=None, script_filter=None, journal=None, hash_memo=None,
+                                 write_threads=0):
+    """
+    Extracts all the python scripts inside each otl, sharing the otls between worker processes.
+
+    The otls are split into small consecutive batches, each worker runs
+    extract_py_from_otl() on one batch at a time and the results are merged
+    in the order of file_paths, so the output is the same as a serial run.
+
+    :param file_paths: list of all the otl paths. Other iterables, eg. from
+                       scan_otl_paths(), are sent to the workers as they come.
+    :param str scripts_folder_path: path to the generated scripts-folder.
+    :param str backend: "hou" or "native", see BACKENDS.
+    :param int jobs: number of worker processes.
+    :param dict older_otl_hash_dict: see extract_py_from_otl()
+    :param bool check_hash: see extract_py_from_otl()
+    :param <script_cache.ScriptCache> cache: see extract_py_from_otl()
+    :param bool profile: profile the workers, their profiles are merged into the enabled profiler.
+    :param <blob_store.BlobStore> blob_store: see extract_py_from_otl()
+    :param <script_filters.ScriptFilter> script_filter: see extract_py_from_otl()
+    :param journal: see extract_py_from_otl(), the otls of a batch are journaled once the batch is done.
+    :param <file_hashes.HashMemo> hash_memo: see extract_py_from_otl(), the hashes of the workers are merged into it.
+    :param int write_threads: see extract_py_from_otl(), per worker.
+    :return: dict otl_hash_dict - same as extract_py_from_otl()
+    """
+
+    if older_otl_hash_dict is None:
+        older_otl_hash_dict = read_otl_log(scripts_folder_path)
+
+    # the same otl in two batches would be extracted into the same folder concurrently
+    unique_file_paths = iter_unique(file_paths)
+
+    otl_hash_dict = dict()
+
+    if isinstance(file_paths, (list, tuple)):
+        unique_file_paths = list(unique_file_paths)
+        if not unique_file_paths:
+            return otl_hash_dict
+
+        # a few batches per worker, so that a slow otl doesn't hold up the others
+        batch_size = max(1, len(unique_file_paths) // (jobs * 4))
+        jobs = min(jobs, (len(unique_file_paths) + batch_size - 1) // batch_size)
+    else:
+        batch_size = STREAM_BATCH_SIZE
+
+    batches = ((batch_file_paths, scripts_folder_path, backend, older_otl_hash_dict, check_hash, cache, profile,
+                blob_store, script_filter, hash_memo, write_threads)
+               for batch_file_paths in iter_chunks(unique_file_paths, batch_size))
+
+    # imap() reads the batches from a separate thread, so streamed paths are
+    # extracted while they are still being found
+    pool = multiprocessing.Pool(jobs)
+    try:
+        for batch_otl_hash_dict, batch_profile_dict, batch_journal_entries, batch_hash_updates in \
+                pool.imap(extract_py_from_otl_batch, batches):
+            otl_hash_dict.update(batch_otl_hash_dict)
+            if hash_memo is not None:
+                hash_memo.update(batch_hash_updates)
+            if journal is not None:
+                # journaled by this process only, so that the lines of two workers can't interleave
+                for entry in batch_journal_entries:
+                    journal.append(entry)
+            profiler = profiling.get_profiler()
+            if batch_profile_dict is not None and profiler is not None:
+                profiler.merge(batch_profile_dict)
+    finally:
+        pool.close()
+        pool.join()
+
+    return otl_hash_dict
+
+
+def iter_unique(items):
+    """
+    :param items: iterable of hashable items.
+    :return: generator of the items, without the repeated ones.
+    """
+
+    seen_items = set()
+    for item in items:
+        if item not in seen_items:
+            seen_items.add(item)
+            yield item
+
+
+def iter_chunks(items, chunk_size):
+    """
+    :param items: iterable.
+    :param int chunk_size: number of items per chunk.
+    :return: generator of lists of consecutive items.
+    """
+
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def extract_py_from_otl_batch(batch):
+    """
+    Worker process entry point of extract_py_from_otl_parallel().
+
+    :param tuple batch: (file_paths, scripts_folder_path, backend, older_otl_hash_dict, check_hash, cache, profile,
+                         blob_store, script_filter, hash_memo, write_threads)
+    :return: tuple (otl_hash_dict of the batch, profile of the batch or None, journal entries of the batch,
+                    hashes memoized by the batch)
+    """
+
+    file_paths, scripts_folder_path, backend, older_otl_hash_dict, check_hash, cache, profile, store, \
+        script_filter, hash_memo, write_threads = batch
+
+    journal_entries = []
+    if profile:
+        profiler = profiling.enable()
+    otl_hash_dict = extract_py_from_otl(file_paths, scripts_folder_path, backend=backend,
+                                        older_otl_hash_dict=older_otl_hash_dict, check_hash=check_hash, cache=cache,
+                                        blob_store=store, script_filter=script_filter, journal=journal_entries,
+                                        hash_memo=hash_memo, write_threads=write_threads)
+    hash_updates = hash_memo.get_updates() if hash_memo is not None else dict()
+    if profile:
+        profiling.disable()
+        return otl_hash_dict, profiler.to_dict(), journal_entries, hash_updates
+    return otl_hash_dict, None, journal_entries, hash_updates
+
+
+def extract_py_from_otl_isolated(file_paths, scripts_folder_path, backend=DEFAULT_BACKEND, jobs=1,
+                                 older_otl_hash_dict=None, check_hash=False, cache=None, profile=False,
+                                 blob_store=None, script_filter=None, timeout=None, memory_limit=None,
+                                 journal=None, hash_memo=None, write_threads=0):
+    """
+    Extracts each otl in its own child process, so that an otl which crashes
+    or hangs houdini, or uses too much memory, doesn't stop the run.
+
+    An otl whose child fails, crashes or runs longer than the timeout is
+    logged with a "status" and an "error" message in the log.json, and is
+    extracted again by the next run. Its otl installed into a crashed houdini
+    session doesn't need to be uninstalled.
+
+    :param file_paths: iterable of all the otl paths.
+    :param str scripts_folder_path: path to the generated scripts-folder.
+    :param str backend: "hou" or "native", see BACKENDS.
+    :param int jobs: number of child processes running at the same time.
+    :param dict older_otl_hash_dict: see extract_py_from_otl()
+    :param bool check_hash: see extract_py_from_otl()
+    :param <script_cache.ScriptCache> cache: see extract_py_from_otl()
+    :param bool profile: profile the children, their profiles are merged into the enabled profiler.
+    :param <blob_store.BlobStore> blob_store: see extract_py_from_otl()
+    :param <script_filters.ScriptFilter> script_filter: see extract_py_from_otl()
+    :param float timeout: seconds an otl can take before its child is killed, None for no limit.
+    :param int memory_limit: address space limit of each child in bytes, None for no limit.
+                             Not applied on windows.
+    :param journal: see extract_py_from_otl(), the otls that failed are journaled with their status.
+    :param <file_hashes.HashMemo> hash_memo: see extract_py_from_otl(), the hashes of the children are merged into it.
+    :param int write_threads: see extract_py_from_otl(), per child.
+    :return: dict otl_hash_dict - same as extract_py_from_otl(), the entries of
+             the otls that failed also have "status" and "error" keys.
+    """
+
+    if older_otl_hash_dict is None:
+        older_otl_hash_dict = read_otl_log(scripts_folder_path)
+
+    # file path: otl_hash_dict of the otl, in the order of file_paths once done
+    results = dict()
+    ordered_file_paths = []
+    # child process: (file_path, connection, start time)
+    running = dict()
+    # child process: what it sent, read as soon as it's sent so that the child doesn't block on a full pipe
+    received = dict()
+
+    def receive(process, connection):
+        try:
+            if process not in received and connection.poll():
+                received[process] = connection.recv()
+        except (EOFError, IOError, OSError):
+            pass
+
+    def finish(process, error=None):
+        file_path, connection, start_time = running.pop(process)
+        receive(process, connection)
+        result = received.pop(process, None)
+        connection.close()
+        process.join()
+
+        if error is None and result is None:
+            error = (STATUS_CRASHED, "exit code {0}".format(process.exitcode))
+        elif error is None and result[0] != "ok":
+            error = (STATUS_ERROR, result[1])
+
+        if error is None:
+            results[file_path] = result[1]
+            profiler = profiling.get_profiler()
+            if result[2] is not None and profiler is not None:
+                profiler.merge(result[2])
+            if journal is not None:
+                for entry in result[3]:
+                    journal.append(entry)
+            if hash_memo is not None:
+                hash_memo.update(result[4])
+            return
+
+        print("Could not extract otl, {0}: {1}\n{2}\n\n".format(error[0], file_path, error[1]))
+        try:
+            file_dict = get_otl_file_dict(file_path)
+        except (IOError, OSError):
+            return
+        file_dict["status"], file_dict["error"] = error
+        otl_unique_name = make_unique_name(file_path, os.path.basename(file_path))
+        results[file_path] = {otl_unique_name: file_dict}
+        if journal is not None:
+            journal.append(run_journal.make_entry(otl_unique_name, file_dict, error[0]))
+
+    file_path_iter = iter_unique(file_paths)
+    file_path = next(file_path_iter, None)
+
+    while file_path is not None or running:
+        while file_path is not None and len(running) < jobs:
+            parent_connection, child_connection = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=extract_py_from_otl_child,
+                                              args=(child_connection, file_path, scripts_folder_path, backend,
+                                                    older_otl_hash_dict, check_hash, cache, profile, blob_store,
+                                                    script_filter, memory_limit, hash_memo, write_threads))
+            process.start()
+            child_connection.close()
+            running[process] = (file_path, parent_connection, time.time())
+            ordered_file_paths.append(file_path)
+            file_path = next(file_path_iter, None)
+
+        wait_for_children(running, timeout, received)
+
+        for process, (running_file_path, connection, start_time) in list(running.items()):
+            receive(process, connection)
+            if not process.is_alive():
+                finish(process)
+            elif timeout is not None and time.time() - start_time > timeout:
+                kill_process(process)
+                finish(process, (STATUS_TIMEOUT, "killed after {0} seconds".format(timeout)))
+
+    otl_hash_dict = dict()
+    for file_path in ordered_file_paths:
+        otl_hash_dict.update(results.get(file_path, dict()))
+    return otl_hash_dict
+
+
+def wait_for_children(running, timeout=None, received=()):
+    """
+    Waits until one of the running child processes sends its result or exits, or the next timeout.
+
+    :param dict running: {process: (file_path, connection, start time)}
+    :param float timeout: see extract_py_from_otl_isolated().
+    :param received: the processes whose result was already read.
+    """
+
+    wait_time = None
+    if timeout is not None:
+        now = time.time()
+        wait_time = max(0, min(start_time + timeout - now for file_path, connection, start_time in running.values()))
+
+    try:
+        from multiprocessing.connection import wait
+    except ImportError:
+        # python 2
+        time.sleep(ISOLATED_POLL_INTERVAL if wait_time is None else min(wait_time, ISOLATED_POLL_INTERVAL))
+        return
+
+    wait([process.sentinel for process in running] +
+         [connection for process, (file_path, connection, start_time) in running.items() if process not in received],
+         wait_time)
+
+
+def kill_process(process):
+    """
+    :param <multiprocessing.Process> process: child process, killed and joined.
+    """
+
+    process.terminate()
+    process.join(1)
+    if process.is_alive() and hasattr(process, "kill"):
+        process.kill()
+    process.join()
+
+
+def extract_py_from_otl_child(connection, file_path, scripts_folder_path, backend, older_otl_hash_dict, check_hash,
+                              cache, profile, blob_store, script_filter, memory_limit, hash_memo=None,
+                              write_threads=0):
+    """
+    Child process entry point of extract_py_from_otl_isolated(), extracts one otl.
+
+    Sends ("ok", otl_hash_dict, profile or None, journal entries, memoized hashes)
+    or ("error", message) to the connection.
+    """
+
+    if memory_limit is not None and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    try:
+        journal_entries = []
+        if profile:
+            profiler = profiling.enable()
+        otl_hash_dict = extract_py_from_otl([file_path], scripts_folder_path, backend=backend,
+                                            older_otl_hash_dict=older_otl_hash_dict, check_hash=check_hash,
+                                            cache=cache, blob_store=blob_store, script_filter=script_filter,
+                                            journal=journal_entries, hash_memo=hash_memo,
+                                            write_threads=write_threads)
+        connection.send(("ok", otl_hash_dict, profiler.to_dict() if profile else None, journal_entries,
+                         hash_memo.get_updates() if hash_memo is not None else dict()))
+    except MemoryError:
+        connection.send(("error", "MemoryError: above the memory limit"))
+    except Exception as exc:
+        connection.send(("error", "{0}: {1}".format(type(exc).__name__, exc)))
+    finally:
+        connection.close()
+
+
+def extract_py_from_otl(file_paths, scripts_folder_path, backend=DEFAULT_BACKEND, older_otl_hash_dict=None,
+                        check_hash=False, cache=None, blob_store=None, script_filter=None, journal=None,
+                        hash_memo=None, write_threads=0):
+    """
+    Extracts all the python scripts inside each otl.
+
+    Otls which haven't changed since the previous run into scripts_folder_path
+    are skipped before they are loaded, and their previous log.json entry is kept.
+    Otls found in the cache are written from it, also without being loaded.
+
+    :param list file_paths: list of all the otl paths.
+    :param str scripts_folder_path: path to the generated scripts-folder.
+    :param str backend: "hou" or "native", see BACKENDS.
+    :param dict older_otl_hash_dict: otl_hash_dict of the previous run, read from
+                                     the scripts-folder log.json if not given.
+    :param bool check_hash: compare the otl contents instead of the size and
+                            last modified time to find unchanged otls.
+    :param <script_cache.ScriptCache> cache: cache of the scripts extracted from
+                                             each otl, keyed by the otl contents.
+    :param <blob_store.BlobStore> blob_store: if given, each distinct script is
+                                              stored once in it, see write_result_to_disk().
+    :param <script_filters.ScriptFilter> script_filter: if given, only the hdas and
+                                                        scripts it selects are extracted.
+    :param journal: if given, an entry is appended to it as each otl is done,
+                    see run_journal.make_entry(). A run_journal.RunJournal, or a list.
+    :param <file_hashes.HashMemo> hash_memo: if given, the content hashes of the
+                                             otls are memoized in it, see get_content_hash().
+    :param int write_threads: number of threads writing the scripts in the background
+                              while the definitions are walked, see writer_pool.
+                              0 writes them in the current thread.
+    :return: dict otl_hash_dict - a dictionary of all the unique otl names [key]
+            and the file paths, along with the last modified times of
+            the respective otls [value].
+            Template: { filename_hash : {
+                            "file_path" : otl_file_path,
+                            "last_mod_time" : otl_last_modified_time,
+                            "size" : otl_size_in_bytes,
+                            "content_hash" : otl_md5 (only with check_hash)
+                            "filter" : script_filter.get_key() (only with script_filter)
+                            }
+    """
+
+    if older_otl_hash_dict is None:
+        older_otl_hash_dict = read_otl_log(scripts_folder_path)
+
+    # filtered scripts are cached apart from the full extraction
+    cache_backend = backend if script_filter is None else backend + ":" + script_filter.get_key()
+
+    # dict for storing and displaying the otl hash values
+    otl_hash_dict = dict()
+
+    # otl_unique_name, otl_folder_path, file_dict and content hash of the otls to extract
+    changed_otls = dict()
+
+    # made in the process doing the extraction, threads don't survive a fork
+    pool = writer_pool.WriterPool(write_threads) if write_threads else None
+
+    # names of the scripts shared by the hdas of the run, see get_script_names()
+    interned_names = dict()
+
+    def finish(otl_unique_name, file_dict, status, counts=None):
+        otl_hash_dict[otl_unique_name] = file_dict
+        # the files of the otl are written, and on disk, before it's journaled
+        if pool is not None:
+            pool.wait()
+        atomic_writes.sync()
+        if journal is not None:
+            counts = counts or dict()
+            journal.append(run_journal.make_entry(otl_unique_name, file_dict, status, counts.get("hdas"),
+                                                  counts.get("scripts")))
+
+    def iter_changed_file_paths():
+        # skips otls which were already extracted and haven't changed since,
+        # before they are loaded
+        for file_path in file_paths:
+            try:
+                file_dict = get_otl_file_dict(file_path, check_hash, hash_memo)
+            except (IOError, OSError):
+                print("file path not valid, continuing to other hdas: {0}\n\n".format(file_path))
+                continue
+            if script_filter is not None:
+                file_dict["filter"] = script_filter.get_key()
+
+            otl_unique_name = make_unique_name(file_path, os.path.basename(file_path))
+            otl_folder_path = os.path.join(scripts_folder_path, otl_unique_name)
+
+            if os.path.exists(os.path.join(otl_folder_path, "log.json")) \
+                    and is_otl_unchanged(file_dict, older_otl_hash_dict.get(otl_unique_name)):
+                finish(otl_unique_name, file_dict, run_journal.UNCHANGED)
+                continue
+
+            content_hash = None
+            if cache is not None:
+                with profiling.measure("cache", library=file_path):
+                    content_hash = file_dict.get("content_hash") or get_content_hash(file_path, hash_memo)
+                    definition_records = cache.get(content_hash, cache_backend, file_path)
+                if definition_records is not None:
+                    counts = {"hdas": 0, "scripts": 0}
+                    with profiling.measure("extract", library=file_path):
+                        extract_py_from_cache(definition_records, otl_folder_path, blob_store=blob_store,
+                                              counts=counts, writer_pool=pool, interned_names=interned_names)
+                    finish(otl_unique_name, file_dict, run_journal.CACHED, counts)
+                    continue
+
+            changed_otls[file_path] = (otl_unique_name, otl_folder_path, file_dict, content_hash)
+            yield file_path
+
+    # the files of an otl are renamed into place together once they're on disk, see finish()
+    with atomic_writes.deferred_renames():
+        try:
+            for file_path, definitions in iter_otl_definitions(iter_changed_file_paths(), backend=backend):
+                otl_unique_name, otl_folder_path, file_dict, content_hash = changed_otls.pop(file_path)
+                counts = {"hdas": 0, "scripts": 0}
+
+                if cache is None:
+                    with profiling.measure("extract", library=file_path):
+                        extract_py_from_definitions(definitions, otl_folder_path, blob_store=blob_store,
+                                                    script_filter=script_filter, counts=counts, writer_pool=pool,
+                                                    interned_names=interned_names)
+                else:
+                    definition_records = []
+                    with profiling.measure("extract", library=file_path):
+                        extract_py_from_definitions(definitions, otl_folder_path,
+                                                    definition_records=definition_records, blob_store=blob_store,
+                                                    script_filter=script_filter, counts=counts, writer_pool=pool,
+                                                    interned_names=interned_names)
+                    with profiling.measure("cache", library=file_path):
+                        cache.put(content_hash, cache_backend, file_path, definition_records)
+
+                finish(otl_unique_name, file_dict, run_journal.EXTRACTED, counts)
+        finally:
+            if pool is not None:
+                pool.close()
+
+    return otl_hash_dict
+
+
+def iter_otl_definitions(file_paths, backend=DEFAULT_BACKEND):
+    """
+    Loads each otl and yields its hda definitions. Otls that can't be loaded
+    are reported and skipped. With the hou backend, the otls installed into
+    the houdini session are uninstalled once the generator is done.
+
+    :param file_paths: iterable of otl paths.
+    :param str backend: "hou" or "native", see BACKENDS.
+    :return: generator of (file_path, definitions) tuples. Native definitions
+             are only valid until the next otl is loaded.
+    """
+
+    # loaded hda files in the current scene before installing any, only
+    # queried once the first otl has to be installed
+    default_otl_set = None
+
+    try:
+        # iterate through the file paths
+        for file_path in file_paths:
+
+            # check if path is valid
+            if not os.path.exists(file_path):
+                print("file path not valid, continuing to other hdas: {0}\n\n".format(file_path))
+                continue
+
+            if backend == "native":
+                try:
+                    with profiling.measure("load", library=file_path):
+                        library = hda_reader.HDALibrary(file_path)
+                except (hda_reader.Error, IOError, OSError):
+                    print("Could not load hda file: {0}\n\n".format(file_path))
+                    continue
+
+                with library:
+                    with profiling.measure("definitions", library=file_path):
+                        definitions = library.definitions()
+                    yield file_path, definitions
+                continue
+
+            if default_otl_set is None:
+                # Get all the loaded hda files in the current scene, before installing any
+                default_otl_set = set(hou.hda.loadedFiles())
+
+            try:
+                with profiling.measure("load", library=file_path):
+                    hou.hda.installFile(file_path)
+            except hou.Error:
+                print("Could not install hda file: {0}\n\n".format(file_path))
+                continue
+
+            try:
+                with profiling.measure("definitions", library=file_path):
+                    definitions = hou.hda.definitionsInFile(file_path)
+            except hou.Error:
+                print("Could not load hda file: {0}\n\n".format(file_path))
+                continue
+
+            yield file_path, definitions
+
+    finally:
+        if default_otl_set is not None:
+            # Get all the hda files in the current scene after installing all the required ones.
+            current_otl_set = set(hou.hda.loadedFiles())
+
+            # Get the difference, so that only the hda files installed by the tool in
+            # the current houdini session remain
+            otls_installed = current_otl_set - default_otl_set
+
+            # Uninstall all the hda files installed by the tool
+            for file in otls_installed:
+                hou.hda.uninstallFile(file)
+
+
+def extract_python_jsonl(file_paths, file_obj, backend=DEFAULT_BACKEND, script_filter=None):
+    """
+    Streams every python script inside the otls as one json record per line,
+    instead of writing the scripts folder tree.
+
+    Record template: {"library": otl_file_path,
+                      "definition": str(hda definition),
+                      "node_type": context / asset_name,
+                      "kind": one of SCRIPT_KINDS, eg. "parameter_callbacks",
+                      "name": section or parameter name,
+                      "contents": python script}
+
+    :param list file_paths: a list of pathways to otls.
+    :param file_obj: open text file (or sys.stdout) the records are written to.
+    :param str backend: "hou" or "native", see BACKENDS.
+    :param <script_filters.ScriptFilter> script_filter: if given, only the hdas and scripts it selects are written.
+    :return: int number of records written.
+    """
+
+    record_count = 0
+    library = None
+
+    for record in iter_scripts(file_paths, backend=backend, script_filter=script_filter):
+        # records of an otl are visible to readers of the stream once it's done
+        if record.library != library:
+            file_obj.flush()
+            library = record.library
+
+        file_obj.write(json.dumps(record.to_dict()) + "\n")
+        record_count += 1
+
+    file_obj.flush()
+
+    return record_count
+
+
+def extract_python_to_archive(file_paths, archive_path, name, backend=DEFAULT_BACKEND, script_filter=None):
+    """
+    Writes the scripts folder tree into a single zip, tar or SQLite archive
+    instead of the disk, see output_sinks.
+
+    :param list file_paths: a list of pathways to otls.
+    :param str archive_path: path to the archive, its extension sets the archive type.
+    :param str name: name of the scripts folder inside the archive.
+    :param str backend: "hou" or "native", see BACKENDS.
+    :param <script_filters.ScriptFilter> script_filter: if given, only the hdas and scripts it selects are written.
+    :return: int number of files written into the archive.
+    """
+
+    with output_sinks.open_sink(archive_path) as sink:
+        for path, contents in iter_scripts_folder_files(file_paths, name, backend=backend,
+                                                        script_filter=script_filter):
+            if contents is None:
+                sink.add_directory(path)
+            else:
+                sink.add_file(path, contents)
+
+    print("{0} archive generated at: {1}\n\n".format(name, archive_path))
+    return sink.file_count
+
+
+def iter_scripts_folder_files(file_paths, name, backend=DEFAULT_BACKEND, script_filter=None):
+    """
+    Yields the files of the scripts folder tree extract_python() generates,
+    including the log.json and manifest.json files, without writing to disk.
+
+    :param list file_paths: a list of pathways to otls.
+    :param str name: name of the scripts folder.
+    :param str backend: "hou" or "native", see BACKENDS.
+    :param <script_filters.ScriptFilter> script_filter: if given, only the hdas and scripts it selects are yielded.
+    :return: generator of (path, contents) tuples, with "/" separated paths
+             relative to the parent of the scripts folder. contents is None
+             for the hda folders.
+    """
+
+    otl_hash_dict = dict()
+
+    for file_path, definitions in iter_otl_definitions(file_paths, backend=backend):
+        otl_unique_name = make_unique_name(file_path, os.path.basename(file_path))
+        otl_hash_dict[otl_unique_name] = get_otl_file_dict(file_path)
+        if script_filter is not None:
+            otl_hash_dict[otl_unique_name]["filter"] = script_filter.get_key()
+        otl_folder_path = name + "/" + otl_unique_name
+
+        hda_hash_dict = dict()
+        for definition in iter_filtered_definitions(definitions, script_filter):
+            hda_unique_name = make_unique_name(str(definition), str(definition.nodeTypeName()))
+            hda_hash_dict[hda_unique_name] = get_node_type_and_context(definition)
+            hda_folder_path = otl_folder_path + "/" + hda_unique_name
+            yield hda_folder_path, None
+
+            scripts = dict()
+            names_log_files = dict()
+            for kind, script_name, script in iter_py_scripts(definition, script_filter):
+                script_file_name = get_script_file_name(kind, script_name)
+                if kind in NAMED_SCRIPT_KINDS:
+                    names_log_files.setdefault(kind, dict())[script_file_name] = script_name
+                # later parameters with the same name replace earlier ones, as on disk
+                scripts[kind + "/" + script_file_name] = script
+
+            manifest = dict()
+            for manifest_key, script in scripts.items():
+                manifest[manifest_key] = get_manifest_entry(script)
+                yield hda_folder_path + "/" + manifest_key, script
+
+            for kind in NAMED_SCRIPT_KINDS:
+                if kind in names_log_files:
+                    yield hda_folder_path + "/" + kind + "/log.json", json.dumps(names_log_files[kind], indent=2)
+            yield hda_folder_path + "/manifest.json", json.dumps(manifest, indent=2)
+
+        yield otl_folder_path + "/log.json", json.dumps(hda_hash_dict, indent=2)
+
+    yield name + "/log.json", json.dumps(otl_hash_dict, indent=2)
+
+
+class ScriptRecord(object):
+    """
+    A python script found in an otl, see iter_scripts().
+
+    The body of a python section is only read when accessed, and not kept, so
+    records can be streamed through with bounded memory. With the native
+    backend, it has to be read before the next otl is loaded.
+    """
+
+    __slots__ = ("library", "definition", "node_type", "kind", "name", "_body", "_body_loader")
+
+    def __init__(self, library, definition, node_type, kind, name, body=None, body_loader=None):
+        """
+        :param str library: path to the otl, or None.
+        :param str definition: str(hda definition).
+        :param str node_type: context / asset_name, eg. "Object/sky_scraper".
+        :param str kind: kind of script, see SCRIPT_KINDS.
+        :param str name: section or parameter name.
+        :param str body: python script, or None if it is read with body_loader.
+        :param body_loader: function reading the python script.
+        """
+
+        self.library = library
+        self.definition = definition
+        self.node_type = node_type
+        self.kind = kind
+        self.name = name
+        self._body = body
+        self._body_loader = body_loader
+
+    def __repr__(self):
+        return "<ScriptRecord {0} {1} of {2} in {3}>".format(self.kind, self.name, self.node_type, self.library)
+
+    @property
+    def body(self):
+        """
+        :return: str python script.
+        """
+
+        if self._body_loader is not None:
+            return self._body_loader()
+        return self._body
+
+    def to_dict(self):
+        """
+        :return: dict {"library", "definition", "node_type", "kind", "name", "contents"},
+                 the record written by extract_python_jsonl().
+        """
+
+        return {"library": self.library,
+                "definition": self.definition,
+                "node_type": self.node_type,
+                "kind": self.kind,
+                "name": self.name,
+                "contents": self.body}
+
+
+def iter_scripts(file_paths, backend=DEFAULT_BACKEND, script_filter=None):
+    """
+    Yields every python script inside the otls, without writing anything to disk.
+
+    Example:
+        for record in iter_scripts(["/path/to/otl.hda"], backend="native"):
+            lint(record.library, record.node_type, record.name, record.body)
+
+    :param file_paths: iterable of otl paths.
+    :param str backend: "hou" or "native", see BACKENDS.
+    :param <script_filters.ScriptFilter> script_filter: if given, only the hdas and scripts it selects are yielded.
+    :return: generator of ScriptRecord, in the order of the otls and their definitions.
+    """
+
+    for file_path, definitions in iter_otl_definitions(file_paths, backend=backend):
+        for definition in iter_filtered_definitions(definitions, script_filter):
+            for record in iter_definition_scripts(definition, file_path, script_filter):
+                yield record
+
+
+def iter_definition_scripts(definition, file_path=None, script_filter=None):
+    """
+    Yields every python script inside an hda.
+
+    :param <hou.HDADefinition> definition: hda file definition.
+    :param str file_path: path to the otl, the library of the records.
+    :param <script_filters.ScriptFilter> script_filter: if given, only the scripts it
+                                                        selects are yielded. The sections
+                                                        or parm templates are not read
+                                                        when none of their kinds is selected.
+    :return: generator of ScriptRecord. Parameters inside folders and multiparms are included.
+    """
+
+    definition_string = str(definition)
+    node_type = get_node_type_and_context(definition)
+
+    if script_filter is None or script_filter.match_kind(MAIN_PYTHON_SCRIPTS):
+        for name, section in iter_python_sections(definition, script_filter):
+            # compressed sections are decompressed once their body is read
+            yield ScriptRecord(file_path, definition_string, node_type, MAIN_PYTHON_SCRIPTS, name,
+                               body_loader=functools.partial(hda_reader.read_section_contents, section))
+
+    if is_contents_selected(script_filter):
+        for kind, name, script in iter_contents_scripts(definition, script_filter):
+            yield ScriptRecord(file_path, definition_string, node_type, kind, name, body=script)
+
+    if script_filter is not None and not script_filter.match_any_kind(PARM_TEMPLATE_SCRIPT_KINDS):
+        return
+
+    try:
+        with profiling.measure("parm_templates"):
+            parm_templates = definition.parmTemplateGroup().parmTemplates()
+    except hou.Error as exc:
+        print_hou_error("Could not access parm templates of", definition, exc)
+        return
+
+    for kind, name, script in iter_parm_template_scripts(parm_templates):
+        if script_filter is None or script_filter.match_kind(kind):
+            yield ScriptRecord(file_path, definition_string, node_type, kind, name, body=script)
+
+
+def iter_py_scripts(definition, script_filter=None):
+    """
+    Yields every python script inside an hda, without writing anything to disk.
+
+    :param <hou.HDADefinition> definition: hda file definition.
+    :param <script_filters.ScriptFilter> script_filter: see iter_definition_scripts().
+    :return: generator of (kind, name, python script) tuples, where kind is the
+             name of the folder the script goes to in the scripts folder tree
+             (see SCRIPT_KINDS) and name the section or parameter name.
+             Parameters inside folders and multiparms are included.
+    """
+
+    for record in iter_definition_scripts(definition, script_filter=script_filter):
+        yield record.kind, record.name, record.body
+
+
+def iter_python_sections(definition, script_filter=None):
+    """
+    :param <hou.HDADefinition> definition: hda file definition.
+    :param <script_filters.ScriptFilter> script_filter: if given, only the sections whose
+                                                        name it selects are yielded.
+    :return: generator of (section name, <hou.HdaSection>) tuples of the python
+             sections, their contents aren't read.
+    """
+
+    try:
+        with profiling.measure("sections"):
+            definition_sections = definition.sections()
+            efo = definition.extraFileOptions()
+    except hou.Error as exc:
+        print_hou_error("Could not access hda definition sections", definition, exc)
+        return
+
+    for section in definition_sections:
+        if script_filter is not None and not script_filter.match_section(section):
+            continue
+        if is_python_section(section, efo):
+            yield definition_sections[section].name(), definition_sections[section]
+
+
+def is_contents_selected(script_filter):
+    """
+    :param <script_filters.ScriptFilter> script_filter: filter of the extraction, or None.
+    :return: bool True if the scripts inside the asset networks and shelf tools
+             are extracted, they have to be selected by kind, see CONTENTS_SCRIPT_KINDS.
+    """
+
+    return script_filter is not None and bool(script_filter.kinds) \
+        and script_filter.match_any_kind(CONTENTS_SCRIPT_KINDS)
+
+
+def iter_contents_scripts(definition, script_filter=None):
+    """
+    Yields the python inside the network of an hda and its shelf tools, read
+    from the Contents and Tools.shelf sections without creating the nodes.
+
+    :param <hou.HDADefinition> definition: hda file definition.
+    :param <script_filters.ScriptFilter> script_filter: see iter_definition_scripts().
+    :return: generator of (kind, name, python script) tuples. The name of the
+             node scripts is the node path inside the hda and the parameter
+             (or channel) name, eg. "geo1/python1/python", and of the shelf
+             tool scripts the tool name.
+    """
+
+    try:
+        with profiling.measure("sections"):
+            definition_sections = definition.sections()
+    except hou.Error as exc:
+        print_hou_error("Could not access hda definition sections", definition, exc)
+        return
+
+    contents_section = node_contents.find_section(definition_sections, node_contents.CONTENTS_SECTION)
+    if contents_section is not None and (script_filter is None
+                                         or script_filter.match_any_kind((NODE_SCRIPTS, NODE_EXPRESSIONS))):
+        try:
+            with profiling.measure("contents"):
+                node_scripts = list(node_contents.iter_node_scripts(
+                    hda_reader.iter_decompressed_chunks(contents_section)))
+        except hda_reader.Error as exc:
+            print("Could not read the node contents of {0}: {1}\n\n".format(definition, exc))
+            node_scripts = []
+
+        for node_script in node_scripts:
+            kind = NODE_EXPRESSIONS if node_script.is_expression else NODE_SCRIPTS
+            if script_filter is None or script_filter.match_kind(kind):
+                yield kind, node_script.node_path + "/" + node_script.parm_name, node_script.script
+
+    tools_section = definition_sections.get(node_contents.TOOLS_SHELF_SECTION)
+    if tools_section is not None and (script_filter is None or script_filter.match_kind(SHELF_TOOL_SCRIPTS)):
+        try:
+            tool_scripts = list(node_contents.iter_shelf_tool_scripts(tools_section.contents()))
+        except hda_reader.Error as exc:
+            print("Could not read the shelf tools of {0}: {1}\n\n".format(definition, exc))
+            tool_scripts = []
+
+        for tool_name, script in tool_scripts:
+            yield SHELF_TOOL_SCRIPTS, tool_name, script
+
+
+def iter_filtered_definitions(definitions, script_filter=None):
+    """
+    :param definitions: hda definitions of an otl.
+    :param <script_filters.ScriptFilter> script_filter: filter of the node types and versions, or None.
+    :return: generator of the definitions selected by the filter, without
+             reading their sections or parm templates.
+    """
+
+    for definition in definitions:
+        if script_filter is None or (script_filter.match_node_type(get_node_type_and_context(definition))
+                                     and script_filter.match_version(get_definition_version(definition))):
+            yield definition
+
+
+def get_definition_version(definition):
+    """
+    :param <hou.HDADefinition> definition: hda file definition.
+    :return: str version from the namespaced node type name, eg. "2.0" for
+             "mycompany::sky_scraper::2.0", else from the definition version
+             set in the type properties. Empty if it has none.
+    """
+
+    try:
+        version = script_filters.get_version_from_node_type_name(str(definition.nodeTypeName()))
+        # hda_reader definitions don't read the version section
+        if not version and hasattr(definition, "version"):
+            version = str(definition.version())
+    except hou.Error as exc:
+        print_hou_error("Could not access the version of", definition, exc)
+        return ""
+    return version
+
+
+def iter_parm_template_scripts(parm_templates):
+    """
+    Visits the parm templates, and the ones nested in their folders and
+    multiparms, once each and yields all their python scripts.
+
+    Disable and hide when conditionals aren't python and are not included.
+
+    :param parm_templates: parm templates of an hda.
+    :return: generator of (kind, parameter name, python script) tuples, see iter_py_scripts().
+    """
+
+    for parm_template in parm_templates:
+        name = parm_template.name()
+
+        item_generation_script = get_item_generation_script(parm_template)
+        if item_generation_script:
+            yield ITEM_GENERATION_SCRIPTS, name, item_generation_script
+
+        callback_py_script = get_parameter_callback(parm_template)
+        if callback_py_script:
+            yield PARAMETER_CALLBACKS, name, callback_py_script
+
+        action_button_script = get_action_button_script(parm_template)
+        if action_button_script:
+            yield ACTION_BUTTON_SCRIPTS, name, action_button_script
+
+        for component_name, default_expression in get_default_expressions(parm_template):
+            yield DEFAULT_EXPRESSIONS, component_name, default_expression
+
+        if isinstance(parm_template, FOLDER_PARM_TEMPLATES):
+            for script in iter_parm_template_scripts(parm_template.parmTemplates()):
+                yield script
+
+
+def get_node_type_and_context(definition):
+    """
+    :param <hou.HDADefinition> definition: hda file definition.
+    :return: str context / asset_name, eg. "Object/sky_scraper", empty if it can't be accessed.
+    """
+
+    try:
+        return definition.nodeTypeCategory().name() + "/" + definition.nodeTypeName()
+    except hou.Error as exc:
+        print("\n\nCouldn't access hou.hda methods nodeTypeCategory().name() and definition.nodeTypeName()\n\n")
+        print_hou_error_dict(definition, exc)
+        return ""
+
+
+def print_hou_error(message, definition, exc):
+    """
+    Prints a hou.Error raised while accessing an hda definition.
+
+    :param str message: what failed.
+    :param <hou.HDADefinition> definition: hda file definition.
+    :param <hou.Error> exc: the error.
+    """
+
+    print("\n\n{0}: {1}\n\n".format(message, str(definition)))
+    print_hou_error_dict(definition, exc)
 
-    if args.directory:
-        otls_folder_path = args.directory
 
-    # if text file is given, default output folder is the same is the text file,
-    # else it is the current working directory
-    else:
-        if args.otl_paths_file:
-            otls_folder_path = os.path.dirname(args.otl_paths_file)
-        else:
-            # the olts_folder_path is the same as the text file.
-            otls_folder_path = os.getcwd()
+def print_hou_error_dict(definition, exc):
+    error_msg = {"hou Error": hou.Error.exceptionTypeName(exc),
+                 "Error message": hou.Error.instanceMessage(exc)}
+    error_dict = {str(definition): error_msg}
+    print(json.dumps(error_dict, indent=4))
 
-    if args.name:
-        folder_name = args.name
-    else:
-        folder_name = "otl_python_scripts"
 
-    if args.otl_paths_file:
-        txt_file_path = args.otl_paths_file
+def extract_py_from_definitions(definitions, otl_folder_path, definition_records=None, blob_store=None,
+                                script_filter=None, counts=None, writer_pool=None, interned_names=None):
+    """
+    Extracts all the python scripts inside the definitions of one otl into its otl folder.
+
+    :param list definitions: hda definitions inside the otl (hou or hda_reader definitions).
+    :param str otl_folder_path: path to the otl folder.
+    :param list definition_records: if given, the definition records written are
+                                    appended to it, see write_definition_records().
+    :param <blob_store.BlobStore> blob_store: see write_result_to_disk().
+    :param <script_filters.ScriptFilter> script_filter: see extract_py_from_hda().
+    :param dict counts: see write_definition_records().
+    :param <writer_pool.WriterPool> writer_pool: see write_hda_scripts().
+    :param dict interned_names: see get_script_names().
+    """
 
-        # access individual paths from .txt file
-        with open(txt_file_path, 'r') as file_obj:
-            file_contents = file_obj.read()
-            otl_file_paths = file_contents.split()
+    update_otl_folder(otl_folder_path, lambda: extract_py_from_hda(definitions, otl_folder_path,
+                                                                   definition_records=definition_records,
+                                                                   blob_store=blob_store,
+                                                                   script_filter=script_filter, counts=counts,
+                                                                   writer_pool=writer_pool,
+                                                                   interned_names=interned_names))
 
-        print("\n\nGiven text file path: {0}\n\n".format(txt_file_path))
 
-    else:
-        # args.otl arg is provided instead of a list of otl pathways
-        otl_file_paths = args.otl
+def extract_py_from_cache(definition_records, otl_folder_path, blob_store=None, counts=None, writer_pool=None,
+                          interned_names=None):
+    """
+    Writes the otl folder of an otl from its cached definition records, without loading the otl.
+
+    :param list definition_records: definition records read from the script cache.
+    :param str otl_folder_path: path to the otl folder.
+    :param <blob_store.BlobStore> blob_store: see write_result_to_disk().
+    :param dict counts: see write_definition_records().
+    :param <writer_pool.WriterPool> writer_pool: see write_hda_scripts().
+    :param dict interned_names: see get_script_names().
+    """
 
-    extract_python(otl_file_paths, otls_folder_path, folder_name)
-    print("Script ran successfully\n\n")
+    update_otl_folder(otl_folder_path, lambda: write_definition_records(definition_records, otl_folder_path,
+                                                                        blob_store=blob_store, counts=counts,
+                                                                        writer_pool=writer_pool,
+                                                                        interned_names=interned_names))
 
 
-def parse_args():
+def update_otl_folder(otl_folder_path, write_hdas):
     """
-    Parse args for the tool.
-    :return: args
+    Creates or updates an otl folder: writes the hda folders, deletes the ones
+    of hdas removed from the otl since the previous run, and writes its log.json.
+
+    :param str otl_folder_path: path to the otl folder.
+    :param write_hdas: function writing the hda folders, returns the hda_hash_dict.
     """
 
-    parser = argparse.ArgumentParser(description="extracts python scripts from a given list of otls")
-    # text file input
-    parser.add_argument("-f", "--otl_paths_file", type=str,
-                        help="A file with a list of otl pathways.")
-    # otl input
-    parser.add_argument("-o", "--otl", type=str, nargs='*',
-                        help="Pathway to an otl(s).")
-    # folder name input
-    parser.add_argument("-n", "--name", type=str, default="otl_scripts_folder", help="Name of the generated "
-                                                                                     "scripts folder.")
-    # output_folder input
-    parser.add_argument("-d", "--directory", type=str, help="An output_folder for the generated scripts folder.")
+    otl_log_file_path = os.path.join(otl_folder_path, "log.json")
 
-    # parse args
-    args = parser.parse_args()
+    # if the otl was extracted before, it was modified since. The scripts are
+    # updated in place, see write_hda_scripts().
+    if os.path.exists(otl_folder_path):
+        print("{0} was modified, updating it.\n\n".format(os.path.basename(otl_folder_path)))
+        atomic_writes.remove_temp_files(otl_folder_path, os.listdir(otl_folder_path))
+        older_hda_hash_dict = read_json_file(otl_log_file_path)
+    else:
+        os.mkdir(otl_folder_path)
+        older_hda_hash_dict = dict()
 
-    if not args.otl_paths_file and not args.otl:
-        parser.error("provide a text file or a specific otl path to generate the scripts folder.")
+    # iterate through all the hdas inside the otl and extract the python scripts
+    hda_hash_dict = write_hdas()
 
-    return args
+    # delete the folders of hdas that were removed from the otl
+    for hda_unique_name in older_hda_hash_dict:
+        hda_folder_path = os.path.join(otl_folder_path, hda_unique_name)
+        if hda_unique_name not in hda_hash_dict and os.path.isdir(hda_folder_path):
+            shutil.rmtree(hda_folder_path)
 
+    # write the hda hash dict to a json file
+    write_json_if_changed(otl_log_file_path, hda_hash_dict)
 
-def extract_python(file_paths, otls_folder_path, name):
+
+def read_json_file(json_file_path):
     """
-    function to iterate through all the otls and extract all python scripts inside.
+    Reads a log.json or manifest.json file written by a previous run.
 
-    :param list file_paths: a list of pathways to otls.
-    :param str otls_folder_path: Parent directory of the scripts-folder.
-    :param str name: name of the generated folder.
+    :param str json_file_path: path to the json file.
+    :return: dict contents of the file, empty if it doesn't exist or isn't valid.
     """
 
-    # create a folder to store the scripts
-    scripts_folder_path = os.path.join(otls_folder_path, name)
+    if not os.path.exists(json_file_path):
+        return dict()
 
-    if not os.path.exists(scripts_folder_path):
-        os.mkdir(scripts_folder_path)
+    try:
+        with open(json_file_path, "r") as file_obj:
+            data = json.load(file_obj)
+    except ValueError:
+        return dict()
 
-    # Function to iterate through all the hdas inside each otl to
-    # extract python scripts. It returns a dict containing the unique
-    # names, file path and the last modified time of each otl.
-    otl_hash_dict = extract_py_from_otl(file_paths, scripts_folder_path)
+    if not isinstance(data, dict):
+        return dict()
+    return data
 
-    print("{0} folder generated at: {1}\n\n".format(name, otls_folder_path))
 
-    with open(os.path.join(scripts_folder_path, "log.json"), "w") as file_obj:
-        json.dump(otl_hash_dict, file_obj, indent=2)
+def write_json_atomic(json_file_path, data):
+    """
+    Writes data to a temporary json file renamed over json_file_path, so that
+    readers never see a partly written file, see atomic_writes.
+
+    :param str json_file_path: path to the json file.
+    :param dict data: data to write.
+    """
+
+    atomic_writes.write_json(json_file_path, data)
 
 
-def extract_py_from_otl(file_paths, scripts_folder_path):
+def write_json_if_changed(json_file_path, data):
     """
-    Extracts all the python scripts inside each otl.
+    Writes data to a json file, unless the file already holds the same data,
+    so that unchanged log files keep their last modified time. See write_json_atomic().
+
+    :param str json_file_path: path to the json file.
+    :param dict data: data to write.
+    """
+
+    if os.path.exists(json_file_path) and read_json_file(json_file_path) == data:
+        return
+
+    write_json_atomic(json_file_path, data)
+
+
+def read_otl_log(scripts_folder_path):
+    """
+    Reads the otl_hash_dict of a previous run from the scripts-folder log.json.
 
-    :param list file_paths: list of all the otl paths.
     :param str scripts_folder_path: path to the generated scripts-folder.
-    :return: dict otl_hash_dict - a dictionary of all the unique otl names [key]
-            and the file paths, along with the last modified times of
-            the respective otls [value].
-            Template: { filename_hash : {
-                            "file_path" : otl_file_path,
-                            "last_modified_time" : otl_last_modified_time
-                            }
+    :return: dict otl_hash_dict, empty if there was no previous run.
     """
 
-    # Get all the loaded hda files in the current scene, before installing any
-    default_otl_set = set(hou.hda.loadedFiles())
+    return read_json_file(os.path.join(scripts_folder_path, "log.json"))
 
-    # dict for storing and displaying the otl hash values
-    otl_hash_dict = dict()
 
-    # iterate through the file paths
-    for file_path in file_paths:
+def get_otl_file_dict(file_path, check_hash=False, hash_memo=None):
+    """
+    Gets the log.json entry of an otl, used to tell if it changed between runs.
 
-        # check if path is valid
-        if not os.path.exists(file_path):
-            print("file path not valid, continuing to other hdas: {0}\n\n".format(file_path))
-            continue
+    :param str file_path: File path to an otl.
+    :param bool check_hash: also hash the contents of the otl.
+    :param <file_hashes.HashMemo> hash_memo: see get_content_hash().
+    :return: dict {"file_path", "last_mod_time", "size"[, "content_hash"]}
+    """
 
-        try:
-            hou.hda.installFile(file_path)
-        except hou.Error:
-            print("Could not install hda file: {0}\n\n".format(file_path))
-            continue
+    stat_result = os.stat(file_path)
+    file_dict = {"file_path": file_path,
+                 "last_mod_time": str(dt.datetime.fromtimestamp(stat_result.st_mtime)),
+                 "size": stat_result.st_size}
+    if check_hash:
+        file_dict["content_hash"] = get_content_hash(file_path, hash_memo, stat_result)
+    return file_dict
 
-        try:
-            definitions = hou.hda.definitionsInFile(file_path)
-        except hou.Error:
-            print("Could not load hda file: {0}\n\n".format(file_path))
-            continue
 
-        # Make a folder for each otl
-        otl_unique_name = make_unique_name(file_path, os.path.basename(file_path))
-        otl_folder_path = os.path.join(scripts_folder_path, otl_unique_name)
+def is_otl_unchanged(file_dict, older_file_dict):
+    """
+    Compares the log.json entries of an otl from this run and the previous one.
 
-        # checks if a scripts folder was already generated, if it was,
-        # get the last modified time of the otl folders.
-        if os.path.exists(otl_folder_path):
-            json_file_path = os.path.join(scripts_folder_path, "log.json")
-            with open(json_file_path, "r") as file_obj:
-                older_time_data = json.load(file_obj)
+    :param dict file_dict: entry from get_otl_file_dict().
+    :param dict older_file_dict: entry from the previous run's log.json, or None.
+    :return: bool True if the otl doesn't need to be extracted again.
+    """
 
-            # if any of the otls were modified, update the scripts inside them
-            # (delete the old one and generate a new one)
-            if get_last_modified_time(file_path) != older_time_data[otl_unique_name][1]:
-                print("{0} was modified, updating it.\n\n".format(otl_unique_name))
-                shutil.rmtree(otl_folder_path)
+    if not isinstance(older_file_dict, dict) or older_file_dict.get("file_path") != file_dict["file_path"]:
+        return False
 
-        else:
-            os.mkdir(otl_folder_path)
+    # extracted with other filters
+    if older_file_dict.get("filter") != file_dict.get("filter"):
+        return False
 
-        # append to the otl hash dictionary
-        file_dict = {"file_path": file_path,
-                     "last_mod_time": str(get_last_modified_time(file_path))}
-        otl_hash_dict[otl_unique_name] = file_dict
+    # its isolated extraction failed, see extract_py_from_otl_isolated()
+    if "status" in older_file_dict:
+        return False
+
+    # with hashes, an otl which was only touched or copied counts as unchanged
+    if "content_hash" in file_dict:
+        return older_file_dict.get("content_hash") == file_dict["content_hash"]
 
-        # iterate through all the hdas inside the otl and extract the python scripts
-        hda_hash_dict = extract_py_from_hda(definitions, otl_folder_path)
+    return older_file_dict.get("size") == file_dict["size"] \
+        and older_file_dict.get("last_mod_time") == file_dict["last_mod_time"]
 
-        # write the hda hash dict to a json file
-        with open(os.path.join(otl_folder_path, "log.json"), "w") as file_obj:
-            json.dump(hda_hash_dict, file_obj, indent=2)
 
-    # Get all the hda files in the current scene after installing all the required ones.
-    current_otl_set = set(hou.hda.loadedFiles())
+def get_file_hash(file_path, chunk_size=file_hashes.DEFAULT_CHUNK_SIZE):
+    """
+    Generates a hash of the contents of a file, reading it in chunks.
+
+    :param str file_path: File path to an otl.
+    :param int chunk_size: Number of bytes read at a time.
+    :return: a hash key
+    """
 
-    # Get the difference, so that only the hda files installed by the tool in
-    # the current houdini session remain
-    otls_installed = current_otl_set - default_otl_set
+    return file_hashes.hash_file(file_path, chunk_size=chunk_size)
 
-    # Uninstall all the hda files installed by the tool
-    for file in otls_installed:
-        hou.hda.uninstallFile(file)
 
-    return otl_hash_dict
+def get_content_hash(file_path, hash_memo=None, stat_result=None):
+    """
+    :param str file_path: File path to an otl.
+    :param <file_hashes.HashMemo> hash_memo: if given, the otl is only read if it
+                                             changed since its hash was memoized,
+                                             and hashed with the memo's algorithm.
+    :param stat_result: os.stat() result of the otl, if already known.
+    :return: str hash of the otl contents.
+    """
+
+    if hash_memo is None:
+        return get_file_hash(file_path)
+    return hash_memo.get_hash(file_path, stat_result)
 
 
-def extract_py_from_hda(definitions, otl_folder_path):
+def extract_py_from_hda(definitions, otl_folder_path, definition_records=None, blob_store=None, script_filter=None,
+                        counts=None, writer_pool=None, interned_names=None):
     """
     Extracts all python scripts inside an hda.
 
     :param list definitions: List of all the hda definitions inside an otl.
     :param str otl_folder_path: Parent directory of the otl-folder.
+    :param list definition_records: if given, the definition records written are
+                                    appended to it, see write_definition_records().
+    :param <blob_store.BlobStore> blob_store: see write_result_to_disk().
+    :param <script_filters.ScriptFilter> script_filter: if given, the hdas it doesn't
+                                                        select are skipped, see iter_filtered_definitions().
+    :param dict counts: see write_definition_records().
+    :param <writer_pool.WriterPool> writer_pool: see write_hda_scripts().
+    :param dict interned_names: see get_script_names().
     :return: hda_hash_dict - a dictionary of all the unique hda names [key]
             and their name and context [value].
             Template: { hda_name_hash : context / asset_name }
     """
 
+    return write_definition_records((get_definition_record(definition, script_filter)
+                                     for definition in iter_filtered_definitions(definitions, script_filter)),
+                                    otl_folder_path, written_records=definition_records, blob_store=blob_store,
+                                    counts=counts, writer_pool=writer_pool, interned_names=interned_names)
+
+
+def get_definition_record(definition, script_filter=None):
+    """
+    :param <hou.HDADefinition> definition: hda file definition.
+    :param <script_filters.ScriptFilter> script_filter: see iter_py_scripts().
+    :return: dict definition record, the scripts are extracted once iterated.
+             Template: {"definition": str(definition),
+                        "node_type_name": node type name,
+                        "node_type": context / asset_name,
+                        "scripts": iterable of (kind, name, python script)}
+    """
+
+    return {"definition": str(definition),
+            "node_type_name": str(definition.nodeTypeName()),
+            "node_type": get_node_type_and_context(definition),
+            "scripts": iter_py_scripts(definition, script_filter)}
+
+
+def write_definition_records(definition_records, otl_folder_path, written_records=None, blob_store=None,
+                             counts=None, writer_pool=None, interned_names=None):
+    """
+    Makes a folder for each hda and writes its python scripts.
+
+    :param definition_records: iterable of definition records, see get_definition_record().
+    :param str otl_folder_path: Parent directory of the otl-folder.
+    :param list written_records: if given, the records written are appended to
+                                 it, with their scripts as a list.
+    :param <blob_store.BlobStore> blob_store: see write_result_to_disk().
+    :param dict counts: if given, its "hdas" and "scripts" counts are increased by the hdas and scripts written.
+    :param <writer_pool.WriterPool> writer_pool: see write_hda_scripts().
+    :param dict interned_names: see get_script_names().
+    :return: dict hda_hash_dict, see extract_py_from_hda()
+    """
+
     # dict for storing and displaying the hda hash values
     hda_hash_dict = dict()
 
-    # Make a folder for each hda and extract the python files inside
-    for definition in definitions:
-        hda_unique_name = make_unique_name(str(definition), str(definition.nodeTypeName()))
+    for definition_record in definition_records:
+        hda_unique_name = make_unique_name(definition_record["definition"], definition_record["node_type_name"])
         hda_folder_path = os.path.join(otl_folder_path, hda_unique_name)
 
-        if not os.path.exists(hda_folder_path):
-            os.mkdir(hda_folder_path)
-
-        # extract the python scripts inside all the components of the hda and write to file
-        extract_py_and_write(definition, hda_folder_path)
+        # write the python scripts inside all the components of the hda
+        with profiling.measure("definition", definition=definition_record["definition"]):
+            scripts = write_hda_scripts(definition_record["scripts"], hda_folder_path, blob_store=blob_store,
+                                        writer_pool=writer_pool, interned_names=interned_names)
 
         # append to the hda hash dictionary
-        try:
-            hda_node_type_and_context = definition.nodeTypeCategory().name() + "/" + definition.nodeTypeName()
-        except hou.Error as exc:
-            print("\n\nCouldn't access hou.hda methods nodeTypeCategory().name() and definition.nodeTypeName()\n\n")
+        hda_hash_dict[hda_unique_name] = definition_record["node_type"]
 
-            error_msg = {"hou Error": hou.Error.exceptionTypeName(exc),
-                         "Error message": hou.Error.instanceMessage(exc)}
-            error_dict = {str(definition): error_msg}
-            print(json.dumps(error_dict, indent=4))
-            hda_node_type_and_context = ""
+        if counts is not None:
+            counts["hdas"] += 1
+            counts["scripts"] += len(scripts)
 
-        hda_hash_dict[
-            hda_unique_name] = hda_node_type_and_context
+        if written_records is not None:
+            written_record = dict(definition_record)
+            written_record["scripts"] = [[script_file.kind, script_file.name, script_file.script]
+                                         for script_file in scripts]
+            written_records.append(written_record)
 
     return hda_hash_dict
 
@@ -258,72 +1968,371 @@ def get_hash(file_definition_str):
     :return: a hash key
     """
 
+    # md5 needs bytes on python 3
+    if not isinstance(file_definition_str, bytes):
+        file_definition_str = file_definition_str.encode("utf-8")
+
     a = hashlib.md5()
     a.update(file_definition_str)
     hash_key = a.hexdigest()
     return str(hash_key)
 
 
-def get_last_modified_time(file_path):
+def extract_py_and_write(definition, hda_folder_path, writer_pool=None):
     """
-    Gets the last modified time of an otl file.
+    Extracts all the python scripts inside an hda and writes it to a file on disk.
 
-    :param str file_path: File path to an otl.
-    :return: Last modified time of the otl.
+    :param <hou.HDADefinition> definition: hda file definition.
+    :param str hda_folder_path: Directory of the generated hda folder.
+    :param <writer_pool.WriterPool> writer_pool: see write_hda_scripts().
+    :return: list of the ScriptFile written, see write_hda_scripts().
     """
 
-    modify_time = os.path.getmtime(file_path)
-    modify_date = dt.datetime.fromtimestamp(modify_time)
-    return modify_date
+    return write_hda_scripts(iter_py_scripts(definition), hda_folder_path, writer_pool=writer_pool)
 
 
-def extract_py_and_write(definition, hda_folder_path):
+class ScriptFile(object):
+    """
+    A script written into an hda folder. Only its file name relative to the
+    scripts folder of its kind is kept, paths are joined when it is written.
+    The names are shared by the scripts of every hda of a run with the same
+    kind and name, see get_script_names().
     """
-    Extracts all the python scripts inside an hda and writes it to a file on disk.
 
-    :param <hou.HDADefinition> definition: hda file definition.
+    __slots__ = ("kind", "name", "file_name", "manifest_key", "script")
+
+    def __init__(self, kind, name, file_name, script, manifest_key=None):
+        """
+        :param str kind: kind of script, see SCRIPT_KINDS, also the name of its scripts folder.
+        :param str name: section or parameter name.
+        :param str file_name: see get_script_file_name().
+        :param str script: python script.
+        :param str manifest_key: see get_manifest_key(), made from kind and file_name if None.
+        """
+
+        self.kind = kind
+        self.name = name
+        self.file_name = file_name
+        self.manifest_key = manifest_key or kind + "/" + file_name
+        self.script = script
+
+    def get_manifest_key(self):
+        """
+        :return: str see get_manifest_key().
+        """
+
+        return self.manifest_key
+
+
+def get_script_names(kind, name, interned_names=None):
+    """
+    :param str kind: one of SCRIPT_KINDS.
+    :param str name: section or parameter name.
+    :param dict interned_names: {(kind, name): names} shared by the hdas of a run,
+                                so that the names repeated across hdas, eg. the
+                                parameters of the versions of an asset, are made
+                                and stored once per run.
+    :return: tuple (name, file name, manifest key) of the script, see get_script_file_name().
+    """
+
+    if interned_names is not None:
+        names = interned_names.get((kind, name))
+        if names is not None:
+            return names
+
+    file_name = get_script_file_name(kind, name)
+    names = (name, file_name, kind + "/" + file_name)
+    if interned_names is not None:
+        interned_names[(kind, name)] = names
+    return names
+
+
+def write_hda_scripts(scripts, hda_folder_path, blob_store=None, writer_pool=None, interned_names=None):
+    """
+    Writes the python scripts of an hda into its hda folder.
+
+    The size and hash of every script are kept in a manifest.json in the hda
+    folder. When the hda is extracted again only the scripts that changed are
+    written, and the scripts that were removed from the hda are deleted.
+
+    The scripts are walked first, then the folder tree of the hda is made in
+    one step, see make_hda_folder_tree(), before the scripts are written.
+
+    :param scripts: iterable of (kind, name, python script), see iter_py_scripts().
     :param str hda_folder_path: Directory of the generated hda folder.
+    :param <blob_store.BlobStore> blob_store: see write_result_to_disk().
+    :param <writer_pool.WriterPool> writer_pool: if given, the scripts are written
+                                                 in the background, and the manifest.json
+                                                 once they are all written.
+    :param dict interned_names: see get_script_names().
+    :return: list of the ScriptFile written, in the order of scripts.
     """
 
-    # Extract python scripts in the scripts tab.
-    write_result_to_disk(extract_py_scripts(definition, hda_folder_path))
+    manifest_file_path = os.path.join(hda_folder_path, "manifest.json")
+    older_manifest = read_json_file(manifest_file_path)
+    manifest = dict()
+
+    written_scripts = []
+    # kind: {file name: section, node or tool name}, see NAMED_SCRIPT_KINDS
+    names_log_files = dict()
+    # manifest key: ScriptFile, later parameters with the same name replace earlier ones
+    script_files = dict()
+
+    for kind, name, script in scripts:
+        name, file_name, manifest_key = get_script_names(kind, name, interned_names)
+        script_file = ScriptFile(kind, name, file_name, script, manifest_key)
+        if kind in NAMED_SCRIPT_KINDS:
+            names_log_files.setdefault(kind, dict())[script_file.file_name] = name
+
+        script_files[script_file.get_manifest_key()] = script_file
+        written_scripts.append(script_file)
+
+    make_hda_folder_tree(hda_folder_path, set(script_file.kind for script_file in written_scripts))
+
+    write_group = writer_pool.group() if writer_pool is not None else None
+    write_script_files(hda_folder_path, script_files.values(), older_manifest, manifest, blob_store=blob_store,
+                       write_group=write_group)
+
+    def write_logs():
+        older_kinds = set(manifest_key.split("/", 1)[0] for manifest_key in older_manifest)
+        older_kinds.add(MAIN_PYTHON_SCRIPTS)
+        for kind in NAMED_SCRIPT_KINDS:
+            names_log_file_path = os.path.join(hda_folder_path, kind, "log.json")
+            if kind in names_log_files:
+                write_json_if_changed(names_log_file_path, names_log_files[kind])
+            elif kind in older_kinds and os.path.exists(names_log_file_path):
+                # all the python sections (or nodes, or tools) were removed since the previous run
+                os.remove(names_log_file_path)
+
+        remove_stale_scripts(hda_folder_path, older_manifest, manifest)
+        write_json_if_changed(manifest_file_path, manifest)
+
+    # the manifest never lists a script that isn't written yet
+    if write_group is None:
+        write_logs()
+    else:
+        write_group.close(write_logs)
 
-    try:
-        ptg = definition.parmTemplateGroup()
-        parm_templates = ptg.parmTemplates()
-    except hou.Error as exc:
-        print("\n\nCould not access parm templates of: {0}\n\n".format(str(definition)))
-        error_msg = {"hou Error": hou.Error.exceptionTypeName(exc),
-                     "Error message": hou.Error.instanceMessage(exc)}
-        error_dict = {str(definition): error_msg}
-        print(json.dumps(error_dict, indent=4))
-        return
+    return written_scripts
 
-    # exclude hdas with no parameters
-    if parm_templates:
 
-        # iterate through each parameter
-        for parm_template in parm_templates:
+def make_hda_folder_tree(hda_folder_path, kinds):
+    """
+    Makes an hda folder and the scripts folders of its kinds of scripts. An
+    existing hda folder is listed once, instead of checking each folder.
+
+    :param str hda_folder_path: Directory of the generated hda folder.
+    :param kinds: kinds of the scripts of the hda, see SCRIPT_KINDS.
+    """
 
-            # Extract python scripts in the item generation tab inside certain parameters.
-            write_result_to_disk(extract_item_generation_scripts(hda_folder_path, parm_template))
+    if os.path.isdir(hda_folder_path):
+        folder_names = set(os.listdir(hda_folder_path))
+    else:
+        os.mkdir(hda_folder_path)
+        folder_names = set()
 
-            # Extract python scripts in the parameter callbacks.
-            write_result_to_disk(extract_parameter_callbacks(hda_folder_path, parm_template))
+    for kind in kinds:
+        if kind not in folder_names:
+            os.mkdir(os.path.join(hda_folder_path, kind))
 
 
-def write_result_to_disk(result):
+def write_result_to_disk(result, older_manifest=None, manifest=None, blob_store=None):
+    """
+    Writes extracted scripts to disk.
+
+    :param dict result: {"file_path" : python script}
+    :param dict older_manifest: manifest of the previous run, scripts whose size
+                                and hash didn't change are not written again.
+    :param dict manifest: manifest of the current run, updated in place.
+    :param <blob_store.BlobStore> blob_store: if given, each script is written
+                                              once to the blob store and the
+                                              script files are hardlinks to it.
+    """
 
     # Checks if the input dictionary has valid data
     if not result:
         return
 
     for filename, data in result.items():
-        # check if file exists, if it does, don't update it
-        if os.path.exists(filename):
+        write_script(filename, get_manifest_key(filename), data, older_manifest, manifest, blob_store=blob_store)
+
+
+def write_script_files(hda_folder_path, script_files, older_manifest=None, manifest=None, blob_store=None,
+                       write_group=None):
+    """
+    Writes the scripts of an hda to disk, see write_result_to_disk().
+
+    The scripts folders of the previous run are listed once each, instead of
+    checking if every script file exists, and the temporary files left in them
+    by a killed run are removed, see atomic_writes.
+
+    :param str hda_folder_path: Directory of the generated hda folder.
+    :param script_files: iterable of ScriptFile, with unique manifest keys.
+    :param dict older_manifest: see write_result_to_disk().
+    :param dict manifest: see write_result_to_disk().
+    :param <blob_store.BlobStore> blob_store: see write_result_to_disk().
+    :param <writer_pool.WriteGroup> write_group: see write_script().
+    """
+
+    script_files = list(script_files)
+
+    # kind: set of the file names in its scripts folder. Listed, and swept, before
+    # any script is written: the renames can be deferred, and the temporary files
+    # written by this run must not be taken for ones left by a killed run
+    existing_file_names = dict()
+    if older_manifest:
+        for script_file in script_files:
+            if script_file.kind not in existing_file_names and script_file.get_manifest_key() in older_manifest:
+                scripts_folder_path = os.path.join(hda_folder_path, script_file.kind)
+                file_names = os.listdir(scripts_folder_path)
+                atomic_writes.remove_temp_files(scripts_folder_path, file_names)
+                existing_file_names[script_file.kind] = set(file_names)
+
+    for script_file in script_files:
+        manifest_key = script_file.get_manifest_key()
+
+        script_exists = None
+        if older_manifest and manifest_key in older_manifest:
+            script_exists = script_file.file_name in existing_file_names[script_file.kind]
+
+        write_script(os.path.join(hda_folder_path, script_file.kind, script_file.file_name), manifest_key,
+                     script_file.script, older_manifest, manifest, blob_store=blob_store, script_exists=script_exists,
+                     write_group=write_group)
+
+
+def write_script(script_file_path, manifest_key, script, older_manifest=None, manifest=None, blob_store=None,
+                 script_exists=None, write_group=None):
+    """
+    Writes one script to disk, unless it hasn't changed since the previous run.
+
+    :param str script_file_path: path to the script inside its hda folder.
+    :param str manifest_key: see get_manifest_key().
+    :param str script: python script.
+    :param dict older_manifest: see write_result_to_disk().
+    :param dict manifest: see write_result_to_disk().
+    :param <blob_store.BlobStore> blob_store: see write_result_to_disk().
+    :param bool script_exists: if the script file exists, checked on disk if None.
+    :param <writer_pool.WriteGroup> write_group: if given, the script is written
+                                                 by a writer thread, see write_script_file().
+    """
+
+    manifest_entry = get_manifest_entry(script)
+    older_manifest_entry = older_manifest.get(manifest_key) if older_manifest else None
+
+    # skip the scripts that haven't changed since the previous run
+    if is_script_unchanged(script_file_path, manifest_entry, older_manifest_entry, blob_store, script_exists):
+        if manifest is not None:
+            manifest[manifest_key] = older_manifest_entry
+        return
+
+    if manifest is not None:
+        manifest[manifest_key] = manifest_entry
+
+    # with a writer thread, the time spent queueing the script is measured
+    with profiling.measure("write"):
+        if write_group is not None:
+            write_group.submit(write_script_file, script_file_path, script, manifest_entry, blob_store)
+        else:
+            write_script_file(script_file_path, script, manifest_entry, blob_store)
+    profiling.add_bytes("write", manifest_entry["size"])
+
+
+def write_script_file(script_file_path, script, manifest_entry, blob_store=None):
+    """
+    Writes a script file, or links it to its blob. Can run in a writer thread,
+    see writer_pool, so it isn't profiled.
+
+    :param str script_file_path: path to the script inside its hda folder.
+    :param str script: python script.
+    :param dict manifest_entry: manifest entry of the script, its blob reference is added if it isn't linked.
+    :param <blob_store.BlobStore> blob_store: see write_result_to_disk().
+    """
+
+    if blob_store is not None:
+        blob_reference = blob_store.place(script, manifest_entry["content_hash"], script_file_path)
+        if blob_reference is not None:
+            manifest_entry["blob"] = blob_reference
+    else:
+        # the file can be a hardlink to a blob of a previous --dedup run, which the rename replaces
+        atomic_writes.write_file(script_file_path, script)
+
+
+def is_script_unchanged(script_file_path, manifest_entry, older_manifest_entry, blob_store=None, script_exists=None):
+    """
+    :param str script_file_path: path to a script inside an hda folder.
+    :param dict manifest_entry: manifest entry of the script, see get_manifest_entry().
+    :param dict older_manifest_entry: manifest entry of the script from the previous run, or None.
+    :param <blob_store.BlobStore> blob_store: see write_result_to_disk().
+    :param bool script_exists: if the script file exists, checked on disk if None.
+    :return: bool True if the script doesn't need to be written again.
+    """
+
+    if not older_manifest_entry:
+        return False
+
+    if script_exists is None:
+        script_exists = os.path.exists(script_file_path)
+
+    if blob_store is None:
+        return older_manifest_entry == manifest_entry and script_exists
+
+    if dict((key, value) for key, value in older_manifest_entry.items() if key != "blob") != manifest_entry:
+        return False
+
+    blob_path = blob_store.get_blob_path(manifest_entry["content_hash"])
+    if not os.path.exists(blob_path):
+        return False
+    if "blob" in older_manifest_entry:
+        return True
+    return script_exists and os.path.samefile(script_file_path, blob_path)
+
+
+def get_manifest_key(script_file_path):
+    """
+    Gets the manifest key of a script, its path relative to the hda folder.
+
+    :param str script_file_path: path to a script inside an hda folder.
+    :return: str Example: "main_python_scripts/PythonModule_211dd2fe2199e4fae008f03322086ecb.py"
+    """
+
+    scripts_folder_path, file_name = os.path.split(script_file_path)
+    return os.path.basename(scripts_folder_path) + "/" + file_name
+
+
+def get_manifest_entry(script):
+    """
+    :param str script: python script.
+    :return: dict {"size": size in bytes, "content_hash": md5 of the script}
+    """
+
+    if not isinstance(script, bytes):
+        script = script.encode("utf-8")
+    return {"size": len(script), "content_hash": hashlib.md5(script).hexdigest()}
+
+
+def remove_stale_scripts(hda_folder_path, older_manifest, manifest):
+    """
+    Deletes the scripts of the previous run that are no longer in the hda, and
+    the script folders left empty.
+
+    :param str hda_folder_path: Directory of the generated hda folder.
+    :param dict older_manifest: manifest of the previous run.
+    :param dict manifest: manifest of the current run.
+    """
+
+    scripts_folder_names = set()
+    for manifest_key in older_manifest:
+        if manifest_key in manifest:
             continue
-        with open(filename, 'w') as file_obj:
-            file_obj.write(data)
+        script_file_path = os.path.join(hda_folder_path, *manifest_key.split("/"))
+        if os.path.exists(script_file_path):
+            os.remove(script_file_path)
+        scripts_folder_names.add(manifest_key.split("/")[0])
+
+    for scripts_folder_name in scripts_folder_names:
+        scripts_folder_path = os.path.join(hda_folder_path, scripts_folder_name)
+        if os.path.isdir(scripts_folder_path) and not os.listdir(scripts_folder_path):
+            os.rmdir(scripts_folder_path)
 
 
 def extract_parameter_callbacks(hda_folder_path, parm_template):
@@ -339,18 +2348,18 @@ def extract_parameter_callbacks(hda_folder_path, parm_template):
 
     result = dict()
 
-    parameter_callback_folder = os.path.join(hda_folder_path, "parameter_callbacks")
+    parameter_callback_folder = os.path.join(hda_folder_path, PARAMETER_CALLBACKS)
 
     # check if a callback script exists, and if it's in python
-    if parm_template.scriptCallbackLanguage() == hou.scriptLanguage.Python and len(parm_template.scriptCallback()) > 0:
+    callback_py_script = get_parameter_callback(parm_template)
+    if callback_py_script:
 
         # parameter callback folder
         if not os.path.exists(parameter_callback_folder):
             os.mkdir(parameter_callback_folder)
 
-        callback_py_script = parm_template.scriptCallback()
-        script_name = parm_template.name()
-        script_file_path = os.path.join(parameter_callback_folder, script_name + ".py")
+        script_file_path = os.path.join(parameter_callback_folder,
+                                        get_script_file_name(PARAMETER_CALLBACKS, parm_template.name()))
 
         assert script_file_path not in result
         result[script_file_path] = callback_py_script
@@ -372,29 +2381,112 @@ def extract_item_generation_scripts(hda_folder_path, parm_template):
     result = {}
 
     # name item generation scripts folder
-    item_generation_scripts_folder = os.path.join(hda_folder_path, "item_generation_scripts")
+    item_generation_scripts_folder = os.path.join(hda_folder_path, ITEM_GENERATION_SCRIPTS)
 
     # check if an item generation script exists, and if it's in python
-    if isinstance(parm_template, hou.StringParmTemplate) \
-            or isinstance(parm_template, hou.MenuParmTemplate) \
-            or isinstance(parm_template, hou.IntParmTemplate):
-        if parm_template.itemGeneratorScriptLanguage() == hou.scriptLanguage.Python:
-            if len(parm_template.itemGeneratorScript()) > 0:
-                item_generation_script = parm_template.itemGeneratorScript()
-                file_name = parm_template.name()
+    item_generation_script = get_item_generation_script(parm_template)
+    if item_generation_script:
+        # create item generation scripts folder
+        if not os.path.exists(item_generation_scripts_folder):
+            os.mkdir(item_generation_scripts_folder)
+
+        script_file_path = os.path.join(item_generation_scripts_folder,
+                                        get_script_file_name(ITEM_GENERATION_SCRIPTS, parm_template.name()))
+
+        assert script_file_path not in result
+        result[script_file_path] = item_generation_script
+
+    return result
+
+
+def get_script_file_name(kind, name):
+    """
+    Gets the file name a script is written to inside its scripts folder.
+
+    :param str kind: one of SCRIPT_KINDS.
+    :param str name: section or parameter name.
+    :return: str Example: "PythonModule_211dd2fe2199e4fae008f03322086ecb.py" for
+             main python scripts, "button.py" for parameter scripts.
+    """
+
+    if kind not in NAMED_SCRIPT_KINDS:
+        return name + ".py"
+
+    # check and rectify the file name for any potential bad names
+    file_name = name.replace(os.path.sep, '_').replace('.', '_').replace(' ', '_')
+    if kind != MAIN_PYTHON_SCRIPTS:
+        # node paths
+        file_name = file_name.replace('/', '_')
+    return file_name + "_" + get_hash(name) + ".py"
+
+
+def get_parameter_callback(parm_template):
+    """
+    :param <hou.ParmTemplate> parm_template: hda parameter template.
+    :return: str the python callback script of the parameter, empty if it has none.
+    """
+
+    if parm_template.scriptCallbackLanguage() == hou.scriptLanguage.Python:
+        return parm_template.scriptCallback()
+    return ""
+
+
+def get_item_generation_script(parm_template):
+    """
+    :param <hou.ParmTemplate> parm_template: hda parameter template.
+    :return: str the python item generation script of the parameter, empty if it has none.
+    """
+
+    if isinstance(parm_template, ITEM_GENERATION_PARM_TEMPLATES) \
+            and parm_template.itemGeneratorScriptLanguage() == hou.scriptLanguage.Python:
+        return parm_template.itemGeneratorScript()
+    return ""
 
-                # create item generation scripts folder
-                if not os.path.exists(item_generation_scripts_folder):
-                    os.mkdir(item_generation_scripts_folder)
 
-                script_file_path = os.path.join(item_generation_scripts_folder, file_name + ".py")
+def get_action_button_script(parm_template):
+    """
+    :param <hou.ParmTemplate> parm_template: hda parameter template.
+    :return: str the python script of the parameter's action button, empty if it has none.
+    """
+
+    return parm_template.tags().get("script_action", "")
+
+
+def get_default_expressions(parm_template):
+    """
+    :param <hou.ParmTemplate> parm_template: hda parameter template.
+    :return: list of (name, python default expression) of the parameter
+             components with a python default expression. The name is the
+             parameter name, followed by "_<component index>" for
+             parameters with several components.
+    """
+
+    if not isinstance(parm_template, DEFAULT_EXPRESSION_PARM_TEMPLATES):
+        return []
 
-                assert script_file_path not in result
-                result[script_file_path] = item_generation_script
+    expressions = parm_template.defaultExpression()
+    languages = parm_template.defaultExpressionLanguage()
 
+    result = []
+    for index, (expression, language) in enumerate(zip(expressions, languages)):
+        if expression and language == hou.scriptLanguage.Python:
+            name = parm_template.name()
+            if len(expressions) > 1:
+                name += "_{0}".format(index)
+            result.append((name, expression))
     return result
 
 
+def is_python_section(section, efo):
+    """
+    :param str section: hda section name.
+    :param dict efo: extra file options of the hda definition.
+    :return: bool True if the section holds a python script.
+    """
+
+    return bool(efo.get(section + "/IsPython"))
+
+
 def extract_py_scripts(definition, hda_folder_path):
     """
     Extracts the python scripts inside the scripts tab of the hda file (if any).
@@ -409,18 +2501,14 @@ def extract_py_scripts(definition, hda_folder_path):
     result = {}
 
     # folder name for the main python scripts
-    main_py_scripts_folder = os.path.join(hda_folder_path, "main_python_scripts")
+    main_py_scripts_folder = os.path.join(hda_folder_path, MAIN_PYTHON_SCRIPTS)
 
     try:
         # pull out the python scripts in the scripts tab
         definition_sections = definition.sections()
         efo = definition.extraFileOptions()
     except hou.Error as exc:
-        print("\n\nCould not access hda definition sections: {0}\n\n".format(str(definition)))
-        error_msg = {"hou Error": hou.Error.exceptionTypeName(exc),
-                     "Error message": hou.Error.instanceMessage(exc)}
-        error_dict = {str(definition): error_msg}
-        print(json.dumps(error_dict, indent=4))
+        print_hou_error("Could not access hda definition sections", definition, exc)
         return result
 
     sections_log_file = dict()
@@ -429,29 +2517,29 @@ def extract_py_scripts(definition, hda_folder_path):
     for section in definition_sections:
 
         # check if it's a python script
-        if section + "/IsPython" in efo.keys() and efo[section + "/IsPython"]:
-            py_script = definition_sections[section].contents()
+        if is_python_section(section, efo):
+            py_script = hda_reader.read_section_contents(definition_sections[section])
             original_file_name = definition_sections[section].name()
-            file_name_hash = get_hash(original_file_name)
-
-            # check and rectify the file name for any potential bad names
-            file_name = original_file_name.replace(os.path.sep, '_').replace('.', '_').replace(' ', '_')
-            file_name_with_hash = file_name + "_" + file_name_hash
+            script_file_name = get_script_file_name(MAIN_PYTHON_SCRIPTS, original_file_name)
 
             # making a folder for the main python scripts
             if not os.path.exists(main_py_scripts_folder):
                 os.mkdir(main_py_scripts_folder)
 
             # update sections_log_file dict
-            sections_log_file[file_name_with_hash + ".py"] = original_file_name
+            sections_log_file[script_file_name] = original_file_name
 
-            script_file_path = os.path.join(main_py_scripts_folder, file_name_with_hash + ".py")
+            script_file_path = os.path.join(main_py_scripts_folder, script_file_name)
 
             assert script_file_path not in result
             result[script_file_path] = py_script
 
-    with open(os.path.join(main_py_scripts_folder, "log.json"), "w") as file_obj:
-        json.dump(sections_log_file, file_obj, indent=2)
+    main_py_log_file_path = os.path.join(main_py_scripts_folder, "log.json")
+    if sections_log_file:
+        write_json_if_changed(main_py_log_file_path, sections_log_file)
+    elif os.path.exists(main_py_log_file_path):
+        # all the python sections were removed since the previous run
+        os.remove(main_py_log_file_path)
 
     return result
 
@@ -0,0 +1,352 @@
+"""
+Extraction server, keeping one warm hython session for many extractions.
+
+Started with `extract_python_from_otl --serve ADDRESS`, where ADDRESS is a
+Unix socket path (any address with a "/") or [host:]port on localhost. Both
+speak the same small http api, one request at a time:
+
+    POST /extract   {"otls": [otl paths],
+                     "format": "folder" (default), "jsonl" or "archive",
+                     "directory": parent of the scripts folder, for "folder",
+                     "path": output file, for "jsonl" and "archive",
+                     "name": name of the scripts folder (default "otl_scripts_folder"),
+                     "backend": "hou" or "native", "jobs": 1, "check_hash": false}
+                    -> {"status": "ok", "seconds": 0.1, "count": files or records written}
+    GET  /status    -> {"status": "ok", "requests": number of requests handled, ...}
+    POST /shutdown  -> stops the server once the response is sent.
+
+Example:
+    curl --unix-socket /tmp/extract.sock -d '{"otls": ["/path/to/otl.hda"], "directory": "/tmp"}' \\
+        http://localhost/extract
+
+The Unix socket is the safe default: it's created with a umask that keeps the
+other users out, only the user running the server can connect to it. The tcp
+server only listens on loopback addresses, but a localhost port is open to every
+user of the machine, and the requests write files anywhere the server can, so on
+a port every request has to send the server's token, "Authorization: Bearer
+TOKEN". The token is read from the EXTRACT_PYTHON_SERVER_TOKEN environment
+variable, or generated and printed when the server starts.
+
+Otls installed into the session by a request are uninstalled before the next
+one. Paths are resolved from the server's working directory, use absolute paths.
+"""
+
+import binascii
+import hmac
+import json
+import os
+import socket
+import stat
+import sys
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    import socketserver
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    import SocketServer as socketserver
+
+import extract_python_from_otl as epfo
+import profiling
+
+
+OUTPUT_FORMATS = ("folder", "jsonl", "archive")
+
+DEFAULT_HOST = "127.0.0.1"
+
+# environment variable holding the token of the tcp server
+TOKEN_ENV = "EXTRACT_PYTHON_SERVER_TOKEN"
+
+
+class ExtractionServerMixin(object):
+    """
+    State shared by the tcp and Unix socket servers.
+    """
+
+    def setup_extraction(self, cache=None, token=None):
+        """
+        :param <script_cache.ScriptCache> cache: script cache used by the "folder" requests, or None.
+        :param str token: token the requests have to send, or None.
+        """
+
+        self.cache = cache
+        self.token = token
+        self.request_count = 0
+        self.stopping = False
+        # otls loaded before the first request, kept installed between requests
+        self.default_otl_set = get_loaded_otls()
+
+
+class TCPExtractionServer(ExtractionServerMixin, HTTPServer):
+    pass
+
+
+class UnixExtractionServer(ExtractionServerMixin, socketserver.UnixStreamServer):
+
+    # the socket file was created by this server
+    bound = False
+
+    def server_bind(self):
+        remove_stale_socket(self.server_address)
+        # only the user running the server can connect, from the moment the socket file exists
+        umask = os.umask(stat.S_IRWXG | stat.S_IRWXO | stat.S_IXUSR)
+        try:
+            socketserver.UnixStreamServer.server_bind(self)
+        finally:
+            os.umask(umask)
+        self.bound = True
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        # also called when server_bind() fails, the file at the path isn't ours then
+        if self.bound and os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def remove_stale_socket(socket_path):
+    """
+    Removes the socket file left at socket_path by a server that died. Any
+    other file there is left alone, the path is most likely a typo.
+
+    :param str socket_path: path to the Unix socket.
+    """
+
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except OSError:
+        return
+
+    if not stat.S_ISSOCK(mode):
+        raise ValueError("not a socket, it won't be replaced: {0}".format(socket_path))
+    os.remove(socket_path)
+
+
+class ExtractionRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if not self.check_token():
+            return
+
+        if self.path.rstrip("/") != "/status":
+            self.send_json(404, {"status": "error", "message": "unknown path: {0}".format(self.path)})
+            return
+
+        self.send_json(200, {"status": "ok",
+                             "requests": self.server.request_count,
+                             "hou": epfo.HOU_AVAILABLE,
+                             "pid": os.getpid()})
+
+    def do_POST(self):
+        if not self.check_token():
+            return
+
+        path = self.path.rstrip("/")
+
+        if path == "/shutdown":
+            self.server.stopping = True
+            self.send_json(200, {"status": "ok"})
+            return
+
+        if path != "/extract":
+            self.send_json(404, {"status": "error", "message": "unknown path: {0}".format(self.path)})
+            return
+
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(content_length).decode("utf-8"))
+        except ValueError:
+            self.send_json(400, {"status": "error", "message": "the request body isn't valid json"})
+            return
+
+        self.server.request_count += 1
+        try:
+            response = run_request(request, cache=self.server.cache)
+        except ValueError as exc:
+            self.send_json(400, {"status": "error", "message": str(exc)})
+            return
+        except Exception as exc:
+            # keep the session alive for the next requests
+            self.send_json(500, {"status": "error", "message": "{0}: {1}".format(type(exc).__name__, exc)})
+            return
+        finally:
+            uninstall_new_otls(self.server.default_otl_set)
+
+        self.send_json(200, response)
+
+    def check_token(self):
+        """
+        :return: bool True if the request can be handled, an error is sent otherwise.
+        """
+
+        if self.server.token is None:
+            return True
+
+        authorization = self.headers.get("Authorization") or ""
+        if hmac.compare_digest(authorization.encode("utf-8"),
+                               "Bearer {0}".format(self.server.token).encode("utf-8")):
+            return True
+
+        self.send_json(401, {"status": "error", "message": "missing or wrong token"})
+        return False
+
+    def send_json(self, status_code, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        if isinstance(self.client_address, tuple) and self.client_address:
+            return str(self.client_address[0])
+        return "unix"
+
+    def log_message(self, format, *args):
+        sys.stderr.write("{0} - {1}\n".format(self.address_string(), format % args))
+
+
+def run_request(request, cache=None):
+    """
+    Runs one extraction request, see the module docstring.
+
+    :param dict request: the request.
+    :param <script_cache.ScriptCache> cache: script cache used by the "folder" requests, or None.
+    :return: dict response.
+    """
+
+    if not isinstance(request, dict):
+        raise ValueError("the request has to be a json object")
+
+    otl_paths = request.get("otls")
+    if not isinstance(otl_paths, list) or not otl_paths:
+        raise ValueError("'otls' has to be a list of otl paths")
+
+    output_format = request.get("format", "folder")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError("'format' has to be one of: {0}".format(", ".join(OUTPUT_FORMATS)))
+
+    backend = request.get("backend", epfo.DEFAULT_BACKEND)
+    if backend not in epfo.BACKENDS or (backend == "hou" and not epfo.HOU_AVAILABLE):
+        raise ValueError("backend not available: {0}".format(backend))
+
+    name = request.get("name", "otl_scripts_folder")
+    wall_start = profiling.wall_clock()
+
+    if output_format == "folder":
+        if not request.get("directory"):
+            raise ValueError("'directory' is needed for the folder format")
+        jobs = int(request.get("jobs", 1))
+        if jobs < 1:
+            raise ValueError("'jobs' has to be at least 1")
+        epfo.extract_python(otl_paths, request["directory"], name, backend=backend, jobs=jobs,
+                            check_hash=bool(request.get("check_hash")), cache=cache)
+        count = None
+    else:
+        if not request.get("path"):
+            raise ValueError("'path' is needed for the {0} format".format(output_format))
+        if output_format == "jsonl":
+            with open(request["path"], "w") as file_obj:
+                count = epfo.extract_python_jsonl(otl_paths, file_obj, backend=backend)
+        else:
+            epfo.output_sinks.get_archive_type(request["path"])
+            count = epfo.extract_python_to_archive(otl_paths, request["path"], name, backend=backend)
+
+    return {"status": "ok", "seconds": profiling.wall_clock() - wall_start, "count": count}
+
+
+def get_loaded_otls():
+    """
+    :return: set of the otls loaded into the houdini session, empty without hou.
+    """
+
+    if not epfo.HOU_AVAILABLE:
+        return set()
+    return set(epfo.hou.hda.loadedFiles())
+
+
+def uninstall_new_otls(default_otl_set):
+    """
+    Uninstalls the otls left installed by a request, eg. when it failed.
+
+    :param set default_otl_set: otls loaded when the server started.
+    """
+
+    for file_path in get_loaded_otls() - default_otl_set:
+        try:
+            epfo.hou.hda.uninstallFile(file_path)
+        except epfo.hou.Error:
+            print("Could not uninstall hda file: {0}\n\n".format(file_path))
+
+
+def make_token():
+    """
+    :return: str token of the tcp server, from the environment or random.
+    """
+
+    return os.environ.get(TOKEN_ENV) or binascii.hexlify(os.urandom(16)).decode("ascii")
+
+
+def check_loopback_host(host):
+    """
+    :param str host: host name or address the tcp server listens on.
+    :raises ValueError: if it isn't a loopback address, the server would be reachable from other machines.
+    """
+
+    try:
+        address = socket.gethostbyname(host)
+    except (socket.error, UnicodeError):
+        raise ValueError("invalid server host: {0}".format(host))
+
+    if not address.startswith("127."):
+        raise ValueError("the server only listens on localhost, not on: {0}".format(host))
+
+
+def make_server(address, cache=None, token=None):
+    """
+    :param str address: Unix socket path (contains a "/"), "host:port" or "port",
+                        where host is a loopback address, see check_loopback_host().
+    :param <script_cache.ScriptCache> cache: script cache used by the "folder" requests, or None.
+    :param str token: token the requests to a port have to send, see make_token() when None.
+                      Requests to a Unix socket don't send one.
+    :return: TCPExtractionServer or UnixExtractionServer, bound to the address.
+    """
+
+    if "/" in address:
+        server = UnixExtractionServer(address, ExtractionRequestHandler)
+        token = None
+    else:
+        host, _, port = address.rpartition(":")
+        try:
+            port = int(port)
+        except ValueError:
+            raise ValueError("invalid server address: {0}".format(address))
+        host = host or DEFAULT_HOST
+        check_loopback_host(host)
+        server = TCPExtractionServer((host, port), ExtractionRequestHandler)
+        token = token or make_token()
+
+    server.setup_extraction(cache=cache, token=token)
+    return server
+
+
+def serve(address, cache=None):
+    """
+    Handles extraction requests, one at a time, until a /shutdown request.
+
+    :param str address: see make_server().
+    :param <script_cache.ScriptCache> cache: script cache used by the "folder" requests, or None.
+    """
+
+    server = make_server(address, cache=cache)
+    print("Extraction server listening on: {0}\n\n".format(address))
+    if server.token is not None and not os.environ.get(TOKEN_ENV):
+        print("Requests have to send the header: Authorization: Bearer {0}\n\n".format(server.token))
+    sys.stdout.flush()
+
+    try:
+        while not server.stopping:
+            server.handle_request()
+    finally:
+        server.server_close()
@@ -0,0 +1,230 @@
+"""
+Content hashes of the otl files, and a memo of them kept between runs.
+
+An otl is hashed by streaming it through the hash in large chunks, read into
+one reused buffer. md5 is the default, and what the content_hash values of
+the log.json and the script cache keys have always been. crc32 (built in) and
+xxh64 (with the xxhash package) are faster, non-cryptographic alternatives,
+their hashes are prefixed with the algorithm name so they never compare equal
+to the md5 of another run. crc32 can't key the script cache, see
+CACHE_KEY_ALGORITHMS.
+
+The memo maps (path, size, mtime_ns, inode) to the hash of the file, and is
+kept in a hashes.json in the scripts folder, so an otl that hasn't been
+touched since it was last hashed isn't read again:
+
+    {"Path/to/otl_1.hda": {"size": 1200, "mtime_ns": 1692954931000000000, "inode": 2345,
+                           "algorithm": "md5", "hash": "0cc175b9c0f1b6a831c399e269772661"}}
+
+The folder and file name hashes, see extract_python_from_otl.get_hash(), are
+not content hashes and don't change.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import zlib
+
+import atomic_writes
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+PY2 = sys.version_info[0] == 2
+
+MD5 = "md5"
+CRC32 = "crc32"
+XXH64 = "xxh64"
+HASH_ALGORITHMS = (MD5, CRC32, XXH64)
+DEFAULT_HASH_ALGORITHM = MD5
+
+# hashes long enough to key the script cache, which collects the otls of many
+# runs and hosts: among that many otls, two crc32 would eventually collide and
+# one otl would be written with the scripts of another
+CACHE_KEY_ALGORITHMS = (MD5, XXH64)
+
+# bytes read at a time
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+MEMO_FILE_NAME = "hashes.json"
+
+
+class Crc32(object):
+    """
+    zlib.crc32 with the update() and hexdigest() methods of the hashlib objects.
+    """
+
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self):
+        return "{0:08x}".format(self.value & 0xffffffff)
+
+
+def make_hasher(algorithm=DEFAULT_HASH_ALGORITHM):
+    """
+    :param str algorithm: one of HASH_ALGORITHMS.
+    :return: new hash object, with update() and hexdigest().
+    """
+
+    if algorithm == MD5:
+        return hashlib.md5()
+    if algorithm == CRC32:
+        return Crc32()
+    if algorithm == XXH64:
+        if xxhash is None:
+            raise ValueError("the xxh64 hash needs the xxhash package")
+        return xxhash.xxh64()
+    raise ValueError("unknown hash algorithm: {0}".format(algorithm))
+
+
+def hash_file(file_path, algorithm=DEFAULT_HASH_ALGORITHM, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Hashes the contents of a file, streamed in chunks.
+
+    :param str file_path: path to the file.
+    :param str algorithm: one of HASH_ALGORITHMS.
+    :param int chunk_size: number of bytes read at a time.
+    :return: str hex digest, prefixed with "<algorithm>:" unless it's md5.
+    """
+
+    hasher = make_hasher(algorithm)
+
+    with open(file_path, "rb") as file_obj:
+        if PY2:
+            chunk = file_obj.read(chunk_size)
+            while chunk:
+                hasher.update(chunk)
+                chunk = file_obj.read(chunk_size)
+        else:
+            buffer = bytearray(chunk_size)
+            view = memoryview(buffer)
+            size = file_obj.readinto(buffer)
+            while size:
+                hasher.update(view[:size])
+                size = file_obj.readinto(buffer)
+
+    if algorithm == MD5:
+        return hasher.hexdigest()
+    return algorithm + ":" + hasher.hexdigest()
+
+
+def get_mtime_ns(stat_result):
+    """
+    :param stat_result: os.stat() result.
+    :return: int last modified time in nanoseconds.
+    """
+
+    mtime_ns = getattr(stat_result, "st_mtime_ns", None)
+    if mtime_ns is None:
+        # python 2
+        return int(stat_result.st_mtime * 1000000000)
+    return mtime_ns
+
+
+class HashMemo(object):
+    """
+    Usage:
+        memo = HashMemo.load(memo_file_path)
+        content_hash = memo.get_hash(file_path)
+        memo.save()
+
+    Hashes computed in worker processes are sent back with get_updates() and
+    merged with update(), so that only one process writes the memo file.
+    """
+
+    def __init__(self, memo_file_path=None, entries=None, algorithm=DEFAULT_HASH_ALGORITHM):
+        """
+        :param str memo_file_path: path to the hashes.json file, None to keep the memo in memory.
+        :param dict entries: memo entries, see the module docstring.
+        :param str algorithm: one of HASH_ALGORITHMS.
+        """
+
+        self.memo_file_path = memo_file_path
+        self.entries = entries or dict()
+        self.algorithm = algorithm
+        self.updates = dict()
+
+    @classmethod
+    def load(cls, memo_file_path, algorithm=DEFAULT_HASH_ALGORITHM):
+        """
+        :param str memo_file_path: path to the hashes.json file.
+        :param str algorithm: one of HASH_ALGORITHMS.
+        :return: HashMemo, empty if the file doesn't exist or can't be read.
+        """
+
+        try:
+            with open(memo_file_path, "r") as file_obj:
+                entries = json.load(file_obj)
+        except (IOError, OSError, ValueError):
+            entries = dict()
+        if not isinstance(entries, dict):
+            entries = dict()
+        return cls(memo_file_path, entries, algorithm=algorithm)
+
+    def get_hash(self, file_path, stat_result=None):
+        """
+        :param str file_path: path to the file.
+        :param stat_result: os.stat() result of the file, if already known.
+        :return: str content hash of the file, see hash_file(). The file is only
+                 read if its size, last modified time or inode changed since it
+                 was last hashed.
+        """
+
+        if stat_result is None:
+            stat_result = os.stat(file_path)
+
+        entry = {"size": stat_result.st_size,
+                 "mtime_ns": get_mtime_ns(stat_result),
+                 "inode": stat_result.st_ino,
+                 "algorithm": self.algorithm}
+
+        older_entry = self.entries.get(file_path)
+        if isinstance(older_entry, dict) and older_entry.get("hash") \
+                and all(older_entry.get(key) == value for key, value in entry.items()):
+            return older_entry["hash"]
+
+        entry["hash"] = hash_file(file_path, algorithm=self.algorithm)
+        self.entries[file_path] = entry
+        self.updates[file_path] = entry
+        return entry["hash"]
+
+    def get_updates(self):
+        """
+        :return: dict memo entries hashed since the memo was made or loaded.
+        """
+
+        return dict(self.updates)
+
+    def update(self, updates):
+        """
+        :param dict updates: memo entries from get_updates() of another process.
+        """
+
+        self.entries.update(updates)
+        self.updates.update(updates)
+
+    def save(self, file_paths=None):
+        """
+        Writes the memo to a temporary file renamed over the hashes.json file.
+
+        :param file_paths: if given, only the entries of these files are kept,
+                           eg. the otls of the run, so the memo doesn't grow forever.
+        """
+
+        if self.memo_file_path is None:
+            return
+
+        entries = self.entries
+        if file_paths is not None:
+            entries = dict((file_path, self.entries[file_path]) for file_path in file_paths
+                           if file_path in self.entries)
+
+        atomic_writes.write_json(self.memo_file_path, entries, sort_keys=True)
@@ -0,0 +1,679 @@
+"""
+Native reader for houdini INDX containers (.hda / .otl files).
+
+Reads operator type libraries directly from disk, without hou.hda.installFile(),
+so the python scripts inside them can be extracted from plain python with no
+houdini license.
+
+An INDX block starts with the "INDX" magic, two reserved header words and an
+index of entries (name, offset, size, modification time). Entry offsets are
+relative to the end of the index. The library block holds one entry per asset
+definition (eg. "Object/sky_scraper"), and each of those is a nested INDX block
+holding the sections of that definition (DialogScript, PythonModule, ...).
+
+The definition and section objects mirror the subset of the hou.HDADefinition
+and hou.HDASection API used by extract_python_from_otl.
+
+Compressed sections, eg. "Contents.gz", are stored compressed like hou
+returns them. iter_decompressed_chunks() streams them through the
+decompressor registered for their extension, a chunk at a time, so large
+sections are never held in memory whole. Sections are only read when their
+contents are asked for.
+"""
+
+import mmap
+import re
+import struct
+import sys
+import zlib
+
+try:
+    import hou
+except ImportError:
+    hou = None
+
+
+PY2 = sys.version_info[0] == 2
+
+INDX_MAGIC = b"INDX"
+
+# sections stored at library level, not asset definitions
+LIBRARY_SECTION_NAMES = ("INDEX_SECTION", "houdini.hdalibrary")
+
+# bytes read from a section at a time, and largest chunk of decompressed data yielded
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# UT_Options value types used in the ExtraFileOptions section
+OPTION_INT = 0
+OPTION_BOOL = 1
+OPTION_FLOAT = 2
+OPTION_STRING = 3
+OPTION_STRING_RAW = 12
+OPTION_INT_ARRAY = 13
+OPTION_FLOAT_ARRAY = 14
+
+
+class Error(Exception):
+    """
+    Raised when a library can not be read. Mirrors the hou.Error methods
+    used by the extraction tool's error reporting.
+    """
+
+    def exceptionTypeName(self):
+        return type(self).__name__
+
+    def instanceMessage(self):
+        return str(self)
+
+
+class HDAFormatError(Error):
+    """
+    Raised when a file is not a valid INDX container.
+    """
+
+
+if hou is not None:
+    scriptLanguage = hou.scriptLanguage
+else:
+    class scriptLanguage(object):
+        """
+        Stand in for hou.scriptLanguage outside of hython.
+        """
+        Python = "python"
+        Hscript = "hscript"
+
+
+def to_str(data):
+    """
+    Converts raw section bytes to a native str, the way hou returns section contents.
+
+    :param bytes data: Raw bytes.
+    :return: str
+    """
+
+    if PY2:
+        return data
+    return data.decode("utf-8", "replace")
+
+
+def make_gzip_decompressor():
+    """
+    :return: zlib decompressor of gzip (or zlib) streams, eg. of the Contents.gz sections.
+    """
+
+    # 32 + MAX_WBITS detects the gzip or zlib header
+    return zlib.decompressobj(32 + zlib.MAX_WBITS)
+
+
+# section name extension: function returning a decompressor, see register_decompressor()
+DECOMPRESSORS = {".gz": make_gzip_decompressor}
+
+
+def register_decompressor(extension, factory):
+    """
+    Registers the decompressor of the sections whose name ends with extension,
+    eg. for libraries saved with blosc compressed sections:
+
+        register_decompressor(".sc", make_blosc_decompressor)
+
+    :param str extension: section name extension, with the dot.
+    :param factory: function returning a new decompressor for each section, with the
+                    decompress(data) method, and optionally flush(), of zlib.decompressobj().
+                    Decompressors with an unconsumed_tail, like zlib's, are also
+                    given a max_length so that each chunk they return is bounded.
+    """
+
+    DECOMPRESSORS[extension] = factory
+
+
+def get_section_compression(section_name):
+    """
+    :param str section_name: name of a section, eg. "Contents.gz".
+    :return: str extension of a registered decompressor, or None if the section isn't compressed.
+    """
+
+    for extension in DECOMPRESSORS:
+        if section_name.endswith(extension) and len(section_name) > len(extension):
+            return extension
+    return None
+
+
+def get_uncompressed_name(section_name):
+    """
+    :param str section_name: name of a section, eg. "Contents.gz".
+    :return: str name of the section without its compression extension, eg. "Contents".
+    """
+
+    extension = get_section_compression(section_name)
+    if extension is None:
+        return section_name
+    return section_name[:-len(extension)]
+
+
+def iter_section_chunks(section, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    :param section: HDASection, or hou.HDASection whose contents are read at once.
+    :param int chunk_size: number of bytes per chunk.
+    :return: generator of the raw bytes of the section, chunk_size at a time.
+    """
+
+    if isinstance(section, HDASection):
+        offset, end = section._offset, section._offset + section._size
+        while offset < end:
+            yield section._library.read(offset, min(chunk_size, end - offset))
+            offset += chunk_size
+        return
+
+    data = section.binaryContents()
+    for offset in range(0, len(data), chunk_size):
+        yield data[offset:offset + chunk_size]
+
+
+def iter_decompressed_chunks(section, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams the contents of a section, decompressed if its name has the
+    extension of a registered decompressor.
+
+    :param section: HDASection, or hou.HDASection.
+    :param int chunk_size: number of bytes read at a time, and largest chunk
+                           yielded by bounded decompressors.
+    :return: generator of bytes chunks of the contents.
+    """
+
+    extension = get_section_compression(section.name())
+    if extension is None:
+        for chunk in iter_section_chunks(section, chunk_size):
+            yield chunk
+        return
+
+    decompressor = DECOMPRESSORS[extension]()
+    bounded = hasattr(decompressor, "unconsumed_tail")
+
+    try:
+        for chunk in iter_section_chunks(section, chunk_size):
+            while chunk:
+                if bounded:
+                    data = decompressor.decompress(chunk, chunk_size)
+                    chunk = decompressor.unconsumed_tail
+                else:
+                    data = decompressor.decompress(chunk)
+                    chunk = None
+                if data:
+                    yield data
+        # bz2 and lzma decompressors have no flush()
+        data = decompressor.flush() if hasattr(decompressor, "flush") else b""
+    except zlib.error as exc:
+        raise HDAFormatError("Could not decompress section {0}: {1}".format(section.name(), exc))
+    if data:
+        yield data
+
+
+def read_section_contents(section):
+    """
+    :param section: HDASection, or hou.HDASection.
+    :return: str contents of the section, decompressed, see iter_decompressed_chunks().
+    """
+
+    if get_section_compression(section.name()) is None:
+        return section.contents()
+    return to_str(b"".join(iter_decompressed_chunks(section)))
+
+
+def read_index(buf, offset, end):
+    """
+    Reads the index of the INDX block starting at offset.
+
+    :param buf: A buffer (mmap or bytes) holding the block.
+    :param int offset: Offset of the block inside the buffer.
+    :param int end: End of the block inside the buffer.
+    :return: tuple (entries, data_offset) - a list of (name, offset, size, mtime)
+             tuples with absolute offsets, and the offset the entry data starts at.
+    """
+
+    if end - offset < 16 or buf[offset:offset + 4] != INDX_MAGIC:
+        raise HDAFormatError("Missing INDX header at offset {0}".format(offset))
+
+    entry_count = struct.unpack_from(">I", buf, offset + 12)[0]
+    pos = offset + 16
+
+    entries = []
+    for _ in range(entry_count):
+        if pos + 4 > end:
+            raise HDAFormatError("Truncated INDX index at offset {0}".format(pos))
+        name_length = struct.unpack_from(">I", buf, pos)[0]
+        pos += 4
+        if pos + name_length + 12 > end:
+            raise HDAFormatError("Truncated INDX index at offset {0}".format(pos))
+        name = buf[pos:pos + name_length].decode("utf-8", "replace")
+        pos += name_length
+        entry_offset, entry_size, entry_mtime = struct.unpack_from(">III", buf, pos)
+        pos += 12
+        entries.append((name, entry_offset, entry_size, entry_mtime))
+
+    # entry offsets are relative to the end of the index
+    data_offset = pos
+    result = []
+    for name, entry_offset, entry_size, entry_mtime in entries:
+        start = data_offset + entry_offset
+        if start + entry_size > end:
+            raise HDAFormatError("INDX entry {0} is out of bounds".format(name))
+        result.append((name, start, entry_size, entry_mtime))
+
+    return result, data_offset
+
+
+def parse_extra_file_options(data):
+    """
+    Parses the binary UT_Options blob stored in the ExtraFileOptions section.
+
+    :param bytes data: Contents of the ExtraFileOptions section.
+    :return: dict {option name: value}, like hou.HDADefinition.extraFileOptions()
+    """
+
+    result = dict()
+    if len(data) < 4:
+        return result
+
+    option_count = struct.unpack_from(">I", data, 0)[0]
+    pos = 4
+
+    for _ in range(option_count):
+        key_length = struct.unpack_from(">H", data, pos)[0]
+        pos += 2
+        key = data[pos:pos + key_length].decode("utf-8", "replace")
+        pos += key_length
+        option_type = struct.unpack_from(">I", data, pos)[0]
+        pos += 4
+
+        if option_type == OPTION_BOOL:
+            value = bool(struct.unpack_from(">I", data, pos)[0])
+            pos += 4
+        elif option_type == OPTION_INT:
+            value = struct.unpack_from(">q", data, pos)[0]
+            pos += 8
+        elif option_type == OPTION_FLOAT:
+            value = struct.unpack_from(">d", data, pos)[0]
+            pos += 8
+        elif option_type in (OPTION_STRING, OPTION_STRING_RAW):
+            value_length = struct.unpack_from(">H", data, pos)[0]
+            pos += 2
+            value = to_str(data[pos:pos + value_length])
+            pos += value_length
+        elif option_type in (OPTION_INT_ARRAY, OPTION_FLOAT_ARRAY):
+            item_count = struct.unpack_from(">Q", data, pos)[0]
+            pos += 8
+            item_format = ">{0}{1}".format(item_count, "q" if option_type == OPTION_INT_ARRAY else "d")
+            value = tuple(struct.unpack_from(item_format, data, pos))
+            pos += 8 * item_count
+        else:
+            # unknown value size, the remaining options can't be located
+            break
+
+        result[key] = value
+
+    return result
+
+
+# tokens of a dialog script: braces, brackets, quoted strings and bare words
+DIALOG_SCRIPT_TOKEN_RE = re.compile(r'(\n)|([{}\[\]])|"((?:[^"\\]|\\.)*)"|([^\s{}\[\]"]+)', re.S)
+
+DIALOG_SCRIPT_COMMENT_RE = re.compile(r"^[ \t]*#.*$", re.M)
+
+DIALOG_SCRIPT_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\"}
+
+# dialog script blocks that hold parameters
+PARM_BLOCK_KEYWORDS = ("parm", "group", "groupsimple", "groupcollapsible", "groupradio",
+                       "grouplist", "multiparm", "multiscroll", "multiswitcher")
+
+
+def unescape_dialog_string(value):
+    """
+    Resolves the backslash escapes of a quoted dialog script string.
+
+    :param str value: String contents between the quotes.
+    :return: str
+    """
+
+    return re.sub(r"\\(.)", lambda match: DIALOG_SCRIPT_ESCAPES.get(match.group(1), match.group(1)), value)
+
+
+def parse_dialog_script(text):
+    """
+    Parses a DialogScript section into nested statements.
+
+    Every statement is a (keyword, args) tuple, where args holds strings and,
+    for "{ ... }" blocks, lists of statements.
+
+    :param str text: Contents of the DialogScript section.
+    :return: list of statements of the top level block.
+    """
+
+    stack = [[]]
+    statement = None
+
+    # drop comment lines, eg. "# Dialog script for ... automatically generated"
+    text = DIALOG_SCRIPT_COMMENT_RE.sub("", text)
+
+    for match in DIALOG_SCRIPT_TOKEN_RE.finditer(text):
+        newline, punctuation, quoted, word = match.groups()
+
+        if newline:
+            statement = None
+            continue
+
+        if punctuation == "{":
+            block = []
+            if statement is None:
+                statement = (None, [])
+                stack[-1].append(statement)
+            statement[1].append(block)
+            stack.append(block)
+            statement = None
+            continue
+
+        if punctuation == "}":
+            if len(stack) > 1:
+                stack.pop()
+            statement = None
+            continue
+
+        if punctuation:
+            # menu script lines are wrapped in [ ]
+            token = punctuation
+        elif quoted is not None:
+            token = unescape_dialog_string(quoted)
+        else:
+            token = word
+
+        if statement is None:
+            statement = (token, [])
+            stack[-1].append(statement)
+        else:
+            statement[1].append(token)
+
+    return stack[0]
+
+
+def first_block(args):
+    """
+    :param list args: Arguments of a dialog script statement.
+    :return: The first nested block in args, or an empty list.
+    """
+
+    for arg in args:
+        if isinstance(arg, list):
+            return arg
+    return []
+
+
+class ParmTemplate(object):
+    """
+    A parameter read from a DialogScript. Mirrors the script related
+    methods of hou.ParmTemplate.
+    """
+
+    def __init__(self, block_type, block):
+        self._block_type = block_type
+        self._name = ""
+        self._tags = dict()
+        self._menu_script = []
+        self._menu_language = scriptLanguage.Hscript
+        self._defaults = []
+        self._children = []
+
+        for keyword, args in block:
+            if keyword == "name" and args:
+                self._name = args[0]
+            elif keyword == "parmtag":
+                tag = first_block(args)
+                if tag and tag[0][1]:
+                    self._tags[tag[0][0]] = tag[0][1][0]
+            elif keyword and keyword.startswith("menu"):
+                self._read_menu(first_block(args))
+            elif keyword == "default":
+                self._read_default(first_block(args))
+            elif keyword in PARM_BLOCK_KEYWORDS:
+                self._children.append(ParmTemplate(keyword, first_block(args)))
+
+    def _read_menu(self, menu_block):
+        for keyword, args in menu_block:
+            if keyword == "[":
+                # [ "script line" ]
+                self._menu_script.append(args[0] if args and args[0] != "]" else "")
+            elif keyword == "language" and args:
+                if args[0] == "python":
+                    self._menu_language = scriptLanguage.Python
+
+    def _read_default(self, default_block):
+        # { "constant" [ "expression" language ] ... }, one value per component
+        tokens = []
+        for keyword, args in default_block:
+            tokens.append(keyword)
+            tokens.extend(arg for arg in args if not isinstance(arg, list))
+
+        index = 0
+        while index < len(tokens):
+            if tokens[index] == "[":
+                closing_index = tokens.index("]", index) if "]" in tokens[index:] else len(tokens)
+                expression = tokens[index + 1:closing_index]
+                language = expression[1] if len(expression) > 1 else ""
+                self._defaults.append((expression[0] if expression else "", language))
+                index = closing_index + 1
+            else:
+                self._defaults.append((tokens[index], None))
+                index += 1
+
+    def name(self):
+        return self._name
+
+    def blockType(self):
+        return self._block_type
+
+    def tags(self):
+        return dict(self._tags)
+
+    def children(self):
+        return list(self._children)
+
+    def parmTemplates(self):
+        # the parameters inside a folder or multiparm block
+        return tuple(self._children)
+
+    def defaultExpression(self):
+        return tuple(value if language is not None else "" for value, language in self._defaults)
+
+    def defaultExpressionLanguage(self):
+        return tuple(scriptLanguage.Python if language == "python" else scriptLanguage.Hscript
+                     for value, language in self._defaults)
+
+    def scriptCallback(self):
+        return self._tags.get("script_callback", "")
+
+    def scriptCallbackLanguage(self):
+        if self._tags.get("script_callback_language") == "python":
+            return scriptLanguage.Python
+        return scriptLanguage.Hscript
+
+    def itemGeneratorScript(self):
+        return "\n".join(self._menu_script)
+
+    def itemGeneratorScriptLanguage(self):
+        return self._menu_language
+
+
+class ParmTemplateGroup(object):
+    """
+    The parameters of a DialogScript. Mirrors hou.ParmTemplateGroup.
+    """
+
+    def __init__(self, dialog_script):
+        self._parm_templates = []
+        for keyword, args in parse_dialog_script(dialog_script):
+            # the whole dialog script is wrapped in a single { } block
+            if keyword is None:
+                for block_keyword, block_args in first_block(args):
+                    if block_keyword in PARM_BLOCK_KEYWORDS:
+                        self._parm_templates.append(ParmTemplate(block_keyword, first_block(block_args)))
+
+    def parmTemplates(self):
+        return tuple(self._parm_templates)
+
+
+class HDASection(object):
+    """
+    A section of an asset definition. Mirrors hou.HDASection.
+    """
+
+    def __init__(self, library, name, offset, size, mtime):
+        self._library = library
+        self._name = name
+        self._offset = offset
+        self._size = size
+        self._mtime = mtime
+
+    def name(self):
+        return self._name
+
+    def size(self):
+        return self._size
+
+    def modificationTime(self):
+        return self._mtime
+
+    def binaryContents(self):
+        return self._library.read(self._offset, self._size)
+
+    def contents(self):
+        return to_str(self.binaryContents())
+
+
+class HDADefinition(object):
+    """
+    An asset definition inside a library. Mirrors hou.HDADefinition.
+    """
+
+    def __init__(self, library, index_name, offset, size, mtime):
+        self._library = library
+        self._index_name = index_name
+        self._category, _, self._node_type_name = index_name.partition("/")
+        self._offset = offset
+        self._size = size
+        self._mtime = mtime
+        self._sections = None
+
+    def __str__(self):
+        # same form as str(hou.HDADefinition), so folder name hashes match the hou backend
+        return "<hou.HDADefinition of {0} {1} in {2}>".format(self._category, self._node_type_name,
+                                                             self._library.file_path)
+
+    def __repr__(self):
+        return self.__str__()
+
+    def libraryFilePath(self):
+        return self._library.file_path
+
+    def nodeTypeName(self):
+        return self._node_type_name
+
+    def nodeTypeCategory(self):
+        return NodeTypeCategory(self._category)
+
+    def modificationTime(self):
+        return self._mtime
+
+    def sections(self):
+        if self._sections is None:
+            entries, _ = read_index(self._library.buffer, self._offset, self._offset + self._size)
+            self._sections = dict()
+            for name, offset, size, mtime in entries:
+                self._sections[name] = HDASection(self._library, name, offset, size, mtime)
+        return dict(self._sections)
+
+    def extraFileOptions(self):
+        section = self.sections().get("ExtraFileOptions")
+        if section is None:
+            return dict()
+        return parse_extra_file_options(section.binaryContents())
+
+    def parmTemplateGroup(self):
+        section = self.sections().get("DialogScript")
+        if section is None:
+            return ParmTemplateGroup("")
+        return ParmTemplateGroup(section.contents())
+
+
+class NodeTypeCategory(object):
+    """
+    Mirrors hou.NodeTypeCategory.
+    """
+
+    def __init__(self, name):
+        self._name = name
+
+    def name(self):
+        return self._name
+
+
+class HDALibrary(object):
+    """
+    An INDX library file, memory mapped for reading.
+
+    Usage:
+        with HDALibrary(file_path) as library:
+            for definition in library.definitions():
+                ...
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.buffer = None
+        self._definitions = None
+
+        with open(file_path, "rb") as file_obj:
+            try:
+                self.buffer = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, mmap.error) as exc:
+                # empty files can't be mapped
+                raise HDAFormatError("Could not map {0}: {1}".format(file_path, exc))
+
+        try:
+            self._entries, _ = read_index(self.buffer, 0, len(self.buffer))
+        except (HDAFormatError, struct.error) as exc:
+            self.close()
+            raise HDAFormatError("{0} is not an INDX library: {1}".format(file_path, exc))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
+
+    def read(self, offset, size):
+        """
+        :param int offset: Absolute offset in the file.
+        :param int size: Number of bytes.
+        :return: bytes
+        """
+        return self.buffer[offset:offset + size]
+
+    def definitions(self):
+        """
+        :return: tuple of HDADefinition, in the order they are stored in the file.
+        """
+
+        if self._definitions is None:
+            definitions = []
+            for name, offset, size, mtime in self._entries:
+                if name in LIBRARY_SECTION_NAMES:
+                    continue
+                # library level sections which aren't nested INDX blocks aren't definitions
+                if self.buffer[offset:offset + 4] != INDX_MAGIC:
+                    continue
+                definitions.append(HDADefinition(self, name, offset, size, mtime))
+            self._definitions = tuple(definitions)
+        return self._definitions
@@ -0,0 +1,356 @@
+"""
+Finds the python inside the network of an asset, without instantiating its nodes.
+
+The Contents section of a definition (Contents.gz when compressed) holds the
+nodes inside the asset as a cpio archive (odc format) behind a 4 byte length,
+with files named after the node paths, relative to the asset node "hdaroot":
+
+    hdaroot/python1.init    "type = python"
+    hdaroot/python1.def     flags, inputs, "exprlanguage hscript", ...
+    hdaroot/python1.parm    parameter values, eg. the code of a Python SOP
+    hdaroot/python1.chn     animated channels and their expressions
+
+The archive is parsed as it is decompressed, and only the .init, .def, .parm
+and .chn files are kept, the .parm files only for the nodes with python code
+parameters. The Tools.shelf section holds the shelf tools of the asset, some
+of which are python scripts.
+
+Usage:
+    for node_script in iter_node_scripts(hda_reader.iter_decompressed_chunks(section)):
+        print(node_script.node_path, node_script.parm_name, node_script.script)
+"""
+
+import collections
+import xml.etree.ElementTree as ElementTree
+
+import hda_reader
+
+
+CONTENTS_SECTION = "Contents"
+TOOLS_SHELF_SECTION = "Tools.shelf"
+
+# node type name: parameters holding python code
+PYTHON_CODE_PARMS = {"python": ("python",),
+                     "pythonscript": ("python",)}
+
+CPIO_MAGIC = b"070707"
+# magic, dev, ino, mode, uid, gid, nlink, rdev, mtime, namesize, filesize, in octal digits
+CPIO_HEADER_SIZE = 76
+CPIO_TRAILER = "TRAILER!!!"
+
+ASSET_NODE_PATH = "hdaroot"
+
+# python code (or expression) of a parameter (or channel) of a node inside the asset
+NodeScript = collections.namedtuple("NodeScript", ("node_path", "parm_name", "script", "is_expression"))
+
+
+class ChunkReader(object):
+    """
+    Reads a stream of bytes chunks, keeping at most a chunk and the bytes asked for in memory.
+    """
+
+    def __init__(self, chunks):
+        """
+        :param chunks: iterable of bytes.
+        """
+
+        self._chunks = iter(chunks)
+        self._buffer = b""
+        self._offset = 0
+
+    def _fill(self, size):
+        while len(self._buffer) - self._offset < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return False
+            self._buffer = self._buffer[self._offset:] + chunk
+            self._offset = 0
+        return True
+
+    def peek(self, size):
+        """
+        :param int size: number of bytes.
+        :return: bytes the next size bytes, or less at the end of the stream, without consuming them.
+        """
+
+        self._fill(size)
+        return self._buffer[self._offset:self._offset + size]
+
+    def read(self, size):
+        """
+        :param int size: number of bytes.
+        :return: bytes
+        """
+
+        if not self._fill(size):
+            raise hda_reader.HDAFormatError("Truncated node contents")
+        data = self._buffer[self._offset:self._offset + size]
+        self._offset += size
+        return data
+
+    def skip(self, size):
+        """
+        Consumes size bytes, the chunks skipped over aren't kept.
+
+        :param int size: number of bytes.
+        """
+
+        available = len(self._buffer) - self._offset
+        if size <= available:
+            self._offset += size
+            return
+
+        size -= available
+        self._buffer = b""
+        self._offset = 0
+        while size > 0:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                raise hda_reader.HDAFormatError("Truncated node contents")
+            if len(chunk) > size:
+                self._buffer = chunk
+                self._offset = size
+                return
+            size -= len(chunk)
+
+
+def iter_cpio_entries(chunks, want=None):
+    """
+    :param chunks: iterable of the bytes chunks of a decompressed Contents section.
+    :param want: function called with each file name, the data of the files it
+                 returns False for is skipped over without being kept.
+    :return: generator of (file name, bytes data or None if skipped) tuples.
+    """
+
+    reader = ChunkReader(chunks)
+
+    # the archive is behind its length
+    start = reader.peek(16).find(CPIO_MAGIC)
+    if start < 0:
+        raise hda_reader.HDAFormatError("The node contents aren't a cpio archive")
+    reader.skip(start)
+
+    while reader.peek(1):
+        header = reader.read(CPIO_HEADER_SIZE)
+        if header[:6] != CPIO_MAGIC:
+            raise hda_reader.HDAFormatError("Missing cpio header in the node contents")
+        try:
+            name_size = int(header[59:65], 8)
+            file_size = int(header[65:76], 8)
+        except ValueError:
+            raise hda_reader.HDAFormatError("Invalid cpio header in the node contents")
+
+        name = reader.read(name_size).rstrip(b"\0").decode("utf-8", "replace")
+        if name == CPIO_TRAILER:
+            return
+
+        if want is None or want(name):
+            yield name, reader.read(file_size)
+        else:
+            reader.skip(file_size)
+            yield name, None
+
+
+def get_node_path(path):
+    """
+    :param str path: path of a node in the archive, eg. "hdaroot/geo1/python1".
+    :return: str path of the node relative to the asset node, eg. "geo1/python1", "." for the asset node itself.
+    """
+
+    if path == ASSET_NODE_PATH:
+        return "."
+    if path.startswith(ASSET_NODE_PATH + "/"):
+        return path[len(ASSET_NODE_PATH) + 1:]
+    return path
+
+
+def iter_statement_tokens(statements):
+    """
+    :param list statements: statements parsed by hda_reader.parse_dialog_script().
+    :return: generator of the tokens of the statements, nested blocks included.
+    """
+
+    for keyword, args in statements:
+        if keyword is not None:
+            yield keyword
+        for arg in args:
+            if isinstance(arg, list):
+                for token in iter_statement_tokens(arg):
+                    yield token
+            else:
+                yield arg
+
+
+def parse_init(text):
+    """
+    :param str text: contents of a .init file, eg. "type = python\\nmatchesdef = 0".
+    :return: str node type name.
+    """
+
+    for line in text.splitlines():
+        key, _, value = line.partition("=")
+        if key.strip() == "type":
+            return value.strip()
+    return ""
+
+
+def parse_expression_language(text):
+    """
+    :param str text: contents of a .def file.
+    :return: str default expression language of the node's parameters, "hscript" or "python".
+    """
+
+    for line in text.splitlines():
+        if line.startswith("exprlanguage "):
+            return line.split(None, 1)[1].strip()
+    return hda_reader.scriptLanguage.Hscript
+
+
+def iter_parm_values(text):
+    """
+    :param str text: contents of a .parm file:
+                     {
+                     version 0.8
+                     python	[ 0	locks=0 ]	(	"node = hou.pwd()\\n"	)
+                     }
+    :return: generator of (parameter name, list of value tokens between the parentheses) tuples.
+    """
+
+    for keyword, args in hda_reader.parse_dialog_script(text):
+        # the parameters are in a top level { } block
+        if keyword is not None:
+            continue
+        for parm_name, parm_args in hda_reader.first_block(args):
+            if "(" not in parm_args:
+                continue
+            values = parm_args[parm_args.index("(") + 1:]
+            yield parm_name, values[:-1] if values and values[-1] == ")" else values
+
+
+def iter_channel_expressions(text, default_language):
+    """
+    :param str text: contents of a .chn file:
+                     {
+                         channel tx {
+                           segment { length = 0 expr = hou.frame() language = python }
+                         }
+                     }
+    :param str default_language: expression language of the node, see parse_expression_language().
+    :return: generator of (channel name, expression, language) tuples, one per segment with an expression.
+    """
+
+    for keyword, args in iter_channels(hda_reader.parse_dialog_script(text)):
+        channel_name = args[0] if args and not isinstance(args[0], list) else ""
+        for segment_keyword, segment_args in hda_reader.first_block(args):
+            if segment_keyword != "segment":
+                continue
+            tokens = list(iter_statement_tokens([(None, segment_args)]))
+            values = dict()
+            for index in range(len(tokens) - 2):
+                if tokens[index + 1] == "=":
+                    values.setdefault(tokens[index], tokens[index + 2])
+            if values.get("expr"):
+                yield channel_name, values["expr"], values.get("language", default_language)
+
+
+def iter_channels(statements):
+    """
+    :param list statements: statements parsed by hda_reader.parse_dialog_script().
+    :return: generator of the ("channel", args) statements, in nested blocks too.
+    """
+
+    for keyword, args in statements:
+        if keyword == "channel":
+            yield keyword, args
+            continue
+        for arg in args:
+            if isinstance(arg, list):
+                for statement in iter_channels(arg):
+                    yield statement
+
+
+def iter_node_scripts(chunks):
+    """
+    Finds the python code parameters of the nodes inside an asset, eg. of
+    Python SOPs and LOPs, and the python expressions of their channels.
+
+    :param chunks: iterable of the bytes chunks of the decompressed Contents
+                   section, see hda_reader.iter_decompressed_chunks().
+    :return: generator of NodeScript, in the order of the archive.
+    """
+
+    # node path: node type name, and expression language
+    node_types = dict()
+    languages = dict()
+    # .parm and .chn files read before the .init or .def of their node
+    pending = []
+
+    def want(name):
+        path, _, extension = name.rpartition(".")
+        if extension == "parm":
+            return node_types.get(path, "") in PYTHON_CODE_PARMS or path not in node_types
+        return extension in ("init", "def", "chn")
+
+    def iter_file_scripts(path, extension, text):
+        if extension == "parm":
+            parm_names = PYTHON_CODE_PARMS.get(node_types.get(path), ())
+            for parm_name, values in iter_parm_values(text):
+                if parm_name in parm_names and values and values[0] not in ("[", "]") and values[0].strip():
+                    yield NodeScript(get_node_path(path), parm_name, values[0], False)
+        else:
+            for channel_name, expression, language in iter_channel_expressions(text, languages[path]):
+                if language == hda_reader.scriptLanguage.Python:
+                    yield NodeScript(get_node_path(path), channel_name, expression, True)
+
+    for name, data in iter_cpio_entries(chunks, want):
+        if data is None:
+            continue
+        path, _, extension = name.rpartition(".")
+        text = hda_reader.to_str(data)
+
+        if extension == "init":
+            node_types[path] = parse_init(text)
+        elif extension == "def":
+            languages[path] = parse_expression_language(text)
+        elif (extension == "parm" and path not in node_types) or (extension == "chn" and path not in languages):
+            pending.append((path, extension, text))
+        else:
+            for node_script in iter_file_scripts(path, extension, text):
+                yield node_script
+
+    for path, extension, text in pending:
+        languages.setdefault(path, hda_reader.scriptLanguage.Hscript)
+        for node_script in iter_file_scripts(path, extension, text):
+            yield node_script
+
+
+def iter_shelf_tool_scripts(text):
+    """
+    :param str text: contents of a Tools.shelf section.
+    :return: generator of (tool name, python script) tuples of the python shelf tools.
+    """
+
+    try:
+        root = ElementTree.fromstring(text.encode("utf-8") if not hda_reader.PY2 else text)
+    except ElementTree.ParseError as exc:
+        raise hda_reader.HDAFormatError("Could not parse the shelf tools: {0}".format(exc))
+
+    for tool in root.iter("tool"):
+        for script in tool.iter("script"):
+            if script.get("scriptType") == "python" and script.text and script.text.strip():
+                yield tool.get("name", ""), script.text
+
+
+def find_section(sections, section_name):
+    """
+    :param dict sections: sections of a definition, {name: section}.
+    :param str section_name: name of the section, eg. "Contents".
+    :return: the section, or its compressed version, eg. "Contents.gz", or None.
+    """
+
+    if section_name in sections:
+        return sections[section_name]
+    for name, section in sections.items():
+        if name != section_name and hda_reader.get_uncompressed_name(name) == section_name:
+            return section
+    return None
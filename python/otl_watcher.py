@@ -0,0 +1,354 @@
+"""
+Watch mode, keeping a scripts folder up to date while otls are saved.
+
+The otls are extracted once, then the watcher waits for them to change.
+Bursts of writes are debounced, and only the otls that changed are extracted
+again with extract_py_from_otl(). Their entries in the top level log.json are
+updated in place, the file is replaced atomically.
+
+On linux the folders holding the otls are watched with inotify (through
+ctypes, nothing to install). Elsewhere, or when inotify can't be used, the
+otls are polled with os.stat().
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import os
+import select
+import struct
+import sys
+import time
+
+import atomic_writes
+import extract_python_from_otl as epfo
+
+
+# seconds without new changes before the changed otls are extracted
+DEFAULT_DEBOUNCE = 1.0
+
+# seconds between two polls of the polling watcher
+POLL_INTERVAL = 2.0
+
+# inotify event masks, see <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+INOTIFY_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# wd, mask, cookie, name length
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")
+
+
+def watch(file_paths, otls_folder_path, name, scan_folder_paths=(), include=epfo.DEFAULT_SCAN_INCLUDE,
+          exclude=(), backend=epfo.DEFAULT_BACKEND, check_hash=False, cache=None, debounce=DEFAULT_DEBOUNCE,
+          script_filter=None):
+    """
+    Extracts the otls, then extracts them again whenever they change, until interrupted.
+
+    :param list file_paths: otl paths.
+    :param str otls_folder_path: Parent directory of the scripts-folder.
+    :param str name: name of the generated folder.
+    :param list scan_folder_paths: folders whose otls are watched, see extract_python_from_otl.scan_otl_paths().
+    :param include: file name globs of the otls in the scanned folders.
+    :param exclude: globs of the names or relative paths skipped in the scanned folders.
+    :param str backend: "hou" or "native", see extract_python_from_otl.BACKENDS.
+    :param bool check_hash: see extract_python_from_otl.extract_py_from_otl()
+    :param <script_cache.ScriptCache> cache: see extract_python_from_otl.extract_py_from_otl()
+    :param float debounce: seconds without new changes before the changed otls are extracted.
+    :param <script_filters.ScriptFilter> script_filter: see extract_python_from_otl.extract_py_from_otl()
+    """
+
+    all_file_paths = list(file_paths)
+    if scan_folder_paths:
+        all_file_paths.extend(epfo.scan_otl_paths(scan_folder_paths, include=include, exclude=exclude))
+    epfo.extract_python(all_file_paths, otls_folder_path, name, backend=backend, check_hash=check_hash, cache=cache,
+                        script_filter=script_filter)
+
+    scripts_folder_path = os.path.join(otls_folder_path, name)
+    watcher = make_watcher(file_paths, scan_folder_paths, include=include, exclude=exclude)
+    print("Watching for changes with {0}, press Ctrl+C to stop.\n\n".format(type(watcher).__name__))
+    sys.stdout.flush()
+
+    try:
+        while True:
+            changed_file_paths = wait_for_changes(watcher, debounce)
+            update_otls(sorted(changed_file_paths), scripts_folder_path, backend=backend, check_hash=check_hash,
+                        cache=cache, script_filter=script_filter)
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        print("Stopped watching.\n\n")
+    finally:
+        watcher.close()
+
+
+def update_otls(file_paths, scripts_folder_path, backend=epfo.DEFAULT_BACKEND, check_hash=False, cache=None,
+                script_filter=None):
+    """
+    Extracts the otls that changed and updates their entries in the top level log.json.
+
+    Deleted otls are removed from the log.json, their otl folders are kept,
+    like in a full run that isn't given them anymore. Otls that couldn't be
+    loaded, eg. while they are still being written, keep their older entry.
+
+    :param list file_paths: paths of the otls that changed.
+    :param str scripts_folder_path: path to the generated scripts-folder.
+    :param str backend: "hou" or "native", see extract_python_from_otl.BACKENDS.
+    :param bool check_hash: see extract_python_from_otl.extract_py_from_otl()
+    :param <script_cache.ScriptCache> cache: see extract_python_from_otl.extract_py_from_otl()
+    :param <script_filters.ScriptFilter> script_filter: see extract_python_from_otl.extract_py_from_otl()
+    :return: dict otl_hash_dict of the otls that were extracted.
+    """
+
+    otl_hash_dict = epfo.read_otl_log(scripts_folder_path)
+    existing_file_paths = [file_path for file_path in file_paths if os.path.isfile(file_path)]
+
+    changed_otl_hash_dict = epfo.extract_py_from_otl(existing_file_paths, scripts_folder_path, backend=backend,
+                                                     older_otl_hash_dict=otl_hash_dict, check_hash=check_hash,
+                                                     cache=cache, script_filter=script_filter)
+
+    extracted_file_paths = []
+    for file_path in file_paths:
+        otl_unique_name = epfo.make_unique_name(file_path, os.path.basename(file_path))
+        if otl_unique_name in changed_otl_hash_dict:
+            otl_hash_dict[otl_unique_name] = changed_otl_hash_dict[otl_unique_name]
+            extracted_file_paths.append(file_path)
+        elif os.path.isfile(file_path):
+            print("Could not extract, the older scripts are kept: {0}\n\n".format(file_path))
+        elif otl_hash_dict.pop(otl_unique_name, None) is not None:
+            print("{0} was removed.\n\n".format(file_path))
+
+    epfo.write_json_atomic(os.path.join(scripts_folder_path, "log.json"), otl_hash_dict)
+    atomic_writes.sync()
+
+    if cache is not None:
+        cache.evict()
+
+    for file_path in extracted_file_paths:
+        print("Extracted: {0}".format(file_path))
+    print("")
+
+    return changed_otl_hash_dict
+
+
+def wait_for_changes(watcher, debounce=DEFAULT_DEBOUNCE):
+    """
+    Waits for a change, then for the changes to stop for debounce seconds.
+
+    :param watcher: InotifyWatcher or PollingWatcher.
+    :param float debounce: seconds without new changes.
+    :return: set of the paths of the otls that changed.
+    """
+
+    changed_file_paths = set()
+    while not changed_file_paths:
+        changed_file_paths.update(watcher.wait(None))
+
+    while True:
+        new_changed_file_paths = watcher.wait(debounce)
+        if not new_changed_file_paths:
+            return changed_file_paths
+        changed_file_paths.update(new_changed_file_paths)
+
+
+def make_watcher(file_paths, scan_folder_paths=(), include=epfo.DEFAULT_SCAN_INCLUDE, exclude=()):
+    """
+    :return: InotifyWatcher, or PollingWatcher when inotify can't be used.
+    """
+
+    try:
+        return InotifyWatcher(file_paths, scan_folder_paths, include=include, exclude=exclude)
+    except (OSError, AttributeError):
+        return PollingWatcher(file_paths, scan_folder_paths, include=include, exclude=exclude)
+
+
+class PollingWatcher(object):
+    """
+    Finds the otls that changed by comparing their os.stat() between polls.
+    The scanned folders are scanned again on every poll.
+    """
+
+    def __init__(self, file_paths, scan_folder_paths=(), include=epfo.DEFAULT_SCAN_INCLUDE, exclude=(),
+                 poll_interval=POLL_INTERVAL):
+        self.file_paths = list(file_paths)
+        self.scan_folder_paths = list(scan_folder_paths)
+        self.include = include
+        self.exclude = exclude
+        self.poll_interval = poll_interval
+        self._stats = self.get_stats()
+
+    def get_stats(self):
+        """
+        :return: dict {otl path: (size, mtime, inode), None for missing otls}
+        """
+
+        file_paths = list(self.file_paths)
+        if self.scan_folder_paths:
+            file_paths.extend(epfo.scan_otl_paths(self.scan_folder_paths, include=self.include,
+                                                  exclude=self.exclude))
+
+        stats = dict()
+        for file_path in file_paths:
+            try:
+                stat_result = os.stat(file_path)
+            except OSError:
+                stats[file_path] = None
+                continue
+            stats[file_path] = (stat_result.st_size, stat_result.st_mtime, stat_result.st_ino)
+        return stats
+
+    def wait(self, timeout=None):
+        """
+        :param float timeout: seconds to wait for a change, None waits until there is one.
+        :return: set of the otls that changed, empty after the timeout.
+        """
+
+        end_time = None if timeout is None else time.time() + timeout
+        while True:
+            sleep_time = self.poll_interval
+            if end_time is not None:
+                sleep_time = min(sleep_time, max(0.0, end_time - time.time()))
+            time.sleep(sleep_time)
+
+            stats = self.get_stats()
+            changed_file_paths = set(file_path for file_path in set(stats) | set(self._stats)
+                                     if stats.get(file_path) != self._stats.get(file_path))
+            self._stats = stats
+
+            if changed_file_paths or (end_time is not None and time.time() >= end_time):
+                return changed_file_paths
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(object):
+    """
+    Watches the folders holding the otls with inotify. Otls are usually
+    saved to a temporary file renamed over the otl, so the folders are
+    watched rather than the otl files.
+    """
+
+    def __init__(self, file_paths, scan_folder_paths=(), include=epfo.DEFAULT_SCAN_INCLUDE, exclude=()):
+        self.include = include
+        self.exclude = exclude
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._inotify_add_watch = libc.inotify_add_watch
+        self._fd = libc.inotify_init1(IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        # {absolute otl path: otl path as given}
+        self.file_paths = dict((os.path.abspath(file_path), file_path) for file_path in file_paths)
+        # {watch descriptor: (folder path, scanned folder path or None, folder path relative to it)}
+        self._watches = dict()
+
+        try:
+            for folder_path in set(os.path.dirname(file_path) for file_path in self.file_paths):
+                self.add_watch(folder_path)
+            for scan_folder_path in scan_folder_paths:
+                self.add_scan_watches(scan_folder_path, scan_folder_path, "")
+        except OSError:
+            self.close()
+            raise
+
+    def add_watch(self, folder_path, scan_folder_path=None, relative_folder_path=""):
+        watch_descriptor = self._inotify_add_watch(self._fd, folder_path.encode("utf-8"), INOTIFY_WATCH_MASK)
+        if watch_descriptor < 0:
+            error_number = ctypes.get_errno()
+            if error_number in (errno.ENOENT, errno.ENOTDIR):
+                # removed in the meantime
+                return
+            raise OSError(error_number, "inotify_add_watch failed: {0}".format(folder_path))
+        # the same folder reached through a symlink keeps its first path
+        self._watches.setdefault(watch_descriptor, (folder_path, scan_folder_path, relative_folder_path))
+
+    def add_scan_watches(self, folder_path, scan_folder_path, relative_folder_path):
+        """
+        Watches a scanned folder and its sub folders.
+
+        :return: list of the otls already inside them, eg. in a folder moved into a scanned folder.
+        """
+
+        found_file_paths = []
+        folder_stack = [(folder_path, relative_folder_path)]
+        while folder_stack:
+            folder_path, relative_folder_path = folder_stack.pop()
+            self.add_watch(folder_path, scan_folder_path, relative_folder_path)
+            try:
+                for name, entry_path, is_folder in epfo.iter_folder_entries(folder_path):
+                    relative_path = relative_folder_path + name
+                    if epfo.is_excluded(name, relative_path, self.exclude):
+                        continue
+                    if is_folder:
+                        folder_stack.append((entry_path, relative_path + "/"))
+                    elif self.is_scanned_otl(name):
+                        found_file_paths.append(entry_path)
+            except OSError:
+                continue
+        return found_file_paths
+
+    def is_scanned_otl(self, name):
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.include)
+
+    def wait(self, timeout=None):
+        """
+        :param float timeout: seconds to wait for a change, None waits until there is one.
+        :return: set of the otls that changed, empty after the timeout.
+        """
+
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        data = os.read(self._fd, 64 * 1024)
+        changed_file_paths = set()
+        pos = 0
+        while pos + INOTIFY_EVENT_HEADER.size <= len(data):
+            watch_descriptor, mask, cookie, name_length = INOTIFY_EVENT_HEADER.unpack_from(data, pos)
+            pos += INOTIFY_EVENT_HEADER.size
+            name = data[pos:pos + name_length].rstrip(b"\0").decode("utf-8", "replace")
+            pos += name_length
+
+            if mask & IN_Q_OVERFLOW:
+                # events were lost, the unchanged otls are skipped by extract_py_from_otl()
+                changed_file_paths.update(self.file_paths.values())
+                for folder_path, scan_folder_path, relative_folder_path in list(self._watches.values()):
+                    if scan_folder_path is not None and relative_folder_path == "":
+                        changed_file_paths.update(self.add_scan_watches(folder_path, folder_path, ""))
+                continue
+
+            if watch_descriptor not in self._watches or not name:
+                continue
+            folder_path, scan_folder_path, relative_folder_path = self._watches[watch_descriptor]
+            file_path = os.path.join(folder_path, name)
+
+            absolute_file_path = os.path.abspath(file_path)
+            if absolute_file_path in self.file_paths:
+                changed_file_paths.add(self.file_paths[absolute_file_path])
+                continue
+
+            if scan_folder_path is None or epfo.is_excluded(name, relative_folder_path + name, self.exclude):
+                continue
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    changed_file_paths.update(self.add_scan_watches(file_path, scan_folder_path,
+                                                                    relative_folder_path + name + "/"))
+            elif self.is_scanned_otl(name):
+                changed_file_paths.add(file_path)
+
+        return changed_file_paths
+
+    def close(self):
+        if self._fd is not None and self._fd >= 0:
+            os.close(self._fd)
+        self._fd = None
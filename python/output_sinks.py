@@ -0,0 +1,250 @@
+"""
+Single file outputs for the scripts folder tree.
+
+Instead of one file on disk per script, the files of the scripts folder tree
+are written into one zip, tar or SQLite archive, keeping their paths
+(otl_scripts_folder/<otl>/<asset>/main_python_scripts/...). An archive can be
+materialized back into the folder tree with materialize_archive().
+"""
+
+import io
+import os
+import sqlite3
+import tarfile
+import time
+import zipfile
+
+
+ZIP_EXTENSIONS = (".zip",)
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz")
+SQLITE_EXTENSIONS = (".sqlite", ".sqlite3", ".db")
+ARCHIVE_EXTENSIONS = ZIP_EXTENSIONS + TAR_EXTENSIONS + SQLITE_EXTENSIONS
+
+# rows inserted into the SQLite database per executemany()
+SQLITE_BATCH_SIZE = 1000
+
+
+def to_bytes(contents):
+    """
+    :param contents: str or bytes file contents.
+    :return: bytes, utf-8 encoded
+    """
+
+    if isinstance(contents, bytes):
+        return contents
+    return contents.encode("utf-8")
+
+
+def get_archive_type(archive_path):
+    """
+    :param str archive_path: path to an archive.
+    :return: str "zip", "tar" or "sqlite"
+    """
+
+    lower_path = archive_path.lower()
+    if lower_path.endswith(ZIP_EXTENSIONS):
+        return "zip"
+    if lower_path.endswith(TAR_EXTENSIONS):
+        return "tar"
+    if lower_path.endswith(SQLITE_EXTENSIONS):
+        return "sqlite"
+    raise ValueError("Unknown archive type, use one of: {0}".format(", ".join(ARCHIVE_EXTENSIONS)))
+
+
+def open_sink(archive_path):
+    """
+    Creates an output sink for the archive type given by the file extension.
+
+    :param str archive_path: path to the archive, overwritten if it exists.
+    :return: ZipSink, TarSink or SQLiteSink
+    """
+
+    archive_type = get_archive_type(archive_path)
+    if archive_type == "zip":
+        return ZipSink(archive_path)
+    if archive_type == "tar":
+        return TarSink(archive_path)
+    return SQLiteSink(archive_path)
+
+
+class OutputSink(object):
+    """
+    Base class of the archive sinks. Paths are relative and "/" separated.
+
+    Usage:
+        with open_sink("scripts.zip") as sink:
+            sink.add_directory("otl_scripts_folder/otl/asset")
+            sink.add_file("otl_scripts_folder/otl/asset/main_python_scripts/x.py", script)
+    """
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self.file_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add_file(self, path, contents):
+        raise NotImplementedError
+
+    def add_directory(self, path):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+
+class ZipSink(OutputSink):
+
+    def __init__(self, archive_path):
+        super(ZipSink, self).__init__(archive_path)
+        self._zip_file = zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED)
+
+    def add_file(self, path, contents):
+        self._zip_file.writestr(path, to_bytes(contents))
+        self.file_count += 1
+
+    def add_directory(self, path):
+        self._zip_file.writestr(path.rstrip("/") + "/", b"")
+
+    def close(self):
+        self._zip_file.close()
+
+
+class TarSink(OutputSink):
+
+    def __init__(self, archive_path):
+        super(TarSink, self).__init__(archive_path)
+        mode = "w" if archive_path.lower().endswith(".tar") else "w:gz"
+        self._tar_file = tarfile.open(archive_path, mode)
+        self._mtime = time.time()
+
+    def add_file(self, path, contents):
+        data = to_bytes(contents)
+        tar_info = tarfile.TarInfo(path)
+        tar_info.size = len(data)
+        tar_info.mtime = self._mtime
+        self._tar_file.addfile(tar_info, io.BytesIO(data))
+        self.file_count += 1
+
+    def add_directory(self, path):
+        tar_info = tarfile.TarInfo(path.rstrip("/"))
+        tar_info.type = tarfile.DIRTYPE
+        tar_info.mode = 0o755
+        tar_info.mtime = self._mtime
+        self._tar_file.addfile(tar_info)
+
+    def close(self):
+        self._tar_file.close()
+
+
+class SQLiteSink(OutputSink):
+    """
+    Writes the files into a "files" table (path, contents), in a single
+    transaction committed on close. Directories have NULL contents.
+    """
+
+    def __init__(self, archive_path):
+        super(SQLiteSink, self).__init__(archive_path)
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+        self._connection = sqlite3.connect(archive_path)
+        self._connection.execute("CREATE TABLE files (path TEXT PRIMARY KEY, contents BLOB)")
+        self._rows = []
+
+    def add_file(self, path, contents):
+        self._rows.append((path, sqlite3.Binary(to_bytes(contents))))
+        self.file_count += 1
+        if len(self._rows) >= SQLITE_BATCH_SIZE:
+            self._flush()
+
+    def add_directory(self, path):
+        self._rows.append((path.rstrip("/"), None))
+
+    def _flush(self):
+        self._connection.executemany("INSERT OR REPLACE INTO files (path, contents) VALUES (?, ?)", self._rows)
+        self._rows = []
+
+    def close(self):
+        if self._connection is None:
+            return
+        self._flush()
+        self._connection.commit()
+        self._connection.close()
+        self._connection = None
+
+
+def iter_archive(archive_path):
+    """
+    Reads back the entries of an archive written by one of the sinks.
+
+    :param str archive_path: path to the archive.
+    :return: generator of (path, contents) tuples, contents is None for directories.
+    """
+
+    archive_type = get_archive_type(archive_path)
+
+    if archive_type == "zip":
+        with zipfile.ZipFile(archive_path, "r") as zip_file:
+            for zip_info in zip_file.infolist():
+                if zip_info.filename.endswith("/"):
+                    yield zip_info.filename.rstrip("/"), None
+                else:
+                    yield zip_info.filename, zip_file.read(zip_info)
+
+    elif archive_type == "tar":
+        tar_file = tarfile.open(archive_path, "r:*")
+        try:
+            for tar_info in tar_file:
+                if tar_info.isdir():
+                    yield tar_info.name, None
+                elif tar_info.isfile():
+                    yield tar_info.name, tar_file.extractfile(tar_info).read()
+        finally:
+            tar_file.close()
+
+    else:
+        connection = sqlite3.connect(archive_path)
+        try:
+            for path, contents in connection.execute("SELECT path, contents FROM files ORDER BY path"):
+                yield path, None if contents is None else bytes(contents)
+        finally:
+            connection.close()
+
+
+def materialize_archive(archive_path, directory):
+    """
+    Writes the files of an archive back into the scripts folder tree.
+
+    :param str archive_path: path to the archive.
+    :param str directory: parent directory of the generated scripts folder.
+    :return: int number of files written.
+    """
+
+    directory = os.path.abspath(directory)
+    file_count = 0
+
+    for path, contents in iter_archive(archive_path):
+        target_path = os.path.abspath(os.path.join(directory, *path.split("/")))
+
+        # don't follow absolute or ".." paths out of the target directory
+        if os.path.commonprefix([target_path, directory + os.sep]) != directory + os.sep:
+            print("Skipping archive entry outside of the target directory: {0}".format(path))
+            continue
+
+        if contents is None:
+            if not os.path.isdir(target_path):
+                os.makedirs(target_path)
+            continue
+
+        parent_path = os.path.dirname(target_path)
+        if not os.path.isdir(parent_path):
+            os.makedirs(parent_path)
+        with open(target_path, "wb") as file_obj:
+            file_obj.write(contents)
+        file_count += 1
+
+    return file_count
@@ -0,0 +1,242 @@
+"""
+Opt-in timing of the extraction phases.
+
+While a profiler is enabled, measure() records the wall time, CPU time and
+call count of a phase, and add_bytes() the bytes written. Each measurement is
+added to the totals of the phase, of the otl being extracted and of the hda
+definition being written:
+
+    profiler = profiling.enable()
+    with profiling.measure("load", library=file_path):
+        hou.hda.installFile(file_path)
+    profiling.disable()
+    profiler.to_dict()
+
+When no profiler is enabled measure() and add_bytes() do nothing.
+"""
+
+import time
+import timeit
+
+
+# wall and CPU clocks, time.clock was removed in python 3.8
+wall_clock = timeit.default_timer
+cpu_clock = time.process_time if hasattr(time, "process_time") else time.clock
+
+# profiler of the current process, see enable()
+_profiler = None
+
+
+def enable():
+    """
+    :return: Profiler the new profiler of the current process.
+    """
+
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def disable():
+    """
+    :return: Profiler the profiler that was enabled, or None.
+    """
+
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def get_profiler():
+    """
+    :return: Profiler the profiler that is enabled, or None.
+    """
+
+    return _profiler
+
+
+def measure(phase_name, library=None, definition=None):
+    """
+    :param str phase_name: name of the measured phase.
+    :param str library: otl the phase belongs to, defaults to the one of the enclosing measurement.
+    :param str definition: hda definition the phase belongs to, defaults to the one of the enclosing measurement.
+    :return: context manager timing its block, see Measurement.
+    """
+
+    if _profiler is None:
+        return NULL_MEASUREMENT
+    return Measurement(_profiler, phase_name, library, definition)
+
+
+def add_bytes(phase_name, byte_count):
+    """
+    :param str phase_name: name of the phase that wrote the bytes.
+    :param int byte_count: number of bytes written.
+    """
+
+    if _profiler is not None:
+        _profiler.add_bytes(phase_name, byte_count)
+
+
+def new_stats():
+    return {"wall": 0.0, "cpu": 0.0, "calls": 0, "bytes": 0}
+
+
+def add_stats(stats, other_stats):
+    for key in other_stats:
+        stats[key] = stats.get(key, 0) + other_stats[key]
+
+
+class NullMeasurement(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_MEASUREMENT = NullMeasurement()
+
+
+class Measurement(object):
+    """
+    Context manager timing one phase, see measure().
+    """
+
+    def __init__(self, profiler, phase_name, library=None, definition=None):
+        self.profiler = profiler
+        self.phase_name = phase_name
+        self.library = library
+        self.definition = definition
+
+    def __enter__(self):
+        profiler = self.profiler
+        self._previous = (profiler.library, profiler.definition)
+        if self.library is not None:
+            profiler.library = self.library
+            profiler.definition = None
+        if self.definition is not None:
+            profiler.definition = self.definition
+
+        profiler.depth += 1
+        self._wall_start = wall_clock()
+        self._cpu_start = cpu_clock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = wall_clock() - self._wall_start
+        cpu = cpu_clock() - self._cpu_start
+
+        profiler = self.profiler
+        profiler.depth -= 1
+        profiler.add_time(self.phase_name, wall, cpu, owns_definition=self.definition is not None)
+        profiler.library, profiler.definition = self._previous
+        return False
+
+
+class Profiler(object):
+    """
+    Totals of the measured phases. The totals of an otl are the sum of its
+    outermost measurements, the totals of a definition the sum of the
+    measurements that named it.
+    """
+
+    def __init__(self):
+        self.phases = dict()
+        self.libraries = dict()
+        self.library = None
+        self.definition = None
+        self.depth = 0
+
+    def get_library_dict(self):
+        library_dict = self.libraries.get(self.library)
+        if library_dict is None:
+            library_dict = {"wall": 0.0, "cpu": 0.0, "phases": dict(), "definitions": dict()}
+            self.libraries[self.library] = library_dict
+        return library_dict
+
+    def get_phase_dicts(self):
+        """
+        :return: list of the phase dicts the current measurement is added to.
+        """
+
+        phase_dicts = [self.phases]
+        if self.library is not None:
+            library_dict = self.get_library_dict()
+            phase_dicts.append(library_dict["phases"])
+            if self.definition is not None:
+                definition_dict = library_dict["definitions"].setdefault(
+                    self.definition, {"wall": 0.0, "cpu": 0.0, "phases": dict()})
+                phase_dicts.append(definition_dict["phases"])
+        return phase_dicts
+
+    def add_time(self, phase_name, wall, cpu, owns_definition=False):
+        for phase_dict in self.get_phase_dicts():
+            stats = phase_dict.setdefault(phase_name, new_stats())
+            stats["wall"] += wall
+            stats["cpu"] += cpu
+            stats["calls"] += 1
+
+        if self.library is None:
+            return
+
+        library_dict = self.get_library_dict()
+        if self.depth == 0:
+            library_dict["wall"] += wall
+            library_dict["cpu"] += cpu
+        if owns_definition:
+            definition_dict = library_dict["definitions"][self.definition]
+            definition_dict["wall"] += wall
+            definition_dict["cpu"] += cpu
+
+    def add_bytes(self, phase_name, byte_count):
+        for phase_dict in self.get_phase_dicts():
+            phase_dict.setdefault(phase_name, new_stats())["bytes"] += byte_count
+
+    def merge(self, profile_dict):
+        """
+        Adds the totals of another profiler, eg. from a worker process.
+
+        :param dict profile_dict: Profiler.to_dict() of the other profiler.
+        """
+
+        for phase_name, stats in profile_dict["phases"].items():
+            add_stats(self.phases.setdefault(phase_name, new_stats()), stats)
+
+        for file_path, other_library_dict in profile_dict["libraries"].items():
+            library_dict = self.libraries.setdefault(
+                file_path, {"wall": 0.0, "cpu": 0.0, "phases": dict(), "definitions": dict()})
+            library_dict["wall"] += other_library_dict["wall"]
+            library_dict["cpu"] += other_library_dict["cpu"]
+            for phase_name, stats in other_library_dict["phases"].items():
+                add_stats(library_dict["phases"].setdefault(phase_name, new_stats()), stats)
+
+            for definition, other_definition_dict in other_library_dict["definitions"].items():
+                definition_dict = library_dict["definitions"].setdefault(
+                    definition, {"wall": 0.0, "cpu": 0.0, "phases": dict()})
+                definition_dict["wall"] += other_definition_dict["wall"]
+                definition_dict["cpu"] += other_definition_dict["cpu"]
+                for phase_name, stats in other_definition_dict["phases"].items():
+                    add_stats(definition_dict["phases"].setdefault(phase_name, new_stats()), stats)
+
+    def slowest_libraries(self, count):
+        """
+        :param int count: number of otls.
+        :return: list of (file_path, wall time, cpu time) of the slowest otls, slowest first.
+        """
+
+        result = [(file_path, library_dict["wall"], library_dict["cpu"])
+                  for file_path, library_dict in self.libraries.items()]
+        result.sort(key=lambda item: item[1], reverse=True)
+        return result[:count]
+
+    def to_dict(self):
+        """
+        :return: dict Template: {"phases": {phase_name: {"wall", "cpu", "calls", "bytes"}},
+                                 "libraries": {file_path: {"wall", "cpu", "phases",
+                                                           "definitions": {str(definition): {"wall", "cpu",
+                                                                                             "phases"}}}}}
+        """
+
+        return {"phases": self.phases, "libraries": self.libraries}
@@ -0,0 +1,138 @@
+"""
+Append-only journal of the otls finished by a run, for --resume.
+
+Every otl is journaled once it's done, as one json line in journal.jsonl in
+the scripts folder. The top level log.json is only written at the end of a
+run, so when a run is interrupted, the journal is what's left of it. Once
+the log.json of a complete run is on disk, the journal is removed:
+
+    {"otl": "otl_1_hda_1b22...", "file_path": "Path/to/otl_1.hda", "last_mod_time": "...",
+     "size": 1200, "status": "extracted", "hdas": 2, "scripts": 14}
+
+The status is "extracted", "cached" (written from the script cache),
+"unchanged" (skipped, "hdas" and "scripts" are null), or the status of an
+otl whose isolated extraction failed, see extract_python_from_otl.
+"""
+
+import json
+import os
+
+
+JOURNAL_FILE_NAME = "journal.jsonl"
+
+EXTRACTED = "extracted"
+CACHED = "cached"
+UNCHANGED = "unchanged"
+
+# keys of the journal entries which aren't in the log.json entries
+JOURNAL_KEYS = ("otl", "hdas", "scripts")
+
+
+class RunJournal(object):
+    """
+    Usage:
+        with RunJournal(journal_file_path) as journal:
+            journal.append(make_entry(otl_unique_name, file_dict, EXTRACTED, hda_count, script_count))
+    """
+
+    def __init__(self, journal_file_path, resume=False):
+        """
+        :param str journal_file_path: path to the journal.jsonl file.
+        :param bool resume: append to the journal of the interrupted run, instead of starting a new one.
+        """
+
+        self.journal_file_path = journal_file_path
+        self.file_obj = open(journal_file_path, "a" if resume else "w")
+
+        # ends the line cut short by the interrupted run, so that it doesn't swallow the next entry
+        if resume and self.file_obj.tell() > 0:
+            with open(journal_file_path, "rb") as file_obj:
+                file_obj.seek(-1, os.SEEK_END)
+                if file_obj.read(1) != b"\n":
+                    self.file_obj.write("\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, entry):
+        """
+        Journals an otl, the line is flushed so that it survives the run being killed.
+
+        :param dict entry: see make_entry().
+        """
+
+        self.file_obj.write(json.dumps(entry, sort_keys=True) + "\n")
+        self.file_obj.flush()
+
+    def close(self):
+        self.file_obj.close()
+
+
+def make_entry(otl_unique_name, file_dict, status, hda_count=None, script_count=None):
+    """
+    :param str otl_unique_name: see extract_python_from_otl.make_unique_name().
+    :param dict file_dict: log.json entry of the otl.
+    :param str status: EXTRACTED, CACHED or UNCHANGED, unless file_dict has a status.
+    :param int hda_count: number of hdas written.
+    :param int script_count: number of scripts written.
+    :return: dict journal entry.
+    """
+
+    entry = dict(file_dict)
+    entry.setdefault("status", status)
+    entry["otl"] = otl_unique_name
+    entry["hdas"] = hda_count
+    entry["scripts"] = script_count
+    return entry
+
+
+def get_file_dict(entry):
+    """
+    :param dict entry: journal entry, see make_entry().
+    :return: dict log.json entry of the otl.
+    """
+
+    file_dict = dict((key, value) for key, value in entry.items() if key not in JOURNAL_KEYS)
+    if file_dict.get("status") in (EXTRACTED, CACHED, UNCHANGED):
+        del file_dict["status"]
+    return file_dict
+
+
+def remove_journal(journal_file_path):
+    """
+    Removes the journal of a complete run, its otls are in the log.json.
+
+    :param str journal_file_path: path to the journal.jsonl file.
+    """
+
+    if os.path.exists(journal_file_path):
+        os.remove(journal_file_path)
+
+
+def read_journal(journal_file_path):
+    """
+    Reads the journal of an interrupted run.
+
+    :param str journal_file_path: path to the journal.jsonl file.
+    :return: dict {otl_unique_name: log.json entry} of the otls journaled, the
+             last entry of each otl wins. A line cut short by the run being
+             killed is ignored.
+    """
+
+    otl_hash_dict = dict()
+    if not os.path.exists(journal_file_path):
+        return otl_hash_dict
+
+    with open(journal_file_path, "r") as file_obj:
+        for line in file_obj:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and "otl" in entry:
+                otl_hash_dict[entry["otl"]] = get_file_dict(entry)
+
+    return otl_hash_dict
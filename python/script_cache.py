@@ -0,0 +1,210 @@
+"""
+Persistent cache of the scripts extracted from each otl, shared between runs
+and scripts folders.
+
+Entries are keyed by the md5 (or xxh64) of the otl contents, see
+file_hashes.CACHE_KEY_ALGORITHMS, so an otl that was already
+extracted once, by any run into any scripts folder, is written from the cache
+without being loaded again. Each entry is a gzipped json file:
+
+    <cache_dir>/<key[:2]>/<key>.json.gz
+
+The cache directory can be shared between hosts: entries are written to a
+uniquely named temporary file and renamed into place, so readers only ever see
+complete entries, and an entry that can't be read counts as a miss. Reading an
+entry updates its last modified time, and evict() removes the least recently
+used entries once the cache grows over its size limit.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import socket
+import time
+import uuid
+
+
+# bump when the cached definition records change, older entries are then never read again
+CACHE_VERSION = 1
+
+# environment variable holding the default cache directory
+CACHE_DIR_ENV = "EXTRACT_PYTHON_CACHE_DIR"
+
+DEFAULT_CACHE_SIZE_MB = 1024
+
+ENTRY_EXTENSION = ".json.gz"
+TEMP_EXTENSION = ".tmp"
+
+# temporary files older than this were left by writers that died, in seconds
+STALE_TEMP_FILE_AGE = 60 * 60
+
+
+class ScriptCache(object):
+    """
+    Usage:
+        cache = ScriptCache("/path/to/cache", max_size=1024 * 1024 * 1024)
+        definition_records = cache.get(content_hash, "hou", file_path)
+        if definition_records is None:
+            definition_records = ...
+            cache.put(content_hash, "hou", file_path, definition_records)
+        cache.evict()
+
+    A definition record is a dict:
+        {"definition": str(hda definition),
+         "node_type_name": node type name,
+         "node_type": context / asset_name,
+         "scripts": [[kind, name, python script], ...]}
+    """
+
+    def __init__(self, cache_dir, max_size=DEFAULT_CACHE_SIZE_MB * 1024 * 1024):
+        """
+        :param str cache_dir: directory of the cache, created if it doesn't exist.
+        :param int max_size: size limit of the cache in bytes, see evict().
+        """
+
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    def get_key(self, content_hash, backend):
+        """
+        :param str content_hash: md5 of the otl contents.
+        :param str backend: backend the scripts are extracted with.
+        :return: str key of the cache entry.
+        """
+
+        key_string = "{0}:{1}:{2}".format(CACHE_VERSION, backend, content_hash)
+        return hashlib.md5(key_string.encode("utf-8")).hexdigest()
+
+    def get_entry_path(self, key):
+        """
+        :param str key: key of the cache entry.
+        :return: str path to the cache entry.
+        """
+
+        return os.path.join(self.cache_dir, key[:2], key + ENTRY_EXTENSION)
+
+    def get(self, content_hash, backend, file_path):
+        """
+        Reads the definition records cached for an otl.
+
+        The otl path is part of str(hda definition), which names the hda
+        folders. When the entry was written for a copy of the otl at another
+        path, the definition strings are updated to file_path.
+
+        :param str content_hash: md5 of the otl contents.
+        :param str backend: backend the scripts are extracted with.
+        :param str file_path: path of the otl being extracted.
+        :return: list of definition records, None on a cache miss.
+        """
+
+        entry_path = self.get_entry_path(self.get_key(content_hash, backend))
+
+        try:
+            with gzip.open(entry_path, "rb") as file_obj:
+                entry = json.loads(file_obj.read().decode("utf-8"))
+            cached_file_path = entry["file_path"]
+            definition_records = entry["definitions"]
+        except (IOError, OSError, EOFError, ValueError, KeyError, TypeError):
+            # missing, or written by an incompatible version
+            return None
+
+        # mark the entry as recently used
+        try:
+            os.utime(entry_path, None)
+        except OSError:
+            pass
+
+        if cached_file_path != file_path:
+            old_suffix = " in {0}>".format(cached_file_path)
+            new_suffix = " in {0}>".format(file_path)
+            for definition_record in definition_records:
+                definition_string = definition_record["definition"]
+                if definition_string.endswith(old_suffix):
+                    definition_record["definition"] = definition_string[:-len(old_suffix)] + new_suffix
+
+        return definition_records
+
+    def put(self, content_hash, backend, file_path, definition_records):
+        """
+        Writes the definition records of an otl to the cache.
+
+        :param str content_hash: md5 of the otl contents.
+        :param str backend: backend the scripts are extracted with.
+        :param str file_path: path of the extracted otl.
+        :param list definition_records: definition records, see the class docstring.
+        """
+
+        entry_path = self.get_entry_path(self.get_key(content_hash, backend))
+        entry_folder_path = os.path.dirname(entry_path)
+
+        try:
+            if not os.path.isdir(entry_folder_path):
+                os.makedirs(entry_folder_path)
+        except OSError:
+            # created by another writer in the meantime
+            if not os.path.isdir(entry_folder_path):
+                raise
+
+        data = json.dumps({"file_path": file_path, "definitions": definition_records}).encode("utf-8")
+
+        # unique per host and process, renamed into place once complete
+        temp_file_path = "{0}.{1}.{2}.{3}{4}".format(entry_path, socket.gethostname(), os.getpid(),
+                                                     uuid.uuid4().hex, TEMP_EXTENSION)
+        try:
+            with gzip.open(temp_file_path, "wb") as file_obj:
+                file_obj.write(data)
+            os.rename(temp_file_path, entry_path)
+        except (IOError, OSError):
+            print("Could not write the cache entry: {0}\n\n".format(entry_path))
+            if os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache is under its
+        size limit, along with the temporary files left by writers that died.
+
+        :return: int number of entries removed.
+        """
+
+        entries = []
+        total_size = 0
+        now = time.time()
+
+        if not os.path.isdir(self.cache_dir):
+            return 0
+
+        for folder_name in os.listdir(self.cache_dir):
+            folder_path = os.path.join(self.cache_dir, folder_name)
+            if not os.path.isdir(folder_path):
+                continue
+
+            for file_name in os.listdir(folder_path):
+                file_path = os.path.join(folder_path, file_name)
+                try:
+                    stat_result = os.stat(file_path)
+                    if file_name.endswith(TEMP_EXTENSION):
+                        if now - stat_result.st_mtime > STALE_TEMP_FILE_AGE:
+                            os.remove(file_path)
+                        continue
+                except OSError:
+                    # removed by another process in the meantime
+                    continue
+
+                if file_name.endswith(ENTRY_EXTENSION):
+                    entries.append((stat_result.st_mtime, stat_result.st_size, file_path))
+                    total_size += stat_result.st_size
+
+        removed_count = 0
+        for mtime, size, file_path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(file_path)
+                removed_count += 1
+            except OSError:
+                pass
+            total_size -= size
+
+        return removed_count
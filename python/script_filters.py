@@ -0,0 +1,140 @@
+"""
+Filters selecting the hda definitions and the python scripts extracted.
+
+Usage:
+    script_filter = ScriptFilter(node_types=["Sop/*"], kinds=["main_python_scripts"],
+                                 section_pattern="^PythonModule$")
+    epfo.extract_python(otl_paths, otls_folder_path, name, script_filter=script_filter)
+
+The node type, version and kind filters are checked before the sections or
+parm templates of a definition are read, so definitions that don't match are
+skipped without being accessed, and so are the sections of a definition when
+only parameter scripts are kept, and its parm templates when only python
+sections are kept.
+"""
+
+import fnmatch
+import re
+
+
+class ScriptFilter(object):
+    """
+    Every filter given has to match, a filter left out matches everything.
+    """
+
+    def __init__(self, node_types=(), section_pattern=None, kinds=(), min_version=None, max_version=None):
+        """
+        :param node_types: globs of "Category/node_type_name", eg. "Sop/*" or "*/mycompany::*",
+                           a definition is kept if any of them matches.
+        :param str section_pattern: regular expression searched in the names of the python sections.
+        :param kinds: kinds of scripts kept, see extract_python_from_otl.SCRIPT_KINDS. The
+                      CONTENTS_SCRIPT_KINDS are only extracted when given here.
+        :param str min_version: lowest definition version kept, eg. "1.5".
+        :param str max_version: highest definition version kept, eg. "2".
+        """
+
+        self.node_types = tuple(node_types or ())
+        self.section_pattern = section_pattern
+        self.kinds = frozenset(kinds or ())
+        self.min_version = min_version
+        self.max_version = max_version
+
+        self._section_regex = re.compile(section_pattern) if section_pattern is not None else None
+        self._min_version_key = parse_version(min_version) if min_version is not None else None
+        self._max_version_key = parse_version(max_version) if max_version is not None else None
+
+    def get_key(self):
+        """
+        :return: str stable description of the filter, stored in the log.json entries
+                 of the otls and in the script cache keys, so that the otls extracted
+                 with another filter are extracted again.
+        """
+
+        return "node_types={0};sections={1};kinds={2};versions={3}-{4}".format(
+            ",".join(self.node_types), self.section_pattern or "", ",".join(sorted(self.kinds)),
+            self.min_version or "", self.max_version or "")
+
+    def match_node_type(self, node_type):
+        """
+        :param str node_type: "Category/node_type_name", eg. "Object/sky_scraper".
+        :return: bool True if the definition is kept.
+        """
+
+        if not self.node_types:
+            return True
+        return any(fnmatch.fnmatchcase(node_type, pattern) for pattern in self.node_types)
+
+    def match_version(self, version):
+        """
+        :param str version: version of the definition, empty if it has none.
+        :return: bool True if the definition is kept. Definitions without a
+                 version are only kept when no version range is given.
+        """
+
+        if self._min_version_key is None and self._max_version_key is None:
+            return True
+        if not version:
+            return False
+
+        version_key = parse_version(version)
+        if self._min_version_key is not None and version_key < self._min_version_key:
+            return False
+        if self._max_version_key is not None and version_key > self._max_version_key:
+            return False
+        return True
+
+    def match_section(self, section_name):
+        """
+        :param str section_name: name of a python section, eg. "PythonModule".
+        :return: bool True if the section is kept.
+        """
+
+        return self._section_regex is None or self._section_regex.search(section_name) is not None
+
+    def match_kind(self, kind):
+        """
+        :param str kind: kind of script, see extract_python_from_otl.SCRIPT_KINDS.
+        :return: bool True if the scripts of this kind are kept.
+        """
+
+        return not self.kinds or kind in self.kinds
+
+    def match_any_kind(self, kinds):
+        """
+        :param kinds: kinds of script.
+        :return: bool True if the scripts of any of these kinds are kept, used
+                 to skip reading the sections or parm templates altogether.
+        """
+
+        return any(self.match_kind(kind) for kind in kinds)
+
+
+def parse_version(version):
+    """
+    Parses a version into a key that sorts numerically, "1.10" is above "1.9"
+    and "2.0" is equal to "2".
+
+    :param str version: eg. "2.0" or "1.5.3b".
+    :return: tuple of (int, str) components.
+    """
+
+    version_key = [(int(component), "") if component.isdigit() else (-1, component)
+                   for component in re.findall(r"\d+|[a-zA-Z]+", version)]
+    # "2" and "2.0" are the same version
+    while version_key and version_key[-1] == (0, ""):
+        version_key.pop()
+    return tuple(version_key)
+
+
+def get_version_from_node_type_name(node_type_name):
+    """
+    Gets the version of a namespaced node type name.
+
+    :param str node_type_name: eg. "mycompany::sky_scraper::2.0" or "sky_scraper".
+    :return: str version, eg. "2.0", empty if the name has no version.
+    """
+
+    components = node_type_name.split("::")
+    if len(components) > 1 and components[-1][:1].isdigit():
+        return components[-1]
+    return ""
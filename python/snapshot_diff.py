@@ -0,0 +1,199 @@
+"""
+Compares two scripts folders, eg. last night's and tonight's extraction.
+
+Only the log.json and manifest.json files are read to find the scripts that
+were added, removed or modified, by their content hash, so the comparison
+costs about the size of the manifests rather than of the scripts. Script
+files are only read for the unified diff, and only the ones that changed.
+
+Usage:
+    python -m extract_python_from_otl --diff old/otl_scripts_folder new/otl_scripts_folder
+    python -m extract_python_from_otl --diff old/otl_scripts_folder new/otl_scripts_folder --diff_format unified
+"""
+
+import difflib
+import json
+import os
+
+
+DIFF_FORMATS = ("json", "unified")
+
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"
+
+
+def read_json_file(json_file_path):
+    """
+    :param str json_file_path: path to a log.json or manifest.json file.
+    :return: dict contents of the file, empty if it doesn't exist or isn't valid.
+    """
+
+    try:
+        with open(json_file_path, "r") as file_obj:
+            data = json.load(file_obj)
+    except (IOError, OSError, ValueError):
+        return dict()
+    return data if isinstance(data, dict) else dict()
+
+
+def iter_changes(old_folder_path, new_folder_path):
+    """
+    Compares the manifests of two scripts folders.
+
+    :param str old_folder_path: path to the older scripts folder.
+    :param str new_folder_path: path to the newer scripts folder.
+    :return: generator of change dicts, one per script added, removed or modified, by otl and hda:
+             {"otl": otl unique name, "library": otl file path,
+              "hda": hda unique name, "node_type": context / asset_name,
+              "script": manifest key, eg. "parameter_callbacks/button.py",
+              "status": "added", "removed" or "modified",
+              "old_hash": content hash or None, "new_hash": content hash or None}
+    """
+
+    old_otl_hash_dict = read_json_file(os.path.join(old_folder_path, "log.json"))
+    new_otl_hash_dict = read_json_file(os.path.join(new_folder_path, "log.json"))
+
+    for otl_unique_name in sorted(set(old_otl_hash_dict) | set(new_otl_hash_dict)):
+        file_dict = new_otl_hash_dict.get(otl_unique_name) or old_otl_hash_dict.get(otl_unique_name)
+        library = file_dict.get("file_path") if isinstance(file_dict, dict) else None
+
+        old_otl_folder_path = os.path.join(old_folder_path, otl_unique_name)
+        new_otl_folder_path = os.path.join(new_folder_path, otl_unique_name)
+        old_hda_hash_dict = read_json_file(os.path.join(old_otl_folder_path, "log.json")) \
+            if otl_unique_name in old_otl_hash_dict else dict()
+        new_hda_hash_dict = read_json_file(os.path.join(new_otl_folder_path, "log.json")) \
+            if otl_unique_name in new_otl_hash_dict else dict()
+
+        for hda_unique_name in sorted(set(old_hda_hash_dict) | set(new_hda_hash_dict)):
+            node_type = new_hda_hash_dict.get(hda_unique_name) or old_hda_hash_dict.get(hda_unique_name)
+
+            old_manifest = read_json_file(os.path.join(old_otl_folder_path, hda_unique_name, "manifest.json")) \
+                if hda_unique_name in old_hda_hash_dict else dict()
+            new_manifest = read_json_file(os.path.join(new_otl_folder_path, hda_unique_name, "manifest.json")) \
+                if hda_unique_name in new_hda_hash_dict else dict()
+
+            for manifest_key in sorted(set(old_manifest) | set(new_manifest)):
+                old_hash = old_manifest[manifest_key].get("content_hash") if manifest_key in old_manifest else None
+                new_hash = new_manifest[manifest_key].get("content_hash") if manifest_key in new_manifest else None
+
+                if old_hash == new_hash:
+                    continue
+                if old_hash is None:
+                    status = ADDED
+                elif new_hash is None:
+                    status = REMOVED
+                else:
+                    status = MODIFIED
+
+                yield {"otl": otl_unique_name,
+                       "library": library,
+                       "hda": hda_unique_name,
+                       "node_type": node_type,
+                       "script": manifest_key,
+                       "status": status,
+                       "old_hash": old_hash,
+                       "new_hash": new_hash}
+
+
+def make_report(changes):
+    """
+    Groups the changes by otl and hda.
+
+    :param changes: iterable of change dicts, see iter_changes().
+    :return: dict {"summary": {"added": count, "removed": count, "modified": count},
+                   "libraries": {otl unique name: {"library": otl file path,
+                                                   "hdas": {hda unique name: {"node_type": context / asset_name,
+                                                                              "added": [manifest keys],
+                                                                              "removed": [manifest keys],
+                                                                              "modified": [manifest keys]}}}}}
+    """
+
+    summary = {ADDED: 0, REMOVED: 0, MODIFIED: 0}
+    libraries = dict()
+
+    for change in changes:
+        summary[change["status"]] += 1
+        library_dict = libraries.setdefault(change["otl"], {"library": change["library"], "hdas": dict()})
+        hda_dict = library_dict["hdas"].setdefault(change["hda"], {"node_type": change["node_type"],
+                                                                   ADDED: [], REMOVED: [], MODIFIED: []})
+        hda_dict[change["status"]].append(change["script"])
+
+    return {"summary": summary, "libraries": libraries}
+
+
+def read_script(scripts_folder_path, change, manifest_entry_hash):
+    """
+    Reads the script of a change from one of the scripts folders.
+
+    :param str scripts_folder_path: path to the scripts folder.
+    :param dict change: change dict, see iter_changes().
+    :param str manifest_entry_hash: content hash of the script in this folder, None if it isn't in it.
+    :return: list of the lines of the script, empty if it isn't in this folder.
+    """
+
+    if manifest_entry_hash is None:
+        return []
+
+    script_file_path = os.path.join(scripts_folder_path, change["otl"], change["hda"], *change["script"].split("/"))
+    if not os.path.exists(script_file_path):
+        # written to the blob store with --dedup, without a hardlink
+        manifest = read_json_file(os.path.join(scripts_folder_path, change["otl"], change["hda"], "manifest.json"))
+        blob_reference = manifest.get(change["script"], {}).get("blob")
+        if not blob_reference:
+            return []
+        script_file_path = os.path.join(scripts_folder_path, *blob_reference.split("/"))
+
+    with open(script_file_path, "r") as file_obj:
+        return file_obj.readlines()
+
+
+def write_unified_diff(changes, old_folder_path, new_folder_path, file_obj):
+    """
+    Writes a unified diff of the scripts that changed.
+
+    :param changes: iterable of change dicts, see iter_changes().
+    :param str old_folder_path: path to the older scripts folder.
+    :param str new_folder_path: path to the newer scripts folder.
+    :param file_obj: open text file (or sys.stdout) the diff is written to.
+    :return: int number of scripts that changed.
+    """
+
+    change_count = 0
+    for change in changes:
+        relative_path = "/".join((change["otl"], change["hda"], change["script"]))
+        old_lines = read_script(old_folder_path, change, change["old_hash"])
+        new_lines = read_script(new_folder_path, change, change["new_hash"])
+
+        file_obj.write("# {0} {1} in {2}\n".format(change["status"], change["node_type"], change["library"]))
+        for line in difflib.unified_diff(old_lines, new_lines, "a/" + relative_path, "b/" + relative_path):
+            file_obj.write(line if line.endswith("\n") else line + "\n")
+        change_count += 1
+
+    return change_count
+
+
+def write_diff(old_folder_path, new_folder_path, file_obj, diff_format="json"):
+    """
+    Compares two scripts folders and writes the result.
+
+    :param str old_folder_path: path to the older scripts folder.
+    :param str new_folder_path: path to the newer scripts folder.
+    :param file_obj: open text file (or sys.stdout) the result is written to.
+    :param str diff_format: "json" for the report of make_report(), or "unified", see DIFF_FORMATS.
+    :return: int number of scripts that changed.
+    """
+
+    for folder_path in (old_folder_path, new_folder_path):
+        if not os.path.exists(os.path.join(folder_path, "log.json")):
+            raise ValueError("not a scripts folder, it has no log.json: {0}".format(folder_path))
+
+    changes = iter_changes(old_folder_path, new_folder_path)
+
+    if diff_format == "unified":
+        return write_unified_diff(changes, old_folder_path, new_folder_path, file_obj)
+
+    report = make_report(changes)
+    json.dump(report, file_obj, indent=2, sort_keys=True)
+    file_obj.write("\n")
+    return sum(report["summary"].values())
@@ -0,0 +1,197 @@
+"""
+Writes synthetic INDX libraries (.hda files) for tests and benchmarks.
+
+The libraries have the layout hda_reader reads: a library INDX block with
+the INDEX_SECTION and houdini.hdalibrary entries and one nested INDX block
+per asset definition. Each definition holds a DialogScript with python
+callbacks and menu scripts, an ExtraFileOptions section flagging the python
+sections, python sections and one hscript section.
+
+Usage:
+    write_synthetic_library("/tmp/synthetic.hda", definition_count=10, parm_count=20,
+                            section_count=3, script_size=1024)
+"""
+
+import struct
+import zlib
+
+import hda_reader
+
+
+# same modification time on every entry, so generated libraries are reproducible
+ENTRY_MTIME = 1700000000
+
+
+def make_index_block(entries):
+    """
+    :param list entries: list of (name, bytes data) tuples.
+    :return: bytes INDX block holding the entries.
+    """
+
+    index = [hda_reader.INDX_MAGIC, struct.pack(">III", 0, 0, len(entries))]
+    offset = 0
+    for name, data in entries:
+        name = name.encode("utf-8")
+        index.append(struct.pack(">I", len(name)))
+        index.append(name)
+        index.append(struct.pack(">III", offset, len(data), ENTRY_MTIME))
+        offset += len(data)
+
+    return b"".join(index) + b"".join(data for name, data in entries)
+
+
+def make_extra_file_options(options):
+    """
+    :param dict options: {option name: bool value}
+    :return: bytes UT_Options blob of an ExtraFileOptions section.
+    """
+
+    data = [struct.pack(">I", len(options))]
+    for key in sorted(options):
+        key_bytes = key.encode("utf-8")
+        data.append(struct.pack(">H", len(key_bytes)))
+        data.append(key_bytes)
+        data.append(struct.pack(">II", hda_reader.OPTION_BOOL, int(bool(options[key]))))
+    return b"".join(data)
+
+
+def make_contents_section(files, compress=True):
+    """
+    :param list files: list of (file name, bytes data) tuples, eg. ("hdaroot/python1.init", b"type = python\n").
+    :param bool compress: gzip the section, as in a Contents.gz section.
+    :return: bytes Contents section holding the files, a cpio archive (odc format) behind its length.
+    """
+
+    archive = []
+    for name, data in list(files) + [("TRAILER!!!", b"")]:
+        name = name.encode("utf-8") + b"\0"
+        # magic, dev, ino, mode, uid, gid, nlink, rdev, mtime, namesize, filesize
+        archive.append("070707{0}{1:011o}{2:06o}{3:011o}".format("0" * 42, ENTRY_MTIME, len(name),
+                                                                  len(data)).encode("ascii"))
+        archive.append(name)
+        archive.append(data)
+    archive = b"".join(archive)
+    contents = struct.pack("<I", len(archive)) + archive
+
+    if not compress:
+        return contents
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(contents) + compressor.flush()
+
+
+def escape_dialog_string(value):
+    """
+    :param str value: string to quote.
+    :return: str quoted dialog script string, see hda_reader.unescape_dialog_string().
+    """
+
+    value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", "\\t")
+    return '"' + value + '"'
+
+
+def make_script(size, seed):
+    """
+    :param int size: approximate size of the script in bytes.
+    :param str seed: text making the script unique.
+    :return: str python script of at least one line.
+    """
+
+    lines = ["# {0}".format(seed)]
+    length = len(lines[0])
+    index = 0
+    while length < size:
+        line = "value_{0} = {0} * 2".format(index)
+        lines.append(line)
+        length += len(line) + 1
+        index += 1
+    return "\n".join(lines)
+
+
+def make_dialog_script(node_type_name, parm_count, script_size):
+    """
+    :param str node_type_name: name of the asset.
+    :param int parm_count: number of parameters, each with a python callback and menu script.
+    :param int script_size: approximate size of each script in bytes.
+    :return: str DialogScript section contents.
+    """
+
+    lines = ["# Dialog script for {0} automatically generated".format(node_type_name),
+             "",
+             "{",
+             "    name\t{0}".format(node_type_name),
+             "    script\t{0}".format(node_type_name),
+             "    label\t{0}".format(node_type_name),
+             ""]
+
+    for index in range(parm_count):
+        parm_name = "parm_{0}".format(index)
+        lines.extend(["    parm {",
+                      '        name\t"{0}"'.format(parm_name),
+                      '        label\t"Parm {0}"'.format(index),
+                      "        type\tstring",
+                      '        default\t{ "" }',
+                      "        menureplace {"])
+        for script_line in make_script(script_size, node_type_name + " menu " + parm_name).split("\n"):
+            lines.append("            [ {0} ]".format(escape_dialog_string(script_line)))
+        lines.extend(["            language python",
+                      "        }",
+                      '        parmtag\t{{ "script_callback" {0} }}'.format(
+                          escape_dialog_string(make_script(script_size, node_type_name + " callback " + parm_name))),
+                      '        parmtag\t{ "script_callback_language" "python" }',
+                      "    }"])
+
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def make_definition_block(node_type_name, parm_count, section_count, script_size):
+    """
+    :param str node_type_name: name of the asset.
+    :param int parm_count: number of parameters.
+    :param int section_count: number of python sections.
+    :param int script_size: approximate size of each script in bytes.
+    :return: bytes nested INDX block of the definition.
+    """
+
+    section_names = ["PythonModule"] + ["python_section_{0}".format(index) for index in range(1, section_count)]
+    section_names = section_names[:section_count]
+
+    options = dict((section_name + "/IsPython", True) for section_name in section_names)
+    options["Hscript/IsScript"] = True
+
+    entries = [("DialogScript", make_dialog_script(node_type_name, parm_count, script_size).encode("utf-8")),
+               ("ExtraFileOptions", make_extra_file_options(options)),
+               ("Hscript", b"echo hscript\n")]
+    for section_name in section_names:
+        entries.append((section_name, make_script(script_size, node_type_name + " " + section_name).encode("utf-8")))
+
+    return make_index_block(entries)
+
+
+def write_synthetic_library(file_path, definition_count=1, parm_count=1, section_count=1, script_size=256,
+                            name="synthetic"):
+    """
+    Writes a synthetic INDX library.
+
+    Every definition holds section_count main python scripts and parm_count
+    parameters with a python callback and item generation script each.
+
+    :param str file_path: path of the library, overwritten if it exists.
+    :param int definition_count: number of asset definitions.
+    :param int parm_count: number of parameters per definition.
+    :param int section_count: number of python sections per definition.
+    :param int script_size: approximate size of each script in bytes.
+    :param str name: prefix of the node type names.
+    :return: int number of python scripts in the library.
+    """
+
+    entries = [("INDEX_SECTION", b""), ("houdini.hdalibrary", b"")]
+    for index in range(definition_count):
+        node_type_name = "{0}_{1}".format(name, index)
+        entries.append(("Object/" + node_type_name,
+                        make_definition_block(node_type_name, parm_count, section_count, script_size)))
+
+    with open(file_path, "wb") as file_obj:
+        file_obj.write(make_index_block(entries))
+
+    return definition_count * (section_count + 2 * parm_count)
@@ -0,0 +1,266 @@
+import os
+import pytest
+import atomic_writes
+import extract_python_from_otl as epfo
+import run_journal
+import synthetic_hda
+
+# These tests use synthetic otls and the native backend, and don't need houdini.
+
+
+def read_folder(folder_path):
+    """
+    :param str folder_path: path to a folder.
+    :return: dict {"/" separated path relative to the parent of folder_path: contents} of the files in the folder.
+    """
+
+    parent_folder_path = os.path.dirname(folder_path)
+    files = dict()
+    for dir_path, dir_names, file_names in os.walk(folder_path):
+        for file_name in file_names:
+            file_path = os.path.join(dir_path, file_name)
+            with open(file_path, "r") as file_obj:
+                files[os.path.relpath(file_path, parent_folder_path).replace(os.sep, "/")] = file_obj.read()
+    return files
+
+
+@pytest.mark.parametrize(
+    'write_count',
+    [
+        pytest.param(1),
+        pytest.param(5),
+    ]
+)
+def test_killed_run(tmpdir, monkeypatch, write_count):
+    """
+    Kills an incremental run after a few files were written, and checks that
+    every file is either the old or the new one, and that the next run writes
+    the same files as a full extraction.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param monkeypatch: pytest monkeypatch fixture
+    :param int write_count: number of files written before the run is killed
+    """
+
+    folder_path = str(tmpdir)
+    scripts_folder_path = os.path.join(folder_path, "otl_scripts_folder")
+    otl_path = os.path.join(folder_path, "killed.hda")
+
+    synthetic_hda.write_synthetic_library(otl_path, definition_count=2, parm_count=2, script_size=200)
+    epfo.extract_python([otl_path], folder_path, "otl_scripts_folder", backend="native")
+    older_files = read_folder(scripts_folder_path)
+
+    synthetic_hda.write_synthetic_library(otl_path, definition_count=2, parm_count=2, script_size=300)
+    new_files = dict(epfo.iter_scripts_folder_files([otl_path], "otl_scripts_folder", backend="native"))
+
+    replace_file = atomic_writes.replace_file
+    replaced_file_paths = []
+
+    def killed_replace_file(source_file_path, file_path):
+        if len(replaced_file_paths) == write_count:
+            raise KeyboardInterrupt
+        replaced_file_paths.append(file_path)
+        replace_file(source_file_path, file_path)
+
+    monkeypatch.setattr(atomic_writes, "replace_file", killed_replace_file)
+    with pytest.raises(KeyboardInterrupt):
+        epfo.extract_python([otl_path], folder_path, "otl_scripts_folder", backend="native")
+    monkeypatch.setattr(atomic_writes, "replace_file", replace_file)
+
+    files = read_folder(scripts_folder_path)
+    # the journal is appended to, not replaced
+    del files["otl_scripts_folder/" + run_journal.JOURNAL_FILE_NAME]
+    for path, contents in files.items():
+        assert not atomic_writes.is_temp_file(path)
+        assert contents in (older_files.get(path), new_files.get(path))
+
+    epfo.extract_python([otl_path], folder_path, "otl_scripts_folder", backend="native")
+    files = read_folder(scripts_folder_path)
+    assert files == dict((path, contents) for path, contents in new_files.items() if contents is not None)
+
+
+def test_temp_files_removed(tmpdir):
+    """
+    Checks that the temporary files left by a run that was killed are removed
+    when the otl is extracted again.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    folder_path = str(tmpdir)
+    scripts_folder_path = os.path.join(folder_path, "otl_scripts_folder")
+    otl_path = os.path.join(folder_path, "temp.hda")
+
+    synthetic_hda.write_synthetic_library(otl_path, parm_count=1)
+    epfo.extract_python([otl_path], folder_path, "otl_scripts_folder", backend="native")
+
+    otl_folder_path = os.path.join(scripts_folder_path, epfo.make_unique_name(otl_path, "temp.hda"))
+    hda_folder_path = [os.path.join(otl_folder_path, name) for name in os.listdir(otl_folder_path)
+                       if os.path.isdir(os.path.join(otl_folder_path, name))][0]
+    temp_file_paths = [atomic_writes.get_temp_file_path(os.path.join(otl_folder_path, "log.json")),
+                       atomic_writes.get_temp_file_path(os.path.join(hda_folder_path, epfo.PARAMETER_CALLBACKS,
+                                                                     "parm_0.py"))]
+    for temp_file_path in temp_file_paths:
+        with open(temp_file_path, "w") as file_obj:
+            file_obj.write("print(")
+
+    synthetic_hda.write_synthetic_library(otl_path, parm_count=1, script_size=300)
+    epfo.extract_python([otl_path], folder_path, "otl_scripts_folder", backend="native")
+
+    assert not any(os.path.exists(temp_file_path) for temp_file_path in temp_file_paths)
+
+
+@pytest.mark.parametrize(
+    'write_threads',
+    [
+        pytest.param(0),
+        pytest.param(2),
+    ]
+)
+def test_renamed_script(tmpdir, write_threads):
+    """
+    Renames the first parameter of an otl to a new script written ahead of the
+    existing ones of its kind, and checks that its temporary file, waiting for
+    its rename, isn't swept as one left by a killed run.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param int write_threads: number of writer threads
+    """
+
+    folder_path = str(tmpdir)
+    scripts_folder_path = os.path.join(folder_path, "otl_scripts_folder")
+    otl_path = os.path.join(folder_path, "renamed.hda")
+
+    synthetic_hda.write_synthetic_library(otl_path, parm_count=2)
+    epfo.extract_python([otl_path], folder_path, "otl_scripts_folder", backend="native",
+                        write_threads=write_threads)
+
+    # same length, the offsets of the library sections don't change
+    with open(otl_path, "rb") as file_obj:
+        data = file_obj.read()
+    with open(otl_path, "wb") as file_obj:
+        file_obj.write(data.replace(b"parm_0", b"aaa_00"))
+    stat_result = os.stat(otl_path)
+    os.utime(otl_path, (stat_result.st_atime, stat_result.st_mtime + 10))
+
+    epfo.extract_python([otl_path], folder_path, "otl_scripts_folder", backend="native",
+                        write_threads=write_threads)
+
+    new_files = dict(epfo.iter_scripts_folder_files([otl_path], "otl_scripts_folder", backend="native"))
+    files = read_folder(scripts_folder_path)
+    assert files == dict((path, contents) for path, contents in new_files.items() if contents is not None)
+    assert any(path.endswith("/aaa_00.py") for path in files)
+
+
+def test_deferred_renames(tmpdir):
+    """
+    Checks that the files written in a deferred_renames() block are renamed
+    into place by sync(), and that their temporary files are removed when the
+    block raises.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    file_path = str(tmpdir.join("log.json"))
+    atomic_writes.write_file(file_path, "old")
+
+    with atomic_writes.deferred_renames():
+        atomic_writes.write_file(file_path, "new")
+        with open(file_path, "r") as file_obj:
+            assert file_obj.read() == "old"
+        atomic_writes.sync()
+        with open(file_path, "r") as file_obj:
+            assert file_obj.read() == "new"
+
+    with pytest.raises(KeyboardInterrupt):
+        with atomic_writes.deferred_renames():
+            atomic_writes.write_file(file_path, "interrupted")
+            raise KeyboardInterrupt
+
+    assert os.listdir(str(tmpdir)) == ["log.json"]
+    with open(file_path, "r") as file_obj:
+        assert file_obj.read() == "new"
+
+
+@pytest.mark.parametrize(
+    'use_syncfs',
+    [
+        pytest.param(True),
+        pytest.param(False),
+    ]
+)
+def test_sync_per_otl(tmpdir, monkeypatch, use_syncfs):
+    """
+    Checks that the files of each otl are synced together before the otl is
+    journaled: the temporary files first, then the renames, then the folders.
+    With syncfs(), each of the two flushes is one call, otherwise the files and
+    folders are fsynced one by one.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param monkeypatch: pytest monkeypatch fixture
+    :param bool use_syncfs: if syncfs() is available
+    """
+
+    folder_path = str(tmpdir)
+    scripts_folder_path = os.path.join(folder_path, "otl_scripts_folder")
+    otl_paths = [os.path.join(folder_path, "{0}.hda".format(name)) for name in ("a", "b")]
+    for otl_path in otl_paths:
+        synthetic_hda.write_synthetic_library(otl_path, definition_count=2, parm_count=1)
+
+    # (event, path, lines in the journal at that time)
+    events = []
+    journal_file_path = os.path.join(scripts_folder_path, run_journal.JOURNAL_FILE_NAME)
+    replace_file = atomic_writes.replace_file
+
+    def get_journal_line_count():
+        with open(journal_file_path, "r") as file_obj:
+            return len(file_obj.readlines())
+
+    def fsync_path(path):
+        events.append(("fsync", path, get_journal_line_count()))
+
+    def syncfs(fd):
+        # the whole scripts folder is on one file system
+        events.append(("syncfs", scripts_folder_path, get_journal_line_count()))
+        return 0
+
+    def recorded_replace_file(source_file_path, file_path):
+        events.append(("replace", file_path, get_journal_line_count()))
+        replace_file(source_file_path, file_path)
+
+    monkeypatch.setattr(atomic_writes, "fsync_path", fsync_path)
+    monkeypatch.setattr(atomic_writes, "get_syncfs", lambda: syncfs if use_syncfs else None)
+    monkeypatch.setattr(atomic_writes, "replace_file", recorded_replace_file)
+    epfo.extract_python(otl_paths, folder_path, "otl_scripts_folder", backend="native")
+
+    written_paths = set(os.path.join(folder_path, *path.split("/")) for path, contents
+                        in epfo.iter_scripts_folder_files(otl_paths, "otl_scripts_folder", backend="native")
+                        if contents is not None)
+
+    for otl_index, otl_path in enumerate(otl_paths):
+        otl_folder_path = os.path.join(scripts_folder_path,
+                                       epfo.make_unique_name(otl_path, os.path.basename(otl_path)))
+        otl_events = [(index, event, path, line_count) for index, (event, path, line_count) in enumerate(events)
+                      if path == otl_folder_path or path.startswith(otl_folder_path + os.sep)
+                      or (event == "syncfs" and line_count == otl_index)]
+        assert set(line_count for index, event, path, line_count in otl_events) == set([otl_index])
+
+        replaced = dict((path, index) for index, event, path, line_count in otl_events if event == "replace")
+        assert sorted(replaced) == sorted(path for path in written_paths
+                                          if path.startswith(otl_folder_path + os.sep))
+
+        if use_syncfs:
+            synced = [index for index, event, path, line_count in otl_events if event == "syncfs"]
+            assert len(synced) == 2
+            assert synced[0] < min(replaced.values()) and synced[1] > max(replaced.values())
+            continue
+
+        fsynced = dict((path, index) for index, event, path, line_count in otl_events if event == "fsync")
+        for file_path in replaced:
+            assert fsynced[atomic_writes.get_temp_file_path(file_path)] < min(replaced.values())
+            assert fsynced[os.path.dirname(file_path)] > max(replaced.values())
+
+    if use_syncfs:
+        assert not [event for event, path, line_count in events if event == "fsync"]
+    assert not atomic_writes._pending_renames
+    assert not atomic_writes._pending_folder_paths
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import blob_store
+import extract_python_from_otl as epfo
+import synthetic_hda
+
+# These tests use synthetic otls and the native backend, and don't need houdini.
+
+
+def iter_script_file_paths(scripts_folder_path):
+    """
+    :param str scripts_folder_path: path to the generated scripts-folder.
+    :return: generator of the paths of the scripts in the hda folders.
+    """
+
+    for folder_path, folder_names, file_names in os.walk(scripts_folder_path):
+        if blob_store.BLOBS_FOLDER_NAME in folder_names:
+            folder_names.remove(blob_store.BLOBS_FOLDER_NAME)
+        for file_name in file_names:
+            if file_name.endswith(".py"):
+                yield os.path.join(folder_path, file_name)
+
+
+def get_blob_file_names(scripts_folder_path):
+    """
+    :param str scripts_folder_path: path to the generated scripts-folder.
+    :return: set of the file names of the blobs.
+    """
+
+    blobs_folder_path = os.path.join(scripts_folder_path, blob_store.BLOBS_FOLDER_NAME)
+    return set(file_name for folder_name in os.listdir(blobs_folder_path)
+               for file_name in os.listdir(os.path.join(blobs_folder_path, folder_name)))
+
+
+def test_dedup(tmpdir):
+    """
+    Extracts two copies of the same otl with --dedup, then changes one of them.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    folder_path = str(tmpdir)
+    scripts_folder_path = os.path.join(folder_path, "otl_scripts_folder")
+    otl_paths = [os.path.join(folder_path, "{0}.hda".format(name)) for name in ("a", "b")]
+    for otl_path in otl_paths:
+        synthetic_hda.write_synthetic_library(otl_path, definition_count=2, parm_count=2)
+
+    epfo.extract_python(otl_paths, folder_path, "otl_scripts_folder", backend="native", dedup=True)
+
+    with open(os.path.join(scripts_folder_path, "dedup.json"), "r") as file_obj:
+        report = json.load(file_obj)
+    assert report["scripts"] == 2 * report["unique_scripts"]
+    assert report["dedup_ratio"] == 2.0
+
+    store = blob_store.BlobStore(scripts_folder_path)
+    script_file_paths = list(iter_script_file_paths(scripts_folder_path))
+    assert len(script_file_paths) == report["scripts"]
+    for script_file_path in script_file_paths:
+        with open(script_file_path, "rb") as file_obj:
+            blob_path = store.get_blob_path(hashlib.md5(file_obj.read()).hexdigest())
+        assert os.path.samefile(script_file_path, blob_path)
+
+    # the scripts of b.hda are still used by a.hda, the ones of the other otl are removed once unused
+    synthetic_hda.write_synthetic_library(otl_paths[1], definition_count=1, parm_count=3, name="other")
+    epfo.extract_python(otl_paths, folder_path, "otl_scripts_folder", backend="native", dedup=True)
+    other_blob_file_names = get_blob_file_names(scripts_folder_path)
+    assert len(other_blob_file_names) > report["unique_scripts"]
+
+    synthetic_hda.write_synthetic_library(otl_paths[1], definition_count=2, parm_count=2)
+    epfo.extract_python(otl_paths, folder_path, "otl_scripts_folder", backend="native", dedup=True)
+    assert len(get_blob_file_names(scripts_folder_path)) == report["unique_scripts"]
+    assert get_blob_file_names(scripts_folder_path) < other_blob_file_names
+
+
+def test_place_without_hardlinks(tmpdir, monkeypatch):
+    """
+    Checks that scripts which can't be hardlinked are referenced from their manifest.json entry.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param monkeypatch: pytest monkeypatch fixture
+    """
+
+    def link(source_path, link_path):
+        raise OSError("cross-device link")
+
+    monkeypatch.setattr(os, "link", link)
+
+    hda_folder_path = str(tmpdir.mkdir("otl").mkdir("hda"))
+    store = blob_store.BlobStore(str(tmpdir))
+    scripts = [("parameter_callbacks", "button", "print('button')\n"),
+               ("parameter_callbacks", "other_button", "print('button')\n")]
+
+    epfo.write_hda_scripts(scripts, hda_folder_path, blob_store=store)
+
+    with open(os.path.join(hda_folder_path, "manifest.json"), "r") as file_obj:
+        manifest = json.load(file_obj)
+    blob_references = set(manifest_entry["blob"] for manifest_entry in manifest.values())
+    assert len(blob_references) == 1
+    assert os.path.exists(os.path.join(str(tmpdir), *blob_references.pop().split("/")))
+    assert not os.listdir(os.path.join(hda_folder_path, "parameter_callbacks"))
+    assert store.make_report()["dedup_ratio"] == 2.0
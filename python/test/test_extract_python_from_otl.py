@@ -15,7 +15,8 @@ import extract_python_from_otl as epfo
 def generate_folder_tree_dict(folder_path):
     """
     Takes in a folder path and returns a dictionary depicting the folder structure
-    along with the file contents, but excludes json file contents.
+    along with the file contents, but excludes json file contents. The
+    manifest.json files of the hda folders are left out, see epfo.write_hda_scripts().
 
     :param str folder_path: Folder path to be analysed and displayed
     :return: dict result: Dictionary representing the folder structure of the input folder path
@@ -25,6 +26,9 @@ def generate_folder_tree_dict(folder_path):
     if os.path.isdir(folder_path):
         items = os.listdir(folder_path)
         for item in items:
+            # the manifests hold the sizes and hashes of the scripts already compared
+            if item == "manifest.json":
+                continue
             item_path = os.path.join(folder_path, item)
             result[item] = generate_folder_tree_dict(item_path)
     elif os.path.isfile(folder_path):
@@ -480,3 +484,149 @@ def test_functionality(test_data):
     # clean up
     if os.path.exists(temp_folder_path):
         shutil.rmtree(temp_folder_path)
+
+
+@pytest.mark.parametrize(
+    "jobs",
+    [
+        pytest.param(2),
+        pytest.param(8)
+    ]
+)
+def test_parallel_extraction(jobs):
+    """
+    Checks that extracting with worker processes generates the same folder tree
+    and log.json as a serial run.
+
+    :param int jobs: number of worker processes (Tool function input)
+    """
+
+    temp_folder_name = "otl_python_extraction_tool_parallel_test"
+    temp_folder_path = cm.make_directory(temp_folder_name)
+    assert temp_folder_name in temp_folder_path
+
+    file_paths = get_test_otls_paths() + [get_sky_scraper_otl_path()]
+
+    epfo.extract_python(file_paths, temp_folder_path, "serial")
+    epfo.extract_python(file_paths, temp_folder_path, "parallel", jobs=jobs)
+
+    serial_folder_path = os.path.join(temp_folder_path, "serial")
+    parallel_folder_path = os.path.join(temp_folder_path, "parallel")
+    assert generate_folder_tree_dict(serial_folder_path) == generate_folder_tree_dict(parallel_folder_path)
+
+    with open(os.path.join(serial_folder_path, "log.json"), "r") as file_obj:
+        serial_log = json.load(file_obj)
+    with open(os.path.join(parallel_folder_path, "log.json"), "r") as file_obj:
+        parallel_log = json.load(file_obj)
+    assert serial_log == parallel_log
+
+    # clean up
+    if os.path.exists(temp_folder_path):
+        shutil.rmtree(temp_folder_path)
+
+
+@pytest.mark.parametrize(
+    "check_hash",
+    [
+        pytest.param(False),
+        pytest.param(True)
+    ]
+)
+def test_incremental_extraction(check_hash):
+    """
+    Checks that a second run over unchanged otls doesn't load them again, and
+    keeps their log.json entries.
+
+    :param bool check_hash: compare otl contents (Tool function input)
+    """
+
+    temp_folder_name = "otl_python_extraction_tool_incremental_test"
+    temp_folder_path = cm.make_directory(temp_folder_name)
+    assert temp_folder_name in temp_folder_path
+
+    folder_name = "otl_scripts_folder"
+    file_paths = [get_sky_scraper_otl_path()]
+
+    epfo.extract_python(file_paths, temp_folder_path, folder_name, check_hash=check_hash)
+    first_run_tree = generate_folder_tree_dict(temp_folder_path)
+    with open(os.path.join(temp_folder_path, folder_name, "log.json"), "r") as file_obj:
+        first_run_log = json.load(file_obj)
+
+    with mock.patch("hou.hda.installFile") as install_file, \
+            mock.patch("hou.hda.definitionsInFile") as definitions_in_file:
+        epfo.extract_python(file_paths, temp_folder_path, folder_name, check_hash=check_hash)
+
+    assert install_file.call_count == 0
+    assert definitions_in_file.call_count == 0
+    assert generate_folder_tree_dict(temp_folder_path) == first_run_tree
+    with open(os.path.join(temp_folder_path, folder_name, "log.json"), "r") as file_obj:
+        assert json.load(file_obj) == first_run_log
+
+    # clean up
+    if os.path.exists(temp_folder_path):
+        shutil.rmtree(temp_folder_path)
+
+
+def test_write_result_to_disk_manifest(tmpdir):
+    """
+    Checks that write_result_to_disk() only rewrites the scripts that changed
+    since the previous run, and that remove_stale_scripts() deletes the ones
+    that were removed.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    hda_folder_path = str(tmpdir)
+    scripts_folder_path = os.path.join(hda_folder_path, "parameter_callbacks")
+    os.mkdir(scripts_folder_path)
+
+    unchanged_file_path = os.path.join(scripts_folder_path, "unchanged.py")
+    changed_file_path = os.path.join(scripts_folder_path, "changed.py")
+    removed_file_path = os.path.join(scripts_folder_path, "removed.py")
+
+    older_manifest = dict()
+    epfo.write_result_to_disk({unchanged_file_path: "print('a')",
+                               changed_file_path: "print('b')",
+                               removed_file_path: "print('c')"}, manifest=older_manifest)
+
+    # the scripts are written through a temporary file renamed over them, see atomic_writes
+    with mock.patch("atomic_writes.write_file") as write_file:
+        manifest = dict()
+        epfo.write_result_to_disk({unchanged_file_path: "print('a')",
+                                   changed_file_path: "print('changed')"}, older_manifest, manifest)
+
+    write_file.assert_called_once_with(changed_file_path, "print('changed')")
+    assert sorted(manifest.keys()) == ["parameter_callbacks/changed.py", "parameter_callbacks/unchanged.py"]
+
+    epfo.remove_stale_scripts(hda_folder_path, older_manifest, manifest)
+    assert not os.path.exists(removed_file_path)
+    assert os.path.exists(unchanged_file_path)
+
+
+def test_extract_python_jsonl(tmpdir):
+    """
+    Checks that the jsonl records hold the same scripts as the generated folder tree,
+    and that nothing is written besides the jsonl file.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    jsonl_file_path = os.path.join(str(tmpdir), "scripts.jsonl")
+    with open(jsonl_file_path, "w") as file_obj:
+        record_count = epfo.extract_python_jsonl([get_sky_scraper_otl_path()], file_obj)
+
+    assert os.listdir(str(tmpdir)) == ["scripts.jsonl"]
+
+    with open(jsonl_file_path, "r") as file_obj:
+        records = [json.loads(line) for line in file_obj]
+
+    assert len(records) == record_count
+    for record in records:
+        assert record["library"] == get_sky_scraper_otl_path()
+        assert record["node_type"] == "Object/sky_scraper"
+        assert record["kind"] in epfo.SCRIPT_KINDS
+
+    scripts = dict(((record["kind"], record["name"]), record["contents"]) for record in records)
+    assert scripts[("main_python_scripts", "PythonModule")] == 'print("Python script")'
+    assert scripts[("parameter_callbacks", "button")] == 'print("callback")'
+    assert ("item_generation_scripts", "button") in scripts
@@ -0,0 +1,186 @@
+import json
+import os
+import socket
+import threading
+import pytest
+import extraction_server
+
+try:
+    from http.client import HTTPConnection
+except ImportError:
+    from httplib import HTTPConnection
+
+# These tests use the native backend and don't need houdini.
+
+
+def get_test_otl_path(file_name):
+    """
+    Gets the path to a test otl in ~/extract-python-from-otl/test_data/test_otls
+
+    :param str file_name: file name of the test otl
+    :return: str path to the test otl
+    """
+    project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_dir, "test_data", "test_otls", file_name)
+
+
+@pytest.mark.parametrize(
+    'request_data',
+    [
+        pytest.param([]),
+        pytest.param({"otls": []}),
+        pytest.param({"otls": ["otl.hda"], "format": "html", "path": "scripts.html"}),
+        pytest.param({"otls": ["otl.hda"], "format": "folder"}),
+        pytest.param({"otls": ["otl.hda"], "format": "jsonl"}),
+    ]
+)
+def test_invalid_request(request_data):
+    """
+    Checks that incomplete requests are rejected before anything is extracted.
+
+    :param request_data: the request
+    """
+
+    with pytest.raises(ValueError):
+        extraction_server.run_request(request_data)
+
+
+def test_server(tmpdir):
+    """
+    Sends an extraction request to a server on an ephemeral localhost port, then stops it.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    server = extraction_server.make_server("127.0.0.1:0", token="secret")
+    host, port = server.server_address[:2]
+    headers = {"Content-Type": "application/json", "Authorization": "Bearer secret"}
+
+    def serve():
+        while not server.stopping:
+            server.handle_request()
+        server.server_close()
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+
+    try:
+        jsonl_file_path = os.path.join(str(tmpdir), "scripts.jsonl")
+        request_data = {"otls": [get_test_otl_path("sky_scraper.hda")], "format": "jsonl",
+                        "path": jsonl_file_path, "backend": "native"}
+
+        connection = HTTPConnection(host, port)
+        connection.request("POST", "/extract", json.dumps(request_data), headers)
+        response = connection.getresponse()
+        response_data = json.loads(response.read().decode("utf-8"))
+        connection.close()
+
+        assert response.status == 200
+        assert response_data["status"] == "ok"
+        with open(jsonl_file_path, "r") as file_obj:
+            assert len(file_obj.readlines()) == response_data["count"]
+    finally:
+        connection = HTTPConnection(host, port)
+        connection.request("POST", "/shutdown", headers=headers)
+        connection.getresponse().read()
+        connection.close()
+        thread.join()
+
+
+def test_socket_path_not_replaced(tmpdir):
+    """
+    Checks that a file that isn't a socket isn't removed to start a server at its path.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    file_path = os.path.join(str(tmpdir), "extract.sock")
+    with open(file_path, "w") as file_obj:
+        file_obj.write("data")
+
+    with pytest.raises(ValueError):
+        extraction_server.make_server(file_path)
+
+    with open(file_path, "r") as file_obj:
+        assert file_obj.read() == "data"
+
+
+def test_stale_socket_replaced(tmpdir):
+    """
+    Checks that the socket file left by a server that died is replaced.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    socket_path = os.path.join(str(tmpdir), "extract.sock")
+    stale_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale_socket.bind(socket_path)
+    stale_socket.close()
+
+    server = extraction_server.make_server(socket_path)
+    # only accessible to the user running the server
+    assert os.stat(socket_path).st_mode & 0o777 == 0o600
+    server.server_close()
+    assert not os.path.exists(socket_path)
+
+
+def test_token_required(tmpdir):
+    """
+    Checks that the requests to a localhost port without the server's token,
+    including /shutdown, are rejected.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    server = extraction_server.make_server("127.0.0.1:0", token="secret")
+    host, port = server.server_address[:2]
+    jsonl_file_path = os.path.join(str(tmpdir), "scripts.jsonl")
+    request_data = {"otls": [get_test_otl_path("sky_scraper.hda")], "format": "jsonl",
+                    "path": jsonl_file_path, "backend": "native"}
+
+    def send(method, path, body=None, headers=None):
+        # one request, handled by the server in this thread
+        connection = HTTPConnection(host, port)
+        connection.request(method, path, body, headers or {})
+        server.handle_request()
+        response = connection.getresponse()
+        response.read()
+        connection.close()
+        return response.status
+
+    try:
+        assert send("POST", "/extract", json.dumps(request_data)) == 401
+        assert send("POST", "/shutdown", headers={"Authorization": "Bearer wrong"}) == 401
+        assert send("GET", "/status") == 401
+        assert not server.stopping
+        assert not os.path.exists(jsonl_file_path)
+        assert send("GET", "/status", headers={"Authorization": "Bearer secret"}) == 200
+    finally:
+        server.server_close()
+
+
+@pytest.mark.parametrize(
+    ('address', 'valid'),
+    [
+        pytest.param("localhost:0", True),
+        pytest.param("127.0.0.1:0", True),
+        pytest.param("0.0.0.0:0", False),
+        pytest.param("192.0.2.1:0", False),
+    ]
+)
+def test_loopback_only(address, valid):
+    """
+    Checks that the tcp server only listens on loopback addresses.
+
+    :param str address: server address
+    :param bool valid: if the server can listen on it
+    """
+
+    if not valid:
+        with pytest.raises(ValueError):
+            extraction_server.make_server(address, token="secret")
+        return
+
+    server = extraction_server.make_server(address, token="secret")
+    assert server.server_address[0].startswith("127.")
+    server.server_close()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import zlib
+import pytest
+import extract_python_from_otl as epfo
+import file_hashes
+import script_cache
+import synthetic_hda
+
+# These tests use synthetic otls and the native backend, and don't need houdini.
+
+
+@pytest.mark.parametrize(
+    ('algorithm', 'chunk_size'),
+    [
+        pytest.param(file_hashes.MD5, 7),
+        pytest.param(file_hashes.MD5, file_hashes.DEFAULT_CHUNK_SIZE),
+        pytest.param(file_hashes.CRC32, 7),
+    ]
+)
+def test_hash_file(tmpdir, algorithm, chunk_size):
+    """
+    Checks the content hashes streamed in chunks.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param str algorithm: hash algorithm
+    :param int chunk_size: number of bytes read at a time
+    """
+
+    file_path = str(tmpdir.join("synthetic.hda"))
+    synthetic_hda.write_synthetic_library(file_path, definition_count=3)
+    with open(file_path, "rb") as file_obj:
+        data = file_obj.read()
+
+    expected = {file_hashes.MD5: hashlib.md5(data).hexdigest(),
+                file_hashes.CRC32: "crc32:{0:08x}".format(zlib.crc32(data) & 0xffffffff)}[algorithm]
+    assert file_hashes.hash_file(file_path, algorithm=algorithm, chunk_size=chunk_size) == expected
+
+
+def test_hash_memo(tmpdir, monkeypatch):
+    """
+    Checks that the otls are only hashed again by --check_hash runs once they're changed or touched.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param monkeypatch: pytest monkeypatch fixture
+    """
+
+    folder_path = str(tmpdir)
+    otl_paths = [os.path.join(folder_path, "{0}.hda".format(name)) for name in ("a", "b")]
+    for otl_path in otl_paths:
+        synthetic_hda.write_synthetic_library(otl_path)
+
+    hashed_file_paths = []
+    hash_file = file_hashes.hash_file
+    monkeypatch.setattr(file_hashes, "hash_file", lambda file_path, **kwargs: hashed_file_paths.append(
+        file_path) or hash_file(file_path, **kwargs))
+
+    epfo.extract_python(otl_paths, folder_path, "otl_scripts_folder", backend="native", check_hash=True)
+    assert hashed_file_paths == otl_paths
+
+    memo_file_path = os.path.join(folder_path, "otl_scripts_folder", file_hashes.MEMO_FILE_NAME)
+    memo = file_hashes.HashMemo.load(memo_file_path)
+    assert sorted(memo.entries) == otl_paths
+
+    del hashed_file_paths[:]
+    stat_result = os.stat(otl_paths[1])
+    os.utime(otl_paths[1], (stat_result.st_atime, stat_result.st_mtime + 10))
+    epfo.extract_python(otl_paths, folder_path, "otl_scripts_folder", backend="native", check_hash=True)
+    assert hashed_file_paths == otl_paths[1:]
+
+    # the log.json content hashes are the same md5 as without the memo
+    otl_hash_dict = epfo.read_otl_log(os.path.join(folder_path, "otl_scripts_folder"))
+    assert sorted(file_dict["content_hash"] for file_dict in otl_hash_dict.values()) == \
+        sorted(epfo.get_file_hash(otl_path) for otl_path in otl_paths)
+
+
+def test_cache_key_algorithm(tmpdir):
+    """
+    Checks that crc32 isn't used to key the script cache.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    folder_path = str(tmpdir)
+    otl_path = os.path.join(folder_path, "a.hda")
+    synthetic_hda.write_synthetic_library(otl_path)
+    cache = script_cache.ScriptCache(os.path.join(folder_path, "cache"))
+
+    with pytest.raises(ValueError):
+        epfo.extract_python([otl_path], folder_path, "otl_scripts_folder", backend="native", cache=cache,
+                            hash_algorithm=file_hashes.CRC32)
+    assert not os.path.exists(os.path.join(folder_path, "otl_scripts_folder"))
+
+
+@pytest.mark.parametrize(
+    ('file_definition_string', 'name'),
+    [
+        pytest.param("/otls/sky_scraper.hda", "sky_scraper.hda"),
+        pytest.param(u"/otls/gebäude.hda", u"gebäude.hda"),
+    ]
+)
+def test_naming_hashes(file_definition_string, name):
+    """
+    Checks that the folder names are the md5 of the utf-8 encoded paths and definitions, as before.
+
+    :param str file_definition_string: otl path or str(hda definition)
+    :param str name: otl or hda name
+    """
+
+    md5 = hashlib.md5(file_definition_string.encode("utf-8")).hexdigest()
+    assert epfo.get_hash(file_definition_string) == md5
+    assert epfo.make_unique_name(file_definition_string, name) == \
+        name.replace(".", "_") + "_" + md5
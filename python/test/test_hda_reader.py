@@ -0,0 +1,254 @@
+import bz2
+import os
+import zlib
+import pytest
+import hda_reader
+import extract_python_from_otl as epfo
+import synthetic_hda
+
+# These tests read the test otls directly and don't need houdini.
+
+
+def get_test_otl_path(file_name):
+    """
+    Gets the path to a test otl in ~/extract-python-from-otl/test_data/test_otls
+
+    :param str file_name: file name of the test otl
+    :return: str path to the test otl
+    """
+    project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_dir, "test_data", "test_otls", file_name)
+
+
+@pytest.mark.parametrize(
+    ('file_name', 'expected'),
+    [
+        pytest.param("sky_scraper.hda", ["Object/sky_scraper"]),
+        pytest.param("otl_1.hda", ["Object/test_otl_1", "Sop/test_otl_1", "Object/test_otl_1::5"]),
+        pytest.param("otl_2.hda", ["Object/test_otl_2", "Object/test_otl_1"]),
+    ]
+)
+def test_definitions(file_name, expected):
+    """
+    Checks the definitions listed for each test otl.
+
+    :param str file_name: test otl file name
+    :param list expected: expected "category/node type name" of each definition
+    """
+
+    with hda_reader.HDALibrary(get_test_otl_path(file_name)) as library:
+        result = [definition.nodeTypeCategory().name() + "/" + definition.nodeTypeName()
+                  for definition in library.definitions()]
+
+    assert result == expected
+
+
+@pytest.mark.parametrize(
+    ('section_name', 'expected_contents', 'expected_is_python'),
+    [
+        pytest.param("PythonModule", 'print("Python script")', True),
+        pytest.param("OnCreated", 'print("onCreated")', True),
+        pytest.param("test 1", 'print("test 1")', True),
+        pytest.param("PythonModule2", "print('hello')", False),
+    ]
+)
+def test_sections(section_name, expected_contents, expected_is_python):
+    """
+    Checks the section contents and the IsPython extra file options of sky_scraper.hda
+
+    :param str section_name: name of the section
+    :param str expected_contents: expected section contents
+    :param bool expected_is_python: expected IsPython flag
+    """
+
+    with hda_reader.HDALibrary(get_test_otl_path("sky_scraper.hda")) as library:
+        definition = library.definitions()[0]
+        sections = definition.sections()
+        efo = definition.extraFileOptions()
+
+        assert sections[section_name].contents() == expected_contents
+        assert efo.get(section_name + "/IsPython", False) == expected_is_python
+
+
+def test_parm_templates():
+    """
+    Checks the callback and item generation scripts read from the DialogScript of sky_scraper.hda
+    """
+
+    with hda_reader.HDALibrary(get_test_otl_path("sky_scraper.hda")) as library:
+        parm_templates = library.definitions()[0].parmTemplateGroup().parmTemplates()
+
+    button = [parm_template for parm_template in parm_templates if parm_template.name() == "button"][0]
+
+    assert button.scriptCallback() == 'print("callback")'
+    assert button.scriptCallbackLanguage() == hda_reader.scriptLanguage.Python
+    assert button.itemGeneratorScript() == ("result = []\n"
+                                            "for i in xrange(13):\n"
+                                            "    value = chr(2*i+65)+chr(2*i+66)\n"
+                                            "    result.append(value)\n"
+                                            "    result.append(value)\n"
+                                            "\n"
+                                            "return result")
+    assert button.itemGeneratorScriptLanguage() == hda_reader.scriptLanguage.Python
+
+
+@pytest.mark.parametrize(
+    'file_name',
+    [
+        pytest.param("otl_list.txt"),
+    ]
+)
+def test_invalid_library(file_name):
+    """
+    Checks that files which are not INDX containers raise an HDAFormatError.
+
+    :param str file_name: file name of a non otl file in the test data
+    """
+
+    with pytest.raises(hda_reader.HDAFormatError):
+        hda_reader.HDALibrary(get_test_otl_path(file_name))
+
+
+@pytest.mark.parametrize(
+    ('definition_count', 'parm_count', 'section_count'),
+    [
+        pytest.param(1, 0, 1),
+        pytest.param(3, 4, 2),
+    ]
+)
+def test_synthetic_library(tmpdir, definition_count, parm_count, section_count):
+    """
+    Checks that the libraries written by synthetic_hda are read back with all their python scripts.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param int definition_count: number of asset definitions
+    :param int parm_count: number of parameters per definition
+    :param int section_count: number of python sections per definition
+    """
+
+    file_path = os.path.join(str(tmpdir), "synthetic.hda")
+    synthetic_hda.write_synthetic_library(file_path, definition_count=definition_count, parm_count=parm_count,
+                                          section_count=section_count, script_size=100)
+
+    with hda_reader.HDALibrary(file_path) as library:
+        definitions = library.definitions()
+        assert len(definitions) == definition_count
+
+        definition = definitions[-1]
+        efo = definition.extraFileOptions()
+        python_sections = [name for name in definition.sections() if efo.get(name + "/IsPython")]
+        assert len(python_sections) == section_count
+
+        parm_templates = definition.parmTemplateGroup().parmTemplates()
+        assert len(parm_templates) == parm_count
+        for parm_template in parm_templates:
+            assert parm_template.scriptCallbackLanguage() == hda_reader.scriptLanguage.Python
+            assert parm_template.scriptCallback() == synthetic_hda.make_script(
+                100, "{0} callback {1}".format(definition.nodeTypeName(), parm_template.name()))
+            assert parm_template.itemGeneratorScriptLanguage() == hda_reader.scriptLanguage.Python
+
+
+NESTED_DIALOG_SCRIPT = """
+{
+    name\tnested
+    groupsimple {
+        name\t"folder"
+        parm {
+            name\t"button"
+            type\tbutton
+            parmtag\t{ "script_action" "print('action')" }
+        }
+        multiparm {
+            name\t"items"
+            parmtag\t{ "script_callback" "print('items')" }
+            parmtag\t{ "script_callback_language" "python" }
+            parm {
+                name\t"value#"
+                size\t2
+                default\t{ [ "hou.frame()" python ] [ "$F" hscript-expr ] }
+            }
+        }
+    }
+}
+"""
+
+
+def test_nested_parm_templates():
+    """
+    Checks that the scripts of parameters nested in folders and multiparms
+    are found by extract_python_from_otl.iter_parm_template_scripts()
+    """
+
+    parm_templates = hda_reader.ParmTemplateGroup(NESTED_DIALOG_SCRIPT).parmTemplates()
+
+    assert [parm_template.name() for parm_template in parm_templates] == ["folder"]
+    value = parm_templates[0].parmTemplates()[1].parmTemplates()[0]
+    assert value.defaultExpression() == ("hou.frame()", "$F")
+    assert value.defaultExpressionLanguage() == (hda_reader.scriptLanguage.Python, hda_reader.scriptLanguage.Hscript)
+
+    result = list(epfo.iter_parm_template_scripts(parm_templates))
+    assert result == [(epfo.ACTION_BUTTON_SCRIPTS, "button", "print('action')"),
+                      (epfo.PARAMETER_CALLBACKS, "items", "print('items')"),
+                      (epfo.DEFAULT_EXPRESSIONS, "value#_0", "hou.frame()")]
+
+
+def test_compressed_section():
+    """
+    Checks that the Contents.gz section of sky_scraper.hda is decompressed in bounded chunks.
+    """
+
+    with hda_reader.HDALibrary(get_test_otl_path("sky_scraper.hda")) as library:
+        section = library.definitions()[0].sections()["Contents.gz"]
+
+        assert hda_reader.get_section_compression(section.name()) == ".gz"
+        assert hda_reader.get_uncompressed_name(section.name()) == "Contents"
+        assert hda_reader.get_uncompressed_name("PythonModule") == "PythonModule"
+
+        chunks = list(hda_reader.iter_decompressed_chunks(section, chunk_size=64))
+        assert max(len(chunk) for chunk in chunks) <= 64
+        assert b"".join(chunks) == zlib.decompress(section.binaryContents(), 16 + zlib.MAX_WBITS)
+        # the node contents are a cpio archive
+        assert b"hdaroot.def\x00" in b"".join(chunks)
+
+
+def test_registered_decompressor(tmpdir, monkeypatch):
+    """
+    Checks that a python section compressed with a registered decompressor is
+    extracted decompressed, and that the sections which aren't python aren't read.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param monkeypatch: pytest monkeypatch fixture
+    """
+
+    monkeypatch.setitem(hda_reader.DECOMPRESSORS, ".bz2", bz2.BZ2Decompressor)
+
+    script = synthetic_hda.make_script(100000, "compressed")
+    contents = gzip_compress(b"not python " * 1000)
+    file_path = os.path.join(str(tmpdir), "compressed.hda")
+    definition_block = synthetic_hda.make_index_block([
+        ("ExtraFileOptions", synthetic_hda.make_extra_file_options({"PythonModule.bz2/IsPython": True})),
+        ("PythonModule.bz2", bz2.compress(script.encode("utf-8"))),
+        ("Contents.gz", contents)])
+    with open(file_path, "wb") as file_obj:
+        file_obj.write(synthetic_hda.make_index_block([("INDEX_SECTION", b""), ("houdini.hdalibrary", b""),
+                                                       ("Object/compressed", definition_block)]))
+
+    read_sizes = []
+    read = hda_reader.HDALibrary.read
+    monkeypatch.setattr(hda_reader.HDALibrary, "read",
+                        lambda library, offset, size: read_sizes.append(size) or read(library, offset, size))
+
+    # the bodies are read while the library is open
+    records = [(record.name, record.body) for record in epfo.iter_scripts([file_path], backend="native")]
+    assert records == [("PythonModule.bz2", script)]
+    assert len(contents) not in read_sizes
+
+
+def gzip_compress(data):
+    """
+    :param bytes data: data to compress.
+    :return: bytes gzip stream of the data.
+    """
+
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
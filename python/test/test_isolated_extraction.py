@@ -0,0 +1,67 @@
+import json
+import multiprocessing
+import os
+import time
+import pytest
+import extract_python_from_otl as epfo
+import synthetic_hda
+
+# These tests use synthetic otls and the native backend, and don't need houdini.
+# The child processes have to be forked to see the patched functions.
+pytestmark = pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                                reason="the child processes aren't forked")
+
+
+def test_isolated_extraction(tmpdir, monkeypatch):
+    """
+    Extracts otls in child processes, one of which hangs, one crashes and one
+    raises, and checks that the others are extracted and the failures logged.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param monkeypatch: pytest monkeypatch fixture
+    """
+
+    folder_path = str(tmpdir)
+    otl_paths = [os.path.join(folder_path, "{0}.hda".format(name))
+                 for name in ("a", "hangs", "crashes", "raises", "b")]
+    for otl_path in otl_paths:
+        synthetic_hda.write_synthetic_library(otl_path)
+
+    iter_otl_definitions = epfo.iter_otl_definitions
+
+    def iter_failing_otl_definitions(file_paths, backend=epfo.DEFAULT_BACKEND):
+        for file_path, definitions in iter_otl_definitions(file_paths, backend=backend):
+            name = os.path.splitext(os.path.basename(file_path))[0]
+            if name == "hangs":
+                time.sleep(60)
+            elif name == "crashes":
+                os._exit(3)
+            elif name == "raises":
+                raise RuntimeError("corrupt otl")
+            yield file_path, definitions
+
+    monkeypatch.setattr(epfo, "iter_otl_definitions", iter_failing_otl_definitions)
+
+    start_time = time.time()
+    epfo.extract_python(otl_paths, folder_path, "otl_scripts_folder", backend="native", jobs=2, isolate=True,
+                        timeout=2)
+    assert time.time() - start_time < 30
+
+    with open(os.path.join(folder_path, "otl_scripts_folder", "log.json"), "r") as file_obj:
+        otl_hash_dict = json.load(file_obj)
+
+    statuses = dict((os.path.basename(file_dict["file_path"]), file_dict.get("status"))
+                    for file_dict in otl_hash_dict.values())
+    assert statuses == {"a.hda": None, "hangs.hda": epfo.STATUS_TIMEOUT, "crashes.hda": epfo.STATUS_CRASHED,
+                        "raises.hda": epfo.STATUS_ERROR, "b.hda": None}
+    assert [os.path.basename(file_dict["file_path"]) for file_dict in otl_hash_dict.values()] == \
+        [os.path.basename(otl_path) for otl_path in otl_paths]
+
+    # the otls that failed are extracted again by the next run
+    monkeypatch.setattr(epfo, "iter_otl_definitions", iter_otl_definitions)
+    epfo.extract_python(otl_paths, folder_path, "otl_scripts_folder", backend="native", isolate=True)
+
+    with open(os.path.join(folder_path, "otl_scripts_folder", "log.json"), "r") as file_obj:
+        otl_hash_dict = json.load(file_obj)
+    assert len(otl_hash_dict) == len(otl_paths)
+    assert not [file_dict for file_dict in otl_hash_dict.values() if "status" in file_dict]
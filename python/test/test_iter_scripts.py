@@ -0,0 +1,66 @@
+import os
+import extract_python_from_otl as epfo
+import hda_reader
+import synthetic_hda
+
+# These tests use synthetic otls and the native backend, and don't need houdini.
+
+
+def test_iter_scripts(tmpdir, monkeypatch):
+    """
+    Checks that iter_scripts() yields every script of the otls, and only reads
+    the python sections whose body is accessed.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param monkeypatch: pytest monkeypatch fixture
+    """
+
+    otl_paths = [str(tmpdir.join("{0}.hda".format(name))) for name in ("a", "b")]
+    script_count = 0
+    for otl_path in otl_paths:
+        script_count += synthetic_hda.write_synthetic_library(otl_path, definition_count=2, parm_count=2,
+                                                              section_count=2)
+
+    read_section_names = []
+    contents = hda_reader.HDASection.contents
+    monkeypatch.setattr(hda_reader.HDASection, "contents",
+                        lambda section: read_section_names.append(section.name()) or contents(section))
+
+    records = []
+    for record in epfo.iter_scripts(otl_paths, backend="native"):
+        if record.name == "PythonModule":
+            assert "PythonModule" in record.body
+        records.append((record.library, record.node_type, record.kind, record.name))
+
+    assert len(records) == script_count
+    libraries = [library for library, node_type, kind, name in records]
+    assert libraries == sorted(libraries)
+    assert set(os.path.basename(library) for library, node_type, kind, name in records) == {"a.hda", "b.hda"}
+    assert set(kind for library, node_type, kind, name in records) == {
+        epfo.MAIN_PYTHON_SCRIPTS, epfo.PARAMETER_CALLBACKS, epfo.ITEM_GENERATION_SCRIPTS}
+    # the DialogScript sections hold the parm templates
+    assert [name for name in read_section_names if name != "DialogScript"] == ["PythonModule"] * 4
+
+
+def test_interned_names(tmpdir):
+    """
+    Checks that the names of the scripts repeated across the hdas of a run are stored once.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    otl_path = str(tmpdir.join("interned.hda"))
+    script_count = synthetic_hda.write_synthetic_library(otl_path, definition_count=3, parm_count=2)
+
+    definition_records = []
+    interned_names = dict()
+    for file_path, definitions in epfo.iter_otl_definitions([otl_path], backend="native"):
+        epfo.extract_py_from_definitions(definitions, str(tmpdir.join("otl_folder")),
+                                         definition_records=definition_records, interned_names=interned_names)
+
+    names = [name for record in definition_records for kind, name, script in record["scripts"]]
+    assert len(names) == script_count
+    # the parameter callbacks and item generation scripts of a parameter share its name
+    assert len(set(id(name) for name in names)) == len(set(names))
+    assert sorted(interned_names) == sorted(set((kind, name) for record in definition_records
+                                                for kind, name, script in record["scripts"]))
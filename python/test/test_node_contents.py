@@ -0,0 +1,130 @@
+import json
+import os
+import pytest
+import extract_python_from_otl as epfo
+import hda_reader
+import node_contents
+import script_filters
+import synthetic_hda
+
+# These tests use synthetic otls and the native backend, and don't need houdini.
+
+PYTHON_SOP_CODE = 'node = hou.pwd()\ngeo = node.geometry()\nprint("python sop")\n'
+
+TOOLS_SHELF = """<?xml version="1.0" encoding="UTF-8"?>
+<shelfDocument>
+  <tool name="$HDA_DEFAULT_TOOL" label="$HDA_LABEL" icon="$HDA_ICON">
+    <script scriptType="python"><![CDATA[import objecttoolutils
+
+objecttoolutils.genericTool(kwargs, '$HDA_NAME')]]></script>
+  </tool>
+  <tool name="hscript_tool" label="Hscript">
+    <script scriptType="hscript"><![CDATA[echo tool]]></script>
+  </tool>
+</shelfDocument>
+"""
+
+
+def make_contents_files():
+    """
+    :return: list of (file name, bytes data) of the Contents section of an asset holding a python sop,
+             and a null with a python parameter and channels with a python and an hscript expression.
+    """
+
+    python_parm = "python\t[ 0\tlocks=0 ]\t(\t{0}\t)".format(synthetic_hda.escape_dialog_string(PYTHON_SOP_CODE))
+    return [
+        ("node_type", b"Object\n"),
+        ("hdaroot.init", b"type = contents\nmatchesdef = 0\n"),
+        ("hdaroot.def", b"comment \"\"\nexprlanguage hscript\nend\n"),
+        ("hdaroot/geo1.init", b"type = geo\nmatchesdef = 0\n"),
+        ("hdaroot/geo1.def", b"exprlanguage hscript\nend\n"),
+        ("hdaroot/geo1/python1.init", b"type = python\nmatchesdef = 0\n"),
+        ("hdaroot/geo1/python1.def", b"exprlanguage hscript\nend\n"),
+        ("hdaroot/geo1/python1.parm", "{{\nversion 0.8\n{0}\n}}\n".format(python_parm).encode("utf-8")),
+        ("hdaroot/null1.init", b"type = null\nmatchesdef = 0\n"),
+        ("hdaroot/null1.def", b"exprlanguage python\nend\n"),
+        ("hdaroot/null1.parm", "{{\nversion 0.8\n{0}\n}}\n".format(python_parm).encode("utf-8")),
+        ("hdaroot/null1.chn", b"{\n    channel tx {\n      lefttype = extend\n"
+                              b"      segment { length = 0 expr = \"hou.frame() * 2\" }\n    }\n"
+                              b"    channel ty {\n"
+                              b"      segment { length = 0 expr = $F language = hscript }\n    }\n  }\n"),
+    ]
+
+
+def write_contents_library(file_path, files=None):
+    """
+    :param str file_path: path of the library written.
+    :param list files: files of the Contents section, defaults to make_contents_files().
+    """
+
+    definition_block = synthetic_hda.make_index_block([
+        ("DialogScript", synthetic_hda.make_dialog_script("contents", 0, 10).encode("utf-8")),
+        ("ExtraFileOptions", synthetic_hda.make_extra_file_options({"PythonModule/IsPython": True})),
+        ("PythonModule", b"print('module')"),
+        ("Contents.gz", synthetic_hda.make_contents_section(files or make_contents_files())),
+        ("Tools.shelf", TOOLS_SHELF.encode("utf-8"))])
+    with open(file_path, "wb") as file_obj:
+        file_obj.write(synthetic_hda.make_index_block([("INDEX_SECTION", b""), ("houdini.hdalibrary", b""),
+                                                       ("Object/contents", definition_block)]))
+
+
+@pytest.mark.parametrize(
+    'chunk_size',
+    [
+        pytest.param(7),
+        pytest.param(hda_reader.DEFAULT_CHUNK_SIZE),
+    ]
+)
+def test_iter_node_scripts(chunk_size):
+    """
+    Checks the python node code and expressions found in a Contents section, read in chunks.
+
+    :param int chunk_size: size of the chunks the section is read in
+    """
+
+    contents = synthetic_hda.make_contents_section(make_contents_files(), compress=False)
+    chunks = [contents[offset:offset + chunk_size] for offset in range(0, len(contents), chunk_size)]
+
+    assert list(node_contents.iter_node_scripts(chunks)) == [
+        node_contents.NodeScript("geo1/python1", "python", PYTHON_SOP_CODE, False),
+        node_contents.NodeScript("null1", "tx", "hou.frame() * 2", True)]
+
+
+def test_extract_contents(tmpdir):
+    """
+    Extracts the scripts inside the asset network and shelf tools of a library,
+    which are only extracted when they are selected.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    folder_path = str(tmpdir)
+    file_path = os.path.join(folder_path, "contents.hda")
+    write_contents_library(file_path)
+
+    assert [record.kind for record in epfo.iter_scripts([file_path], backend="native")] == \
+        [epfo.MAIN_PYTHON_SCRIPTS]
+
+    script_filter = script_filters.ScriptFilter(kinds=epfo.SCRIPT_KINDS)
+    records = [(record.kind, record.name, record.body)
+               for record in epfo.iter_scripts([file_path], backend="native", script_filter=script_filter)]
+    assert records == [
+        (epfo.MAIN_PYTHON_SCRIPTS, "PythonModule", "print('module')"),
+        (epfo.NODE_SCRIPTS, "geo1/python1/python", PYTHON_SOP_CODE),
+        (epfo.NODE_EXPRESSIONS, "null1/tx", "hou.frame() * 2"),
+        (epfo.SHELF_TOOL_SCRIPTS, "$HDA_DEFAULT_TOOL",
+         "import objecttoolutils\n\nobjecttoolutils.genericTool(kwargs, '$HDA_NAME')")]
+
+    epfo.extract_python([file_path], folder_path, "otl_scripts_folder", backend="native",
+                        script_filter=script_filters.ScriptFilter(kinds=[epfo.NODE_SCRIPTS]))
+    scripts_folder_path = os.path.join(folder_path, "otl_scripts_folder")
+    otl_unique_name = epfo.make_unique_name(file_path, os.path.basename(file_path))
+    hda_unique_name = list(epfo.read_json_file(os.path.join(scripts_folder_path, otl_unique_name, "log.json")))[0]
+    node_scripts_folder_path = os.path.join(scripts_folder_path, otl_unique_name, hda_unique_name, epfo.NODE_SCRIPTS)
+
+    with open(os.path.join(node_scripts_folder_path, "log.json"), "r") as file_obj:
+        names_log_file = json.load(file_obj)
+    assert list(names_log_file.values()) == ["geo1/python1/python"]
+    with open(os.path.join(node_scripts_folder_path, list(names_log_file)[0]), "r") as file_obj:
+        assert file_obj.read() == PYTHON_SOP_CODE
+    assert sorted(os.listdir(os.path.dirname(node_scripts_folder_path))) == ["manifest.json", epfo.NODE_SCRIPTS]
@@ -0,0 +1,117 @@
+import json
+import os
+import pytest
+import otl_watcher
+import synthetic_hda
+
+# These tests use synthetic otls and the native backend, and don't need houdini.
+
+
+def get_watchers():
+    """
+    :return: list of the watcher classes that can be used on this platform.
+    """
+
+    watchers = [otl_watcher.PollingWatcher]
+    try:
+        otl_watcher.InotifyWatcher([]).close()
+    except (OSError, AttributeError):
+        return watchers
+    return watchers + [otl_watcher.InotifyWatcher]
+
+
+@pytest.mark.parametrize('watcher_class', get_watchers())
+def test_watcher(tmpdir, watcher_class):
+    """
+    Checks that the watchers report the otls saved, added to and removed from the scanned folder.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param watcher_class: PollingWatcher or InotifyWatcher
+    """
+
+    folder_path = str(tmpdir)
+    otl_path = os.path.join(folder_path, "a.hda")
+    scan_folder_path = os.path.join(folder_path, "scanned")
+    os.mkdir(scan_folder_path)
+    synthetic_hda.write_synthetic_library(otl_path)
+
+    watcher = watcher_class([otl_path], [scan_folder_path])
+    if watcher_class is otl_watcher.PollingWatcher:
+        watcher.poll_interval = 0.01
+
+    try:
+        assert watcher.wait(0.05) == set()
+
+        synthetic_hda.write_synthetic_library(otl_path, definition_count=2)
+        new_otl_path = os.path.join(scan_folder_path, "b.otl")
+        synthetic_hda.write_synthetic_library(new_otl_path)
+        with open(os.path.join(scan_folder_path, "notes.txt"), "w") as file_obj:
+            file_obj.write("not an otl")
+
+        assert otl_watcher.wait_for_changes(watcher, debounce=0.1) == {otl_path, new_otl_path}
+
+        os.remove(new_otl_path)
+        assert otl_watcher.wait_for_changes(watcher, debounce=0.1) == {new_otl_path}
+    finally:
+        watcher.close()
+
+
+def test_update_otls(tmpdir):
+    """
+    Checks that only the entries of the changed otls are updated in the top level log.json.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    folder_path = str(tmpdir)
+    scripts_folder_path = os.path.join(folder_path, "otl_scripts_folder")
+    os.mkdir(scripts_folder_path)
+
+    otl_paths = [os.path.join(folder_path, "{0}.hda".format(name)) for name in ("a", "b", "c")]
+    for otl_path in otl_paths:
+        synthetic_hda.write_synthetic_library(otl_path)
+    otl_watcher.update_otls(otl_paths, scripts_folder_path, backend="native")
+
+    with open(os.path.join(scripts_folder_path, "log.json"), "r") as file_obj:
+        older_otl_hash_dict = json.load(file_obj)
+    assert len(older_otl_hash_dict) == 3
+
+    synthetic_hda.write_synthetic_library(otl_paths[0], definition_count=2)
+    os.remove(otl_paths[1])
+    otl_watcher.update_otls(otl_paths[:2], scripts_folder_path, backend="native")
+
+    with open(os.path.join(scripts_folder_path, "log.json"), "r") as file_obj:
+        otl_hash_dict = json.load(file_obj)
+
+    names = dict((os.path.basename(file_dict["file_path"]), otl_unique_name)
+                 for otl_unique_name, file_dict in older_otl_hash_dict.items())
+    assert sorted(otl_hash_dict) == sorted([names["a.hda"], names["c.hda"]])
+    assert otl_hash_dict[names["c.hda"]] == older_otl_hash_dict[names["c.hda"]]
+    assert otl_hash_dict[names["a.hda"]]["size"] != older_otl_hash_dict[names["a.hda"]]["size"]
+    assert not [file_name for file_name in os.listdir(scripts_folder_path) if file_name.endswith(".tmp")]
+
+
+def test_update_unreadable_otl(tmpdir):
+    """
+    Checks that an otl that can't be loaded, eg. while it's being written, keeps its entry.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    folder_path = str(tmpdir)
+    scripts_folder_path = os.path.join(folder_path, "otl_scripts_folder")
+    os.mkdir(scripts_folder_path)
+
+    otl_path = os.path.join(folder_path, "partial.hda")
+    synthetic_hda.write_synthetic_library(otl_path)
+    otl_watcher.update_otls([otl_path], scripts_folder_path, backend="native")
+
+    with open(os.path.join(scripts_folder_path, "log.json"), "r") as file_obj:
+        older_otl_hash_dict = json.load(file_obj)
+
+    with open(otl_path, "w") as file_obj:
+        file_obj.write("partial")
+    assert otl_watcher.update_otls([otl_path], scripts_folder_path, backend="native") == {}
+
+    with open(os.path.join(scripts_folder_path, "log.json"), "r") as file_obj:
+        assert json.load(file_obj) == older_otl_hash_dict
@@ -0,0 +1,79 @@
+import os
+import pytest
+import output_sinks
+
+
+TEST_FILES = [
+    ("otl_scripts_folder/otl_hash/asset_hash", None),
+    ("otl_scripts_folder/otl_hash/asset_hash/parameter_callbacks/button.py", 'print("callback")'),
+    ("otl_scripts_folder/otl_hash/log.json", '{\n  "asset_hash": "Object/asset"\n}'),
+    ("otl_scripts_folder/log.json", "{}"),
+]
+
+
+@pytest.mark.parametrize(
+    'archive_name',
+    [
+        pytest.param("scripts.zip"),
+        pytest.param("scripts.tar"),
+        pytest.param("scripts.tar.gz"),
+        pytest.param("scripts.sqlite"),
+    ]
+)
+def test_archive_round_trip(tmpdir, archive_name):
+    """
+    Writes files into each archive type, and checks that they are read back and
+    materialized into the same folder tree.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param str archive_name: archive file name, its extension sets the type
+    """
+
+    archive_path = os.path.join(str(tmpdir), archive_name)
+
+    with output_sinks.open_sink(archive_path) as sink:
+        for path, contents in TEST_FILES:
+            if contents is None:
+                sink.add_directory(path)
+            else:
+                sink.add_file(path, contents)
+
+    assert sink.file_count == 3
+
+    entries = dict(output_sinks.iter_archive(archive_path))
+    for path, contents in TEST_FILES:
+        expected = None if contents is None else contents.encode("utf-8")
+        assert entries[path] == expected
+
+    directory = os.path.join(str(tmpdir), "materialized")
+    assert output_sinks.materialize_archive(archive_path, directory) == 3
+
+    assert os.path.isdir(os.path.join(directory, "otl_scripts_folder", "otl_hash", "asset_hash"))
+    with open(os.path.join(directory, "otl_scripts_folder", "otl_hash", "asset_hash",
+                           "parameter_callbacks", "button.py"), "r") as file_obj:
+        assert file_obj.read() == 'print("callback")'
+
+
+def test_materialize_skips_outside_paths(tmpdir):
+    """
+    Checks that archive entries pointing outside of the target directory are not written.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    archive_path = os.path.join(str(tmpdir), "scripts.zip")
+    with output_sinks.open_sink(archive_path) as sink:
+        sink.add_file("../escaped.py", "print('escaped')")
+
+    directory = os.path.join(str(tmpdir), "materialized")
+    assert output_sinks.materialize_archive(archive_path, directory) == 0
+    assert not os.path.exists(os.path.join(str(tmpdir), "escaped.py"))
+
+
+def test_unknown_archive_type():
+    """
+    Checks that unknown archive extensions are rejected.
+    """
+
+    with pytest.raises(ValueError):
+        output_sinks.get_archive_type("scripts.rar")
@@ -0,0 +1,64 @@
+import profiling
+
+# These tests don't need houdini.
+
+
+def test_measure():
+    """
+    Checks that measurements are added to the phase, otl and definition totals,
+    and that only the outermost ones count towards the otl totals.
+    """
+
+    profiler = profiling.enable()
+    try:
+        with profiling.measure("load", library="a.hda"):
+            pass
+        with profiling.measure("extract", library="a.hda"):
+            with profiling.measure("definition", definition="definition"):
+                with profiling.measure("write"):
+                    profiling.add_bytes("write", 10)
+        with profiling.measure("load", library="b.hda"):
+            pass
+    finally:
+        profiling.disable()
+
+    assert profiler.phases["load"]["calls"] == 2
+    assert profiler.phases["write"]["bytes"] == 10
+
+    library_dict = profiler.libraries["a.hda"]
+    assert sorted(library_dict["phases"]) == ["definition", "extract", "load", "write"]
+    assert library_dict["wall"] == library_dict["phases"]["load"]["wall"] + library_dict["phases"]["extract"]["wall"]
+
+    definition_dict = library_dict["definitions"]["definition"]
+    assert definition_dict["phases"]["write"]["bytes"] == 10
+    assert definition_dict["wall"] == definition_dict["phases"]["definition"]["wall"]
+
+    assert profiler.libraries["b.hda"]["definitions"] == {}
+
+
+def test_disabled():
+    """
+    Checks that nothing is recorded without an enabled profiler.
+    """
+
+    assert profiling.get_profiler() is None
+    with profiling.measure("load", library="a.hda"):
+        profiling.add_bytes("load", 10)
+    assert profiling.get_profiler() is None
+
+
+def test_merge():
+    """
+    Checks that merged worker profiles add up, and the slowest otls are listed first.
+    """
+
+    profiler = profiling.Profiler()
+    for file_path, wall in [("a.hda", 1.0), ("b.hda", 3.0), ("a.hda", 1.5)]:
+        worker_profiler = profiling.Profiler()
+        worker_profiler.library = file_path
+        worker_profiler.add_time("extract", wall, wall / 2)
+        profiler.merge(worker_profiler.to_dict())
+
+    assert profiler.phases["extract"]["calls"] == 3
+    assert profiler.slowest_libraries(1) == [("b.hda", 3.0, 1.5)]
+    assert profiler.libraries["a.hda"]["wall"] == 2.5
@@ -0,0 +1,63 @@
+import json
+import os
+import pytest
+import extract_python_from_otl as epfo
+import run_journal
+import synthetic_hda
+
+# These tests use synthetic otls and the native backend, and don't need houdini.
+
+
+def test_resume(tmpdir, monkeypatch):
+    """
+    Interrupts a run on its third otl, and checks that the run resumed from the
+    journal only extracts the otls left, writes the whole log.json and removes the journal.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param monkeypatch: pytest monkeypatch fixture
+    """
+
+    folder_path = str(tmpdir)
+    scripts_folder_path = os.path.join(folder_path, "otl_scripts_folder")
+    otl_paths = [os.path.join(folder_path, "{0}.hda".format(name)) for name in ("a", "b", "c", "d")]
+    for otl_path in otl_paths:
+        script_count = synthetic_hda.write_synthetic_library(otl_path, definition_count=2, parm_count=1)
+
+    iter_otl_definitions = epfo.iter_otl_definitions
+    loaded_file_paths = []
+
+    def iter_interrupted_otl_definitions(file_paths, backend=epfo.DEFAULT_BACKEND):
+        for file_path, definitions in iter_otl_definitions(file_paths, backend=backend):
+            if file_path == otl_paths[2]:
+                raise KeyboardInterrupt
+            loaded_file_paths.append(file_path)
+            yield file_path, definitions
+
+    monkeypatch.setattr(epfo, "iter_otl_definitions", iter_interrupted_otl_definitions)
+    with pytest.raises(KeyboardInterrupt):
+        epfo.extract_python(otl_paths, folder_path, "otl_scripts_folder", backend="native")
+    assert not os.path.exists(os.path.join(scripts_folder_path, "log.json"))
+
+    journal_file_path = os.path.join(scripts_folder_path, run_journal.JOURNAL_FILE_NAME)
+    with open(journal_file_path, "r") as file_obj:
+        entries = [json.loads(line) for line in file_obj]
+    assert [entry["file_path"] for entry in entries] == otl_paths[:2]
+    assert [(entry["status"], entry["hdas"], entry["scripts"]) for entry in entries] == \
+        [(run_journal.EXTRACTED, 2, script_count)] * 2
+
+    # killed while a line was written
+    with open(journal_file_path, "a") as file_obj:
+        file_obj.write('{"otl": "c.hda_')
+
+    del loaded_file_paths[:]
+    monkeypatch.setattr(epfo, "iter_otl_definitions", lambda file_paths, backend=epfo.DEFAULT_BACKEND: (
+        loaded_file_paths.append(file_path) or (file_path, definitions)
+        for file_path, definitions in iter_otl_definitions(file_paths, backend=backend)))
+    epfo.extract_python(otl_paths, folder_path, "otl_scripts_folder", backend="native", resume=True)
+    assert loaded_file_paths == otl_paths[2:]
+
+    otl_hash_dict = epfo.read_otl_log(scripts_folder_path)
+    assert sorted(file_dict["file_path"] for file_dict in otl_hash_dict.values()) == otl_paths
+    assert otl_hash_dict == dict((epfo.make_unique_name(otl_path, os.path.basename(otl_path)),
+                                  epfo.get_otl_file_dict(otl_path)) for otl_path in otl_paths)
+    assert not os.path.exists(journal_file_path)
@@ -0,0 +1,68 @@
+import os
+import pytest
+import extract_python_from_otl as epfo
+
+# These tests only use the file system and don't need houdini.
+
+
+def make_library_folder(folder_path):
+    """
+    Makes a folder tree of empty otls, with a symlinked copy of a folder and
+    of an otl, and a symlink looping back to the top folder.
+
+    :param str folder_path: top folder of the tree.
+    """
+
+    for relative_path in ["a.hda", "notes.txt", "sub dir/b.otl", "backup/c.hda", "backup/d.otllc"]:
+        file_path = os.path.join(folder_path, *relative_path.split("/"))
+        if not os.path.isdir(os.path.dirname(file_path)):
+            os.makedirs(os.path.dirname(file_path))
+        open(file_path, "w").close()
+
+    os.symlink(os.path.join(folder_path, "sub dir"), os.path.join(folder_path, "link"))
+    os.symlink(os.path.join(folder_path, "a.hda"), os.path.join(folder_path, "backup", "a_link.hda"))
+    os.symlink(folder_path, os.path.join(folder_path, "loop"))
+
+
+@pytest.mark.parametrize(
+    ('include', 'exclude', 'expected'),
+    [
+        pytest.param(epfo.DEFAULT_SCAN_INCLUDE, (), ["a.hda", "backup/c.hda", "backup/d.otllc", "sub dir/b.otl"]),
+        pytest.param(epfo.DEFAULT_SCAN_INCLUDE, ("backup",), ["a.hda", "sub dir/b.otl"]),
+        pytest.param(epfo.DEFAULT_SCAN_INCLUDE, ("*/b.otl", "*.otllc"), ["a.hda", "backup/c.hda"]),
+        pytest.param(("*.otl",), (), ["sub dir/b.otl"]),
+    ]
+)
+def test_scan_otl_paths(tmpdir, include, exclude, expected):
+    """
+    Checks the otls found by scan_otl_paths(), each one only once even when it
+    can be reached through symlinks.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param tuple include: file name globs of the otls
+    :param tuple exclude: globs of the names or relative paths to skip
+    :param list expected: expected otl paths, relative to the scanned folder
+    """
+
+    folder_path = str(tmpdir)
+    make_library_folder(folder_path)
+
+    result = epfo.scan_otl_paths([folder_path], include=include, exclude=exclude)
+    relative_paths = sorted(os.path.relpath(os.path.realpath(file_path), os.path.realpath(folder_path))
+                            .replace(os.sep, "/") for file_path in result)
+
+    assert relative_paths == expected
+
+
+def test_read_otl_paths_file(tmpdir):
+    """
+    Checks that paths with spaces are read whole from an otl paths file.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    txt_file_path = os.path.join(str(tmpdir), "otl_list.txt")
+    with open(txt_file_path, "w") as file_obj:
+        file_obj.write("/job/otls/sky scraper.hda\n\n  /job/otls/otl_1.hda  \n")
+
+    assert epfo.read_otl_paths_file(txt_file_path) == ["/job/otls/sky scraper.hda", "/job/otls/otl_1.hda"]
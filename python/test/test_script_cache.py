@@ -0,0 +1,85 @@
+import os
+import time
+import pytest
+import script_cache
+
+# These tests only use the file system and don't need houdini.
+
+
+DEFINITION_RECORDS = [
+    {"definition": "<hou.HDADefinition of Object sky_scraper in /otls/sky_scraper.hda>",
+     "node_type_name": "sky_scraper",
+     "node_type": "Object/sky_scraper",
+     "scripts": [["parameter_callbacks", "button", 'print("callback")']]},
+]
+
+
+@pytest.mark.parametrize(
+    ('file_path', 'expected_definition'),
+    [
+        pytest.param("/otls/sky_scraper.hda", "<hou.HDADefinition of Object sky_scraper in /otls/sky_scraper.hda>"),
+        pytest.param("/copy/sky_scraper.hda", "<hou.HDADefinition of Object sky_scraper in /copy/sky_scraper.hda>"),
+    ]
+)
+def test_cache_round_trip(tmpdir, file_path, expected_definition):
+    """
+    Checks that cached definition records are read back, with the definition
+    strings pointing to the otl being extracted.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param str file_path: path of the otl read from the cache
+    :param str expected_definition: expected str(hda definition) of the cached record
+    """
+
+    cache = script_cache.ScriptCache(str(tmpdir))
+
+    assert cache.get("content_hash", "native", file_path) is None
+
+    cache.put("content_hash", "native", "/otls/sky_scraper.hda", DEFINITION_RECORDS)
+    result = cache.get("content_hash", "native", file_path)
+
+    assert result[0]["definition"] == expected_definition
+    assert result[0]["scripts"] == DEFINITION_RECORDS[0]["scripts"]
+
+    # entries are per backend
+    assert cache.get("content_hash", "hou", file_path) is None
+
+
+def test_corrupt_entry(tmpdir):
+    """
+    Checks that an entry that can't be read counts as a miss.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    cache = script_cache.ScriptCache(str(tmpdir))
+    entry_path = cache.get_entry_path(cache.get_key("content_hash", "native"))
+    os.makedirs(os.path.dirname(entry_path))
+    with open(entry_path, "wb") as file_obj:
+        file_obj.write(b"not gzip")
+
+    assert cache.get("content_hash", "native", "/otls/sky_scraper.hda") is None
+
+
+def test_evict(tmpdir):
+    """
+    Checks that the least recently used entries are removed above the size limit.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    cache = script_cache.ScriptCache(str(tmpdir))
+    for index, content_hash in enumerate(["old", "used", "new"]):
+        cache.put(content_hash, "native", "/otls/sky_scraper.hda", DEFINITION_RECORDS)
+        entry_path = cache.get_entry_path(cache.get_key(content_hash, "native"))
+        os.utime(entry_path, (time.time() - 100 + index, time.time() - 100 + index))
+
+    # reading an entry makes it the most recently used one
+    cache.get("used", "native", "/otls/sky_scraper.hda")
+
+    cache.max_size = os.path.getsize(entry_path) * 2
+    assert cache.evict() == 1
+
+    assert cache.get("old", "native", "/otls/sky_scraper.hda") is None
+    assert cache.get("used", "native", "/otls/sky_scraper.hda") is not None
+    assert cache.get("new", "native", "/otls/sky_scraper.hda") is not None
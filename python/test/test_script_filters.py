@@ -0,0 +1,87 @@
+import pytest
+import extract_python_from_otl as epfo
+import hda_reader
+import script_filters
+import synthetic_hda
+
+# These tests use synthetic otls and the native backend, and don't need houdini.
+
+
+@pytest.mark.parametrize(
+    ('node_type_name', 'min_version', 'max_version', 'expected'),
+    [
+        pytest.param("acme::tool::2.0", None, None, True),
+        pytest.param("acme::tool::2.0", "1.5", "2", True),
+        pytest.param("acme::tool::1.10", "1.9", None, True),
+        pytest.param("acme::tool::1.10", None, "1.9", False),
+        pytest.param("acme::tool", "1", None, False),
+        pytest.param("tool", None, None, True),
+    ]
+)
+def test_match_version(node_type_name, min_version, max_version, expected):
+    """
+    :param str node_type_name: namespaced node type name
+    :param str min_version: lowest version kept
+    :param str max_version: highest version kept
+    :param bool expected: True if the definition is kept
+    """
+
+    script_filter = script_filters.ScriptFilter(min_version=min_version, max_version=max_version)
+    version = script_filters.get_version_from_node_type_name(node_type_name)
+    assert script_filter.match_version(version) == expected
+
+
+@pytest.mark.parametrize(
+    ('filter_kwargs', 'expected_definitions', 'expected_kinds', 'reads_sections', 'reads_parm_templates'),
+    [
+        pytest.param({}, ["synthetic_0", "synthetic_1", "synthetic_2"],
+                     {epfo.MAIN_PYTHON_SCRIPTS, epfo.PARAMETER_CALLBACKS, epfo.ITEM_GENERATION_SCRIPTS}, 3, 3),
+        pytest.param({"node_types": ["Object/*_1"]}, ["synthetic_1"],
+                     {epfo.MAIN_PYTHON_SCRIPTS, epfo.PARAMETER_CALLBACKS, epfo.ITEM_GENERATION_SCRIPTS}, 1, 1),
+        pytest.param({"node_types": ["Sop/*"]}, [], set(), 0, 0),
+        pytest.param({"kinds": [epfo.PARAMETER_CALLBACKS]}, ["synthetic_0", "synthetic_1", "synthetic_2"],
+                     {epfo.PARAMETER_CALLBACKS}, 0, 3),
+        pytest.param({"kinds": [epfo.MAIN_PYTHON_SCRIPTS], "section_pattern": "^python_section_1$"},
+                     ["synthetic_0", "synthetic_1", "synthetic_2"], {epfo.MAIN_PYTHON_SCRIPTS}, 3, 0),
+    ]
+)
+def test_filtered_definitions(tmpdir, monkeypatch, filter_kwargs, expected_definitions, expected_kinds,
+                              reads_sections, reads_parm_templates):
+    """
+    Checks that definitions and kinds which aren't selected are skipped before
+    their sections or parm templates are read.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param monkeypatch: pytest monkeypatch fixture
+    :param dict filter_kwargs: arguments of the ScriptFilter
+    :param list expected_definitions: node type names of the definitions kept
+    :param set expected_kinds: kinds of the scripts kept
+    :param int reads_sections: number of definitions whose sections are read
+    :param int reads_parm_templates: number of definitions whose parm templates are read
+    """
+
+    otl_path = str(tmpdir.join("library.hda"))
+    synthetic_hda.write_synthetic_library(otl_path, definition_count=3, section_count=2)
+
+    calls = []
+    # the native parmTemplateGroup() reads the DialogScript section through sections()
+    extra_file_options = hda_reader.HDADefinition.extraFileOptions
+    parm_template_group = hda_reader.HDADefinition.parmTemplateGroup
+    monkeypatch.setattr(hda_reader.HDADefinition, "extraFileOptions",
+                        lambda definition: calls.append("sections") or extra_file_options(definition))
+    monkeypatch.setattr(hda_reader.HDADefinition, "parmTemplateGroup",
+                        lambda definition: calls.append("parm_templates") or parm_template_group(definition))
+
+    script_filter = script_filters.ScriptFilter(**filter_kwargs)
+    with hda_reader.HDALibrary(otl_path) as library:
+        records = [(str(definition.nodeTypeName()), list(epfo.iter_py_scripts(definition, script_filter)))
+                   for definition in epfo.iter_filtered_definitions(library.definitions(), script_filter)]
+
+    assert [node_type_name for node_type_name, scripts in records] == expected_definitions
+    assert set(kind for node_type_name, scripts in records for kind, name, script in scripts) == expected_kinds
+    assert calls.count("sections") == reads_sections
+    assert calls.count("parm_templates") == reads_parm_templates
+
+    if "section_pattern" in filter_kwargs:
+        assert set(name for node_type_name, scripts in records for kind, name, script in scripts) == \
+            {"python_section_1"}
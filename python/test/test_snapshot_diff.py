@@ -0,0 +1,53 @@
+import json
+import os
+import shutil
+import extract_python_from_otl as epfo
+import snapshot_diff
+import synthetic_hda
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+# These tests use synthetic otls and the native backend, and don't need houdini.
+
+
+def test_diff(tmpdir):
+    """
+    Extracts synthetic otls twice, changing them in between, and compares both scripts folders.
+
+    :param tmpdir: pytest temporary directory fixture
+    """
+
+    folder_path = str(tmpdir)
+    old_folder_path = os.path.join(folder_path, "old")
+    new_folder_path = os.path.join(folder_path, "otl_scripts_folder")
+    otl_paths = [os.path.join(folder_path, "{0}.hda".format(name)) for name in ("a", "b", "c")]
+
+    for otl_path in otl_paths:
+        synthetic_hda.write_synthetic_library(otl_path, parm_count=2)
+    epfo.extract_python(otl_paths, folder_path, "otl_scripts_folder", backend="native")
+    shutil.copytree(new_folder_path, old_folder_path)
+
+    # a.hda gets a second hda, b.hda other scripts and c.hda is removed
+    synthetic_hda.write_synthetic_library(otl_paths[0], definition_count=2, parm_count=2)
+    synthetic_hda.write_synthetic_library(otl_paths[1], parm_count=1, script_size=300)
+    epfo.extract_python(otl_paths[:2], folder_path, "otl_scripts_folder", backend="native")
+
+    file_obj = StringIO()
+    assert snapshot_diff.write_diff(old_folder_path, new_folder_path, file_obj) == 5 + 3 + 2 + 5
+    report = json.loads(file_obj.getvalue())
+
+    assert report["summary"] == {"added": 5, "removed": 2 + 5, "modified": 3}
+    libraries = dict((os.path.basename(library_dict["library"]), library_dict["hdas"])
+                     for library_dict in report["libraries"].values())
+    assert sorted(libraries) == ["a.hda", "b.hda", "c.hda"]
+    assert [hda_dict["node_type"] for hda_dict in libraries["a.hda"].values()] == ["Object/synthetic_1"]
+    b_hda_dict = list(libraries["b.hda"].values())[0]
+    assert b_hda_dict["removed"] == ["item_generation_scripts/parm_1.py", "parameter_callbacks/parm_1.py"]
+    assert len(b_hda_dict["modified"]) == 3
+
+    file_obj = StringIO()
+    snapshot_diff.write_diff(old_folder_path, new_folder_path, file_obj, diff_format="unified")
+    assert file_obj.getvalue().count("\n+++ b/") == 15
@@ -0,0 +1,124 @@
+import os
+import threading
+import pytest
+import extract_python_from_otl as epfo
+import synthetic_hda
+import writer_pool
+
+# These tests use synthetic otls and the native backend, and don't need houdini.
+
+
+def read_folder(folder_path):
+    """
+    :param str folder_path: path to a folder.
+    :return: dict {"/" separated path relative to folder_path: contents} of the files in the folder.
+    """
+
+    files = dict()
+    for dir_path, dir_names, file_names in os.walk(folder_path):
+        for file_name in file_names:
+            file_path = os.path.join(dir_path, file_name)
+            with open(file_path, "r") as file_obj:
+                files[os.path.relpath(file_path, folder_path).replace(os.sep, "/")] = file_obj.read()
+    return files
+
+
+@pytest.mark.parametrize(
+    ('jobs', 'dedup'),
+    [
+        pytest.param(1, False),
+        pytest.param(1, True),
+        pytest.param(2, False),
+    ]
+)
+def test_write_threads(tmpdir, jobs, dedup):
+    """
+    Checks that the scripts folder written with writer threads, from scratch and
+    then updated, is the same as the one written without them.
+
+    :param tmpdir: pytest temporary directory fixture
+    :param int jobs: number of worker processes
+    :param bool dedup: store each distinct script once, see blob_store
+    """
+
+    folder_path = str(tmpdir)
+    otl_paths = [os.path.join(folder_path, "{0}.hda".format(name)) for name in ("a", "b", "c")]
+    for write_threads in (0, 3):
+        os.mkdir(os.path.join(folder_path, str(write_threads)))
+
+    for script_size in (200, 300):
+        for otl_path in otl_paths:
+            synthetic_hda.write_synthetic_library(otl_path, definition_count=3, parm_count=4,
+                                                  script_size=script_size)
+
+        for write_threads in (0, 3):
+            epfo.extract_python(otl_paths, os.path.join(folder_path, str(write_threads)), "otl_scripts_folder",
+                                backend="native", jobs=jobs, dedup=dedup, write_threads=write_threads)
+
+        files = read_folder(os.path.join(folder_path, "0"))
+        threaded_files = read_folder(os.path.join(folder_path, "3"))
+        assert threaded_files == files
+
+
+def test_backpressure():
+    """
+    Checks that submit() blocks while the queue is full, and that the done
+    function of a group is called once all its writes are done.
+    """
+
+    release = threading.Event()
+    written = []
+    done = []
+
+    with writer_pool.WriterPool(thread_count=1, queue_size=2) as pool:
+        write_group = pool.group()
+
+        def write(index):
+            release.wait()
+            written.append(index)
+
+        def submit_writes():
+            for index in range(4):
+                write_group.submit(write, index)
+            write_group.close(lambda: done.append(list(written)))
+
+        submitter = threading.Thread(target=submit_writes)
+        submitter.start()
+        # one write in the writer thread, two queued, the fourth waits for room
+        submitter.join(0.2)
+        assert submitter.is_alive()
+        assert written == []
+
+        release.set()
+        submitter.join()
+        pool.wait()
+
+    assert written == [0, 1, 2, 3]
+    assert done == [[0, 1, 2, 3]]
+
+
+def test_failed_write():
+    """
+    Checks that the done function of a group with a failed write isn't called,
+    and that the error is raised by wait().
+    """
+
+    done = []
+
+    def fail():
+        raise IOError("disk full")
+
+    with writer_pool.WriterPool(thread_count=2) as pool:
+        write_group = pool.group()
+        write_group.submit(lambda: None)
+        write_group.submit(fail)
+        write_group.close(lambda: done.append(True))
+
+        other_group = pool.group()
+        other_group.submit(lambda: None)
+        other_group.close(lambda: done.append(False))
+
+        with pytest.raises(IOError):
+            pool.wait()
+
+    assert done == [False]
@@ -0,0 +1,182 @@
+"""
+A bounded queue of file writes, drained by a small pool of threads.
+
+The main thread walks the hda definitions, through hou or the native reader,
+and hands the scripts of each hda over to the writer threads instead of
+writing them itself, so that the hou calls and the open/write round trips of
+the file system (slow on NFS) overlap instead of alternating. The renames are
+left to atomic_writes.sync(), once the otl is done. The queue is bounded: when
+the writer threads fall behind, submit() blocks until there's room again,
+which keeps the scripts held in memory bounded.
+
+The writes of an hda are grouped, the done function of a group is called once
+all its writes are done, eg. to write the manifest.json of the hda after its
+scripts, so that a manifest never lists a script that isn't written yet. The
+done function isn't called if one of the writes failed, the error is raised
+by the next submit() or wait() instead.
+
+Usage:
+    with WriterPool(thread_count=4) as writer_pool:
+        write_group = writer_pool.group()
+        write_group.submit(atomic_writes.write_file, script_file_path, script)
+        write_group.close(write_manifest)
+        writer_pool.wait()
+"""
+
+import sys
+import threading
+
+try:
+    import queue
+except ImportError:
+    # python 2
+    import Queue as queue
+
+
+DEFAULT_THREAD_COUNT = 4
+
+# writes waiting for a writer thread
+DEFAULT_QUEUE_SIZE = 256
+
+
+class WriteGroup(object):
+    """
+    Writes submitted together, see WriterPool.group().
+    """
+
+    def __init__(self, writer_pool):
+        self.writer_pool = writer_pool
+        self.lock = threading.Lock()
+        # the writes not done yet, and the group itself until it's closed
+        self.pending_count = 1
+        self.failed = False
+        self.done = None
+
+    def submit(self, function, *args):
+        """
+        Queues a write, blocks while the queue is full.
+
+        :param function: function doing the write, called with args in a writer thread.
+        """
+
+        with self.lock:
+            self.pending_count += 1
+        self.writer_pool.submit(self, function, args)
+
+    def close(self, done=None):
+        """
+        :param done: function called without arguments once all the writes of
+                     the group are done, in the thread doing the last one.
+        """
+
+        self.done = done
+        self.finish(failed=False)
+
+    def finish(self, failed):
+        """
+        Called once a write of the group is done, or the group is closed.
+
+        :param bool failed: if the write failed.
+        """
+
+        with self.lock:
+            self.failed = self.failed or failed
+            self.pending_count -= 1
+            if self.pending_count or self.failed or self.done is None:
+                return
+        self.done()
+
+
+class WriterPool(object):
+    """
+    Usage: see the module docstring.
+    """
+
+    def __init__(self, thread_count=DEFAULT_THREAD_COUNT, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        :param int thread_count: number of writer threads.
+        :param int queue_size: number of writes queued before submit() blocks.
+        """
+
+        self.queue = queue.Queue(queue_size)
+        self.errors = []
+        self.threads = []
+        for _ in range(thread_count):
+            thread = threading.Thread(target=self.run)
+            # a killed run doesn't wait for its writes, they are atomic, see atomic_writes
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def group(self):
+        """
+        :return: WriteGroup new group of writes.
+        """
+
+        return WriteGroup(self)
+
+    def submit(self, write_group, function, args):
+        """
+        Queues a write, see WriteGroup.submit().
+        """
+
+        self.raise_error()
+        self.queue.put((write_group, function, args))
+
+    def run(self):
+        """
+        Writer thread, does the queued writes until it gets None.
+        """
+
+        while True:
+            task = self.queue.get()
+            try:
+                if task is None:
+                    return
+                write_group, function, args = task
+                try:
+                    function(*args)
+                except Exception:
+                    self.errors.append(sys.exc_info()[1])
+                    write_group.finish(failed=True)
+                else:
+                    try:
+                        write_group.finish(failed=False)
+                    except Exception:
+                        self.errors.append(sys.exc_info()[1])
+            finally:
+                self.queue.task_done()
+
+    def raise_error(self):
+        """
+        Raises the first error of a write, if a write failed.
+        """
+
+        if self.errors:
+            raise self.errors[0]
+
+    def wait(self):
+        """
+        Blocks until all the queued writes, and the done functions of their
+        groups, are done. Raises the first error of a write.
+        """
+
+        self.queue.join()
+        self.raise_error()
+
+    def close(self):
+        """
+        Lets the writer threads finish the queued writes, and stops them.
+        """
+
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []